@@ -1,3 +1,12 @@
-from .graph import process_email
+from .graph import process_email, GraphRunner, get_graph
+from .turnstile import CalendarTurnstile
+from .cache import ResponseCache, get_response_cache
 
-__all__ = ["process_email"]
+__all__ = [
+    "process_email",
+    "GraphRunner",
+    "get_graph",
+    "CalendarTurnstile",
+    "ResponseCache",
+    "get_response_cache",
+]
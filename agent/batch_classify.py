@@ -0,0 +1,144 @@
+"""
+批次分類 - 將多封郵件打包成一次 structured output 請求
+
+單封分類每次都重送相同的 SYSTEM_PROMPT 並各自等待一次 round-trip；
+批次模式把 K 封郵件放進同一個 HumanMessage，回傳以 email_id 對應的分類列表。
+
+- 依 token 預算自動切批（估算值，不呼叫 tokenizer）
+- 規則預分類命中的郵件不送 LLM
+- 批次回傳中缺漏或驗證失敗的項目，改用單封分類補上
+"""
+
+import asyncio
+import logging
+
+from langchain_core.messages import SystemMessage, HumanMessage
+from pydantic import BaseModel, Field, ValidationError
+
+from .cache import ainvoke_cached
+from .nodes.classify import SYSTEM_PROMPT, ClassificationResult, classify_with_llm, render_email
+from .rules import PreClassifier, get_pre_classifier
+
+logger = logging.getLogger("agent")
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_TOKEN_BUDGET = 6000
+
+
+class BatchItem(BaseModel):
+    """批次中單封郵件的分類（欄位刻意寬鬆，逐項再以 ClassificationResult 驗證）"""
+
+    email_id: str = Field(description="郵件 ID")
+    category: str = Field(description="郵件分類：急件、一般、詢價、會議邀約、垃圾")
+    priority: int = Field(description="優先級 1-5，5 最高")
+    reasoning: str = Field(description="分類理由")
+
+
+class BatchClassificationResult(BaseModel):
+    """批次分類結果"""
+
+    results: list[BatchItem] = Field(description="每封郵件的分類結果，依 email_id 對應")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：ASCII 約 4 字元 1 token，中文等約 1 字元 1 token"""
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def split_batches(emails: list[dict], batch_size: int, token_budget: int) -> list[list[dict]]:
+    """依數量上限與 token 預算切批（單封超過預算時自成一批）"""
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    used = 0
+    for email in emails:
+        cost = estimate_tokens(render_email(email))
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(email)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_messages(emails: list[dict]) -> list:
+    parts = [f"### email_id: {e['id']}\n{render_email(e)}" for e in emails]
+    return [
+        # 與單封分類共用同一個 SYSTEM_PROMPT（支援 prompt cache）
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=f"""請分別分類以下 {len(emails)} 封郵件，每封郵件回傳一筆結果並填入對應的 email_id：
+
+""" + "\n".join(parts)),
+    ]
+
+
+async def _classify_batch(emails: list[dict], llm, cache) -> dict[str, ClassificationResult]:
+    """送出一個批次，回傳通過驗證的結果（email_id -> 結果）"""
+    wanted = {e["id"] for e in emails}
+    try:
+        batch: BatchClassificationResult = await ainvoke_cached(
+            BatchClassificationResult, _batch_messages(emails), llm, cache
+        )
+    except Exception as e:
+        logger.info(f"[BatchClassify] 批次請求失敗，改為單封分類: {e}")
+        return {}
+
+    results = {}
+    for item in batch.results:
+        if item.email_id not in wanted or item.email_id in results:
+            continue
+        try:
+            results[item.email_id] = ClassificationResult(
+                category=item.category,
+                priority=item.priority,
+                reasoning=item.reasoning,
+            )
+        except ValidationError:
+            logger.info(f"[BatchClassify] {item.email_id} 驗證失敗，改為單封分類")
+    return results
+
+
+async def classify_batch(
+    emails: list[dict],
+    llm=None,
+    cache=None,
+    pre_classifier: PreClassifier | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    concurrency: int = 1,
+) -> dict[str, dict]:
+    """批次分類整個收件匣
+
+    Returns:
+        email_id -> {category, priority, reasoning}
+    """
+    pre_classifier = pre_classifier or get_pre_classifier()
+
+    results: dict[str, dict] = {}
+    pending = []
+    for email in emails:
+        matched = pre_classifier.classify(email)
+        if matched:
+            results[email["id"]] = matched
+        else:
+            pending.append(email)
+
+    batches = split_batches(pending, batch_size, token_budget)
+    logger.info(f"[BatchClassify] {len(pending)} 封郵件分為 {len(batches)} 批")
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(batch: list[dict]):
+        async with sem:
+            classified = await _classify_batch(batch, llm, cache)
+            # 缺漏或驗證失敗的項目改用單封分類
+            for email in batch:
+                result = classified.get(email["id"])
+                if result is None:
+                    result = await classify_with_llm(email, llm, cache)
+                results[email["id"]] = result.model_dump()
+
+    await asyncio.gather(*(run(b) for b in batches))
+    return results
@@ -0,0 +1,205 @@
+"""
+LLM 回應快取 - 以內容雜湊為 key 的 SQLite 持久化快取
+
+key = sha256(model, temperature, schema, 所有 message 的內容)，
+即 SYSTEM_PROMPT 與組好的 HumanMessage 完全相同時才命中；改 prompt 自然失效。
+
+- TTL：超過 ttl_seconds 的項目視為過期
+- LRU：項目數超過 max_entries 時，淘汰最久未被讀取的項目
+- bypass：不讀快取、一律呼叫 LLM，但仍寫入新結果（用於強制更新）
+- 命中/未命中次數記錄在 hits / misses
+- SQLite 讀寫是同步的：非同步節點經由 ainvoke_cached 在 worker thread 中讀寫，不佔住 event loop
+
+環境變數：LLM_CACHE_PATH、LLM_CACHE_TTL（秒）、LLM_CACHE_MAX_ENTRIES、LLM_CACHE_BYPASS
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .llm import get_llm, get_structured_llm
+
+DEFAULT_PATH = Path(__file__).parent.parent / "output" / "llm_cache.sqlite3"
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class ResponseCache:
+    """LLM 結構化輸出的持久化快取"""
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_PATH,
+        ttl_seconds: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        bypass: bool = False,
+        enabled: bool = True,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._count = 0
+
+    @classmethod
+    def from_env(cls, **overrides) -> "ResponseCache":
+        """依環境變數建立（參數可覆寫環境變數）"""
+        kwargs = {
+            "path": os.getenv("LLM_CACHE_PATH", DEFAULT_PATH),
+            "ttl_seconds": float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+            "max_entries": int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            "bypass": os.getenv("LLM_CACHE_BYPASS", "") not in ("", "0", "false"),
+        }
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+            conn.commit()
+            self._count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(llm, schema: type[BaseModel], messages: list) -> str:
+        """以模型設定（含 API endpoint）與完整 prompt 內容計算 key
+
+        不同 OpenAI 相容服務（如本機 vLLM 與雲端 API）可能使用相同的模型名稱，endpoint 也需納入 key。
+        """
+        payload = [
+            getattr(llm, "model_name", None) or type(llm).__name__,
+            getattr(llm, "openai_api_base", None) or getattr(llm, "base_url", None),
+            getattr(llm, "temperature", None),
+            schema.__name__,
+            [[m.type, m.content] for m in messages],
+        ]
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """讀取快取（過期或 bypass 時回傳 None）"""
+        if not self.enabled or self.bypass:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict) -> None:
+        """寫入快取，超過容量時淘汰最久未使用的項目"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            existed = conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if not existed:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # 先清過期項目，再依 accessed_at 淘汰到容量以內
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 預設快取（依環境變數建立）
+_default_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache.from_env()
+    return _default_cache
+
+
+async def ainvoke_cached(
+    schema: type[BaseModel],
+    messages: list,
+    llm=None,
+    cache: ResponseCache | None = None,
+) -> BaseModel:
+    """以 structured output 呼叫 LLM，結果經由快取
+
+    llm / cache 未指定時使用預設的共用實例。
+    快取的 SQLite 讀寫（WAL、同步寫入）在 worker thread 中執行，其他郵件的節點不必等待。
+    """
+    llm = llm or get_llm()
+    cache = cache or get_response_cache()
+
+    key = cache.make_key(llm, schema, messages)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return schema.model_validate(cached)
+
+    result = await get_structured_llm(schema, llm).ainvoke(messages)
+    await asyncio.to_thread(cache.put, key, result.model_dump())
+    return result
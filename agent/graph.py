@@ -1,10 +1,32 @@
 """
 LangGraph 流程組裝
+
+可選的 checkpoint（GraphRunner(checkpoint=...)）：每個節點完成後保存 state，thread_id 為郵件 id。
+- "memory"：InMemorySaver，同一個 process 內重試時由最後完成的節點接續（classify 不必再呼叫 LLM）
+- SQLite 檔案路徑：AsyncSqliteSaver（需安裝 langgraph-checkpoint-sqlite），process 重啟後仍可接續與重播
 """
 
+import asyncio
+import logging
+from pathlib import Path
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, END
 
+try:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:  # 選用依賴：pip install langgraph-checkpoint-sqlite
+    AsyncSqliteSaver = None
+
 from .state import AgentState
+from .turnstile import CalendarTurnstile
+from .llm import acquire_llm, release_llm
+from .mcp_client import get_mcp_tools
+from .mcp_pool import MCPSessionPool
+from .cache import ResponseCache, get_response_cache
+from .rules import PreClassifier, get_pre_classifier
+from .tracing import EmailTrace, SpanLog
 from .nodes import (
     classify,
     meeting_agent,
@@ -13,8 +35,10 @@ from .nodes import (
     finalize,
 )
 
+logger = logging.getLogger("agent")
 
-def create_graph():
+
+def create_graph(checkpointer: BaseCheckpointSaver | None = None):
     """
     建立 LangGraph 流程
 
@@ -40,6 +64,8 @@ def create_graph():
     - get_calendar_events
     - add_calendar_event
     - delete_calendar_event
+
+    傳入 checkpointer 時每個節點完成後保存 state（呼叫時需在 configurable 指定 thread_id）。
     """
     graph = StateGraph(AgentState)
 
@@ -56,20 +82,265 @@ def create_graph():
     # 路由由 Command 處理
     graph.add_edge("finalize", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 
-async def process_email(email: dict, today: str) -> dict:
-    """處理單封郵件"""
-    graph = create_graph()
+# 編譯好的 graph（整個 process 只建立/驗證一次）
+_compiled_graph = None
 
-    initial_state: AgentState = {
-        "email": email,
-        "today": today,
-    }
 
-    final_state = await graph.ainvoke(initial_state)
+def get_graph():
+    """取得編譯好的 graph singleton"""
+    global _compiled_graph
+    if _compiled_graph is None:
+        _compiled_graph = create_graph()
+    return _compiled_graph
+
+
+class GraphRunner:
+    """一批郵件的執行環境
+
+    持有編譯好的 graph、LLM client、回應快取、規則預分類器與 MCP tools，整批郵件共用，
+    透過 config["configurable"] 傳給各節點。
+
+    用法：
+        async with GraphRunner() as runner:
+            result = await runner.process(email, today)
+
+    checkpoint 為 "memory" 或 SQLite 檔案路徑時，graph 改為帶 checkpointer 編譯（thread_id = 郵件 id）：
+    失敗的郵件最多執行 attempts 次，重試時由最後完成的節點接續；replay() 可從指定節點重新執行。
+    上次中斷的郵件預設也由 checkpoint 接續；resume_interrupted=False 時改為從頭執行
+    （行事曆已還原到這些郵件寫入之前，不能沿用 meeting_agent 已完成的 state）。
+
+    每封郵件以 EmailTrace 記錄節點、LLM 與工具呼叫的 span（見 agent/tracing.py）；傳入 spans 時逐封寫入。
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        tools: list | None = None,
+        cache: ResponseCache | None = None,
+        pre_classifier: PreClassifier | None = None,
+        preflight: bool = True,
+        checkpoint: str | Path | None = None,
+        attempts: int = 1,
+        spans: SpanLog | None = None,
+        resume_interrupted: bool = True,
+    ):
+        self.graph = get_graph()
+        self.checkpoint = checkpoint
+        self.checkpointer: BaseCheckpointSaver | None = None
+        self.attempts = max(1, attempts)
+        self.resume_interrupted = resume_interrupted
+        self._saver_cm = None
+        self.llm = llm
+        self.tools = tools
+        self.cache = cache or get_response_cache()
+        self.pre_classifier = pre_classifier or get_pre_classifier()
+        # 會議邀約是否先做確定性預查（見 agent/preflight.py）
+        self.preflight = preflight
+        self.spans = spans
+        self.mcp_pool: MCPSessionPool | None = None
+        self._tools_lock = asyncio.Lock()
+        self._owns_llm = llm is None
+        self._started = False
+
+    async def __aenter__(self) -> "GraphRunner":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """建立 LLM client 與 checkpointer（MCP tools 於第一封會議邀約時才載入）"""
+        self._started = True
+        if self.llm is None:
+            self.llm = acquire_llm()
+        if self.checkpoint is not None and self.checkpointer is None:
+            if self.checkpoint == "memory":
+                self.checkpointer = InMemorySaver()
+            else:
+                if AsyncSqliteSaver is None:
+                    raise RuntimeError("SQLite checkpoint 需要安裝 langgraph-checkpoint-sqlite（或改用 \"memory\"）")
+                Path(self.checkpoint).parent.mkdir(parents=True, exist_ok=True)
+                self._saver_cm = AsyncSqliteSaver.from_conn_string(str(self.checkpoint))
+                self.checkpointer = await self._saver_cm.__aenter__()
+            self.graph = create_graph(self.checkpointer)
+
+    async def close(self) -> None:
+        """結束這批處理，釋放持有的資源（MCP 連線池、快取的 SQLite 連線；共用的 LLM 連線池在最後一個使用者釋放時關閉）
+
+        快取關閉後仍可使用（下次讀寫時重新連線），與其他 GraphRunner 共用預設快取時不受影響。
+        """
+        self._started = False
+        self.cache.close()
+        self.tools = None
+        if self.mcp_pool is not None:
+            await self.mcp_pool.close()
+            self.mcp_pool = None
+        if self._owns_llm and self.llm is not None:
+            self.llm = None
+            await release_llm()
+        if self._saver_cm is not None:
+            await self._saver_cm.__aexit__(None, None, None)
+            self._saver_cm = None
+            self.checkpointer = None
 
+    async def get_tools(self) -> list:
+        """取得 MCP tools（第一次使用時啟動 MCP 連線池，整批共用長駐的 server process）
+
+        未 start() 的 GraphRunner 不會 close()，不建立自己的連線池，改用全域共用的 tools（get_mcp_tools）。
+        """
+        if self.tools is None and not self._started:
+            return await get_mcp_tools()
+        async with self._tools_lock:
+            if self.tools is None:
+                self.mcp_pool = MCPSessionPool()
+                await self.mcp_pool.start()
+                self.tools = await self.mcp_pool.get_tools()
+        return self.tools
+
+    async def process(
+        self,
+        email: dict,
+        today: str,
+        turnstile: CalendarTurnstile | None = None,
+        seq: int = 0,
+        preclassified: dict | None = None,
+    ) -> dict:
+        """處理單封郵件
+
+        並行處理時傳入 turnstile 與郵件序號 seq，meeting_agent 會依序號逐一執行。
+        preclassified 為批次分類的結果（category/priority/reasoning），classify 節點會直接採用。
+        """
+        initial_state: AgentState = {
+            "email": email,
+            "today": today,
+            **(preclassified or {}),
+        }
+        trace = EmailTrace(email["id"], self.spans)
+        config = self._config(email["id"], turnstile, seq, trace)
+
+        if self.checkpointer is not None and not self.resume_interrupted:
+            await self.checkpointer.adelete_thread(email["id"])
+
+        status = "error"
+        try:
+            for attempt in range(1, self.attempts + 1):
+                try:
+                    final_state = await self._run(initial_state, config, turnstile, seq)
+                    status = "ok"
+                    break
+                except Exception as e:
+                    if self.checkpointer is None or attempt == self.attempts:
+                        raise
+                    logger.info(f"[Graph] {email['id']} 第 {attempt} 次執行失敗（{e!r}），由 checkpoint 接續重試")
+        finally:
+            if turnstile:
+                await turnstile.release(seq)
+            trace.finish(status, attempt)
+
+        return _to_result(email, final_state)
+
+    def _config(
+        self,
+        email_id: str,
+        turnstile: CalendarTurnstile | None = None,
+        seq: int = 0,
+        trace: EmailTrace | None = None,
+    ) -> dict:
+        configurable = {
+            "turnstile": turnstile,
+            "seq": seq,
+            "llm": self.llm,
+            "cache": self.cache,
+            "pre_classifier": self.pre_classifier,
+            "get_tools": self.get_tools,
+            "preflight": self.preflight,
+        }
+        if self.checkpointer is not None:
+            configurable["thread_id"] = email_id
+        config = {"configurable": configurable}
+        if trace is not None:
+            config["callbacks"] = [trace]
+        return config
+
+    async def _run(
+        self,
+        initial_state: AgentState,
+        config: dict,
+        turnstile: CalendarTurnstile | None,
+        seq: int,
+    ) -> AgentState:
+        graph_input = initial_state
+        final_state: AgentState = {}
+        if self.checkpointer is not None:
+            snapshot = await self.graph.aget_state(config)
+            if snapshot.next:
+                # 上次執行中斷：輸入為 None，由最後完成的節點之後接續
+                graph_input = None
+                final_state = snapshot.values
+                if turnstile and snapshot.values.get("category", "會議邀約") != "會議邀約":
+                    await turnstile.release(seq)
+            elif snapshot.values:
+                # 同一封郵件已完整執行過：清掉舊的 checkpoint 重新開始，避免沿用上次的 state
+                await self.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+
+        async for mode, chunk in self.graph.astream(graph_input, config, stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+            elif turnstile and "classify" in chunk and chunk["classify"]["category"] != "會議邀約":
+                # 不會動到行事曆，立即讓後面的郵件進入 meeting_agent
+                await turnstile.release(seq)
+        return final_state
+
+    async def history(self, email_id: str) -> list[dict]:
+        """郵件的 checkpoint 歷史（由舊到新）：每一步的 checkpoint_id、接下來要執行的節點與當時的 state"""
+        self._require_checkpointer()
+        steps = [
+            {
+                "checkpoint_id": snapshot.config["configurable"]["checkpoint_id"],
+                "step": snapshot.metadata.get("step"),
+                "next": list(snapshot.next),
+                "values": snapshot.values,
+            }
+            async for snapshot in self.graph.aget_state_history(self._config(email_id))
+        ]
+        return steps[::-1]
+
+    async def replay(self, email_id: str, node: str) -> dict:
+        """從 node 重新執行（除錯用）：之前已完成的節點沿用 checkpoint 中的 state，不再呼叫 LLM
+
+        重播會在同一個 thread 上產生新的分支；重播 meeting_agent 時會再次呼叫行事曆工具。
+
+        Raises:
+            ValueError: 此郵件的 checkpoint 中沒有執行到 node 之前的紀錄
+        """
+        self._require_checkpointer()
+        config = self._config(email_id)
+        target = None
+        # 歷史由新到舊，取最近一次「下一步是 node」的 checkpoint
+        async for snapshot in self.graph.aget_state_history(config):
+            if node in snapshot.next:
+                target = snapshot
+                break
+        if target is None:
+            raise ValueError(f"{email_id} 的 checkpoint 中沒有可從 {node} 重播的紀錄")
+
+        config["configurable"]["checkpoint_id"] = target.config["configurable"]["checkpoint_id"]
+        final_state: AgentState = target.values
+        async for chunk in self.graph.astream(None, config, stream_mode="values"):
+            final_state = chunk
+        return _to_result(final_state["email"], final_state)
+
+    def _require_checkpointer(self) -> None:
+        if self.checkpointer is None:
+            raise RuntimeError("需以 checkpoint=\"memory\" 或 SQLite 路徑建立 GraphRunner 並先 start()")
+
+
+def _to_result(email: dict, final_state: AgentState) -> dict:
+    """將最終 state 整理成輸出結果"""
     result = {
         "email_id": email["id"],
         "category": final_state.get("category"),
@@ -89,3 +360,13 @@ async def process_email(email: dict, today: str) -> dict:
     }
     # 過濾掉 None 值
     return {k: v for k, v in result.items() if v is not None}
+
+
+async def process_email(
+    email: dict,
+    today: str,
+    turnstile: CalendarTurnstile | None = None,
+    seq: int = 0,
+) -> dict:
+    """處理單封郵件（使用共用的編譯 graph 與 MCP tools，不需關閉；批次處理建議改用 GraphRunner）"""
+    return await GraphRunner().process(email, today, turnstile, seq)
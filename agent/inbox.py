@@ -0,0 +1,131 @@
+"""
+串流讀取收件匣 - 不必整份載入即可開始處理
+
+支援兩種格式（依檔案第一個非空白字元判斷）：
+- JSONL：每行一封郵件
+- JSON array：[{...}, {...}, ...]，以 JSONDecoder.raw_decode 逐筆解析，每次只讀一個區塊
+
+郵件匯出通常大致依時間排序，但會有少量亂序。InboxStream 以大小為 window 的 min-heap
+做有界的重排：heap 滿了才吐出最早的一封，記憶體固定為 O(window)。因此第一封要等讀滿 window 封
+（或整個收件匣讀完）才會吐出，之後每讀一封吐一封；視窗越小越早開始處理，但能排回的亂序也越少。
+亂序超出視窗的郵件（比已吐出的郵件還早）無法再排回正確位置，照讀到的順序吐出並計入 late。
+"""
+
+import heapq
+import json
+import logging
+from itertools import chain, count
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger("agent")
+
+# 重排視窗（封）：也是開始處理前需先讀入的封數
+DEFAULT_WINDOW = 200
+# JSON array 每次讀取的字元數
+CHUNK_SIZE = 1 << 16
+
+# JSON array 元素之間可略過的字元
+_SEPARATORS = " \t\r\n,"
+
+
+def _iter_jsonl(f, first_line: str) -> Iterator[dict]:
+    for lineno, line in enumerate(chain([first_line], f), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"第 {lineno} 行不是合法的 JSON: {e}") from None
+
+
+def _iter_json_array(f, buffer: str) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+    # buffer 以 "[" 開頭
+    pos = 1
+    eof = False
+    while True:
+        # 跳過空白與分隔的逗號
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("JSON array 不完整或格式錯誤") from None
+            else:
+                # 物件結尾之後必須是分隔符號；否則可能只是讀到一半的數字等，再讀一些
+                if end < len(buffer) or eof:
+                    yield record
+                    pos = end
+                    continue
+        if eof:
+            raise ValueError("JSON array 缺少結尾的 ]")
+        # 丟掉已解析的部分再讀下一個區塊，buffer 只保留一筆未完成的紀錄
+        chunk = f.read(CHUNK_SIZE)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+
+def iter_records(path: Path | str) -> Iterator[dict]:
+    """逐筆讀取 JSONL 或 JSON array 檔案中的紀錄（依讀到的順序）"""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+        while first and not first.strip():
+            first = f.readline()
+        if not first:
+            return
+        if first.lstrip().startswith("["):
+            yield from _iter_json_array(f, first.lstrip())
+        else:
+            yield from _iter_jsonl(f, first)
+
+
+class InboxStream:
+    """依 timestamp 有界重排的郵件串流
+
+        stream = InboxStream("inbox.jsonl", window=1000)
+        for email in stream:
+            ...
+        stream.stats()  # {"read": ..., "late": ...}
+    """
+
+    def __init__(self, path: Path | str, window: int = DEFAULT_WINDOW, key: str = "timestamp"):
+        self.path = Path(path)
+        self.window = max(1, window)
+        self.key = key
+        self.read = 0
+        self.late = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        heap: list[tuple[str, int, dict]] = []
+        seq = count()
+        # 最後吐出的郵件時間；之後讀到更早的郵件代表亂序超出視窗
+        watermark = None
+
+        def emit(item: tuple[str, int, dict]) -> dict:
+            nonlocal watermark
+            if watermark is not None and item[0] < watermark:
+                self.late += 1
+                logger.info(f"[Inbox] {item[2].get('id')} 亂序超出重排視窗（{item[0]} < {watermark}）")
+            else:
+                watermark = item[0]
+            return item[2]
+
+        for record in iter_records(self.path):
+            self.read += 1
+            item = (record[self.key], next(seq), record)
+            if len(heap) < self.window:
+                heapq.heappush(heap, item)
+                continue
+            yield emit(heapq.heappushpop(heap, item))
+
+        while heap:
+            yield emit(heapq.heappop(heap))
+
+    def stats(self) -> dict:
+        return {"read": self.read, "late": self.late}
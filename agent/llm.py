@@ -1,16 +1,131 @@
 """
 LLM 設定 - 統一管理 LLM 實例
+
+ChatOpenAI 依 (model, temperature, base_url) 快取重用，所有實例共用同一組 httpx
+連線池（keep-alive），避免每個節點呼叫都重建 client、重做 TLS handshake。
+with_structured_output 產生的 runnable 也依 schema 快取。
+
+連線池大小由環境變數 LLM_MAX_CONNECTIONS 設定（預設 20），
+或在建立任何 client 前呼叫 configure_llm_pool()。
+同一個 process 內可能有多個使用者（如多個 GraphRunner）共用連線池：各自以 acquire_llm() 取得 client、
+結束時呼叫 release_llm()，最後一個使用者釋放時才關閉連線池。close_llms() 則不論使用者數直接關閉並清空快取。
 """
 
 import os
+import threading
+
+import httpx
 from langchain_openai import ChatOpenAI
 
+DEFAULT_MAX_CONNECTIONS = 20
+
+_lock = threading.Lock()
+_max_connections: int | None = None
+_http_client: httpx.Client | None = None
+_http_async_client: httpx.AsyncClient | None = None
+_clients: dict[tuple, ChatOpenAI] = {}
+# (id(llm), schema) -> (llm, runnable)；保留 llm 參照確保 id 不被重用
+_structured: dict[tuple, tuple] = {}
+# 以 acquire_llm() 登記、尚未 release_llm() 的使用者數
+_owners = 0
+
+
+def configure_llm_pool(max_connections: int) -> None:
+    """設定共用連線池大小（需在建立 client 前呼叫）"""
+    global _max_connections
+    with _lock:
+        if _http_client is not None or _http_async_client is not None:
+            raise RuntimeError("連線池已建立，請先呼叫 close_llms()")
+        _max_connections = max_connections
+
+
+def _limits() -> httpx.Limits:
+    n = _max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS))
+    return httpx.Limits(max_connections=n, max_keepalive_connections=n)
+
+
+def get_llm(
+    temperature: float = 0,
+    model: str | None = None,
+    base_url: str | None = None,
+) -> ChatOpenAI:
+    """取得 LLM 實例（相同設定回傳同一個實例）"""
+    global _http_client, _http_async_client
+
+    model = model or os.getenv("OPENAI_MODEL", "claude-4.5-opus-aws")
+    base_url = base_url or os.getenv("OPENAI_API_BASE")
+    key = (model, temperature, base_url)
+
+    with _lock:
+        llm = _clients.get(key)
+        if llm is None:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_limits())
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(limits=_limits())
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                base_url=base_url,
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=_http_client,
+                http_async_client=_http_async_client,
+            )
+            _clients[key] = llm
+    return llm
+
+
+def get_structured_llm(schema, llm=None):
+    """取得 llm.with_structured_output(schema)，依 (llm, schema) 快取
+
+    llm 未指定時使用 get_llm() 的預設實例。
+    """
+    if llm is None:
+        llm = get_llm()
+    key = (id(llm), schema)
+
+    with _lock:
+        cached = _structured.get(key)
+        if cached is None:
+            cached = (llm, llm.with_structured_output(schema))
+            _structured[key] = cached
+    return cached[1]
+
+
+def acquire_llm(**kwargs) -> ChatOpenAI:
+    """get_llm(**kwargs) 並登記為連線池的使用者；用完須呼叫 release_llm()"""
+    global _owners
+
+    llm = get_llm(**kwargs)
+    with _lock:
+        _owners += 1
+    return llm
+
+
+async def release_llm() -> None:
+    """解除 acquire_llm() 的登記；最後一個使用者解除時關閉連線池"""
+    global _owners
+
+    with _lock:
+        _owners = max(0, _owners - 1)
+        if _owners:
+            return
+    await close_llms()
+
+
+async def close_llms() -> None:
+    """關閉共用連線池並清空 client 快取（不論是否還有其他使用者）"""
+    global _http_client, _http_async_client, _owners
+
+    with _lock:
+        _owners = 0
+        http_client, http_async_client = _http_client, _http_async_client
+        _http_client = None
+        _http_async_client = None
+        _clients.clear()
+        _structured.clear()
 
-def get_llm(temperature: float = 0) -> ChatOpenAI:
-    """取得 LLM 實例"""
-    return ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "claude-4.5-opus-aws"),
-        temperature=temperature,
-        base_url=os.getenv("OPENAI_API_BASE"),
-        api_key=os.getenv("OPENAI_API_KEY"),
-    )
+    if http_async_client is not None:
+        await http_async_client.aclose()
+    if http_client is not None:
+        http_client.close()
@@ -2,6 +2,7 @@
 MCP Client - 使用 langchain-mcp-adapters 連接 MCP Server
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -10,6 +11,16 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 # MCP Server 路徑
 MCP_SERVER_PATH = Path(__file__).parent.parent / "mcp_server.py"
 
+# 傳給 server process 的設定（stdio client 預設只傳 PATH、HOME 等基本環境變數）
+# FASTMCP_：FastMCP 本身的設定，如 FASTMCP_LOG_LEVEL=WARNING 關閉每次呼叫的 INFO log
+SERVER_ENV_PREFIXES = ("CALENDAR_", "HOLIDAY", "FASTMCP_")
+
+
+def server_env() -> dict[str, str]:
+    """MCP Server 需要的環境變數（行事曆儲存引擎、假日資料等）"""
+    return {k: v for k, v in os.environ.items() if k.startswith(SERVER_ENV_PREFIXES)}
+
+
 # Tools cache
 _tools_cache = None
 
@@ -25,6 +36,7 @@ async def get_mcp_tools():
         "calendar": {
             "command": sys.executable,
             "args": [str(MCP_SERVER_PATH)],
+            "env": server_env(),
             "transport": "stdio",
         }
     })
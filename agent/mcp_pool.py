@@ -0,0 +1,227 @@
+"""
+MCP Session Pool - 長駐的 MCP Server 連線池
+
+MultiServerMCPClient 預設每次呼叫 tool 都開一個新的 stdio session（等於重啟一次
+mcp_server.py）。連線池改為啟動 N 個長駐的 server process，整批郵件共用：
+
+- 唯讀工具（server 以 readOnlyHint 標記，如 check_working_day、get_calendar_events）
+  以 round-robin 分散到各 session；失敗時換一個 session 重試一次
+- 會修改行事曆的工具一律交給第一個 session（primary），且不自動重試，避免重複寫入
+- 每次呼叫有 timeout；連線中斷或逾時的 session 會被重新啟動
+- 背景 health check 定期 ping，自動重啟掛掉的 server process
+
+環境變數：MCP_POOL_SIZE、MCP_CALL_TIMEOUT（秒）、MCP_HEALTH_INTERVAL（秒）
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import sys
+
+from langchain_core.tools import StructuredTool, ToolException
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+from .mcp_client import MCP_SERVER_PATH, server_env
+
+logger = logging.getLogger("agent")
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_CALL_TIMEOUT = 30.0
+DEFAULT_HEALTH_INTERVAL = 15.0
+# 啟動 server process 的等待上限（秒）
+START_TIMEOUT = 30.0
+
+
+class _PooledSession:
+    """單一 server process 與其 ClientSession
+
+    stdio_client / ClientSession 的 context 必須在同一個 task 內進出，
+    因此每個 session 由專屬的背景 task 開啟並持有，直到 stop()。
+    """
+
+    def __init__(self, params: StdioServerParameters):
+        self.params = params
+        self.session: ClientSession | None = None
+        self.error: BaseException | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        self._stop = asyncio.Event()
+        self.error = None
+        ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        await asyncio.wait_for(ready.wait(), START_TIMEOUT)
+        if self.session is None:
+            raise RuntimeError(f"MCP Server 啟動失敗: {self.error}")
+
+    async def _run(self, ready: asyncio.Event) -> None:
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            ready.set()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+        self._task = None
+
+
+class MCPSessionPool:
+    """長駐 MCP session 連線池
+
+    用法：
+        pool = MCPSessionPool(size=2)
+        await pool.start()
+        tools = await pool.get_tools()
+        ...
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        call_timeout: float | None = None,
+        health_interval: float | None = None,
+        command: str = sys.executable,
+        args: list[str] | None = None,
+    ):
+        self.size = size or int(os.getenv("MCP_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.call_timeout = call_timeout or float(os.getenv("MCP_CALL_TIMEOUT", DEFAULT_CALL_TIMEOUT))
+        self.health_interval = health_interval or float(os.getenv("MCP_HEALTH_INTERVAL", DEFAULT_HEALTH_INTERVAL))
+        self.params = StdioServerParameters(
+            command=command,
+            args=args or [str(MCP_SERVER_PATH)],
+            env=server_env(),
+        )
+
+        self._sessions: list[_PooledSession] = []
+        self._respawn_locks: list[asyncio.Lock] = []
+        self._round_robin = itertools.count()
+        self._mcp_tools: list = []
+        self._read_only: set[str] = set()
+        self._health_task: asyncio.Task | None = None
+        self.respawns = 0
+
+    async def start(self) -> None:
+        """啟動所有 server process，並向 server 取得 tool 清單"""
+        self._sessions = [_PooledSession(self.params) for _ in range(self.size)]
+        self._respawn_locks = [asyncio.Lock() for _ in range(self.size)]
+        await asyncio.gather(*(s.start() for s in self._sessions))
+
+        listed = await self._sessions[0].session.list_tools()
+        self._mcp_tools = listed.tools
+        self._read_only = {
+            t.name for t in listed.tools if t.annotations and t.annotations.readOnlyHint
+        }
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"[MCP] 連線池啟動: {self.size} 個 session，唯讀工具 {sorted(self._read_only)}")
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*(s.stop() for s in self._sessions))
+        self._sessions = []
+
+    async def get_tools(self) -> list[StructuredTool]:
+        """將 server 的 tools 包成 LangChain tools，呼叫時經由連線池分派"""
+        return [self._to_langchain_tool(t) for t in self._mcp_tools]
+
+    def _to_langchain_tool(self, tool) -> StructuredTool:
+        async def call(**arguments):
+            return await self.call_tool(tool.name, arguments)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or "",
+            args_schema=tool.inputSchema,
+            coroutine=call,
+            handle_tool_error=True,
+        )
+
+    def _pick(self, read_only: bool) -> int:
+        if not read_only:
+            return 0
+        return next(self._round_robin) % len(self._sessions)
+
+    async def _respawn(self, i: int) -> None:
+        async with self._respawn_locks[i]:
+            session = self._sessions[i]
+            if session.alive:
+                return
+            logger.info(f"[MCP] 重新啟動 session #{i}（{session.error}）")
+            await session.stop()
+            await session.start()
+            self.respawns += 1
+
+    async def call_tool(self, name: str, arguments: dict) -> str:
+        """呼叫 tool，回傳文字結果（tool 執行錯誤時拋出 ToolException）"""
+        read_only = name in self._read_only
+        attempts = 2 if read_only else 1
+
+        for attempt in range(attempts):
+            i = self._pick(read_only)
+            if not self._sessions[i].alive:
+                await self._respawn(i)
+            session = self._sessions[i]
+            try:
+                result = await asyncio.wait_for(
+                    session.session.call_tool(name, arguments), self.call_timeout
+                )
+                break
+            except McpError:
+                # 協定層錯誤（如參數不符），不是連線問題
+                raise
+            except Exception as e:
+                # 逾時或連線中斷：停掉這個 session，下次使用時重新啟動
+                logger.info(f"[MCP] session #{i} 呼叫 {name} 失敗: {e!r}")
+                session.error = e
+                await session.stop()
+                if attempt + 1 == attempts:
+                    raise
+
+        text = "\n".join(c.text for c in result.content if c.type == "text")
+        if result.isError:
+            raise ToolException(text)
+        return text
+
+    async def health_check(self) -> None:
+        """ping 每個 session，重新啟動沒有回應的 server process"""
+        for i, session in enumerate(self._sessions):
+            if session.alive:
+                try:
+                    await asyncio.wait_for(session.session.send_ping(), self.call_timeout)
+                    continue
+                except Exception as e:
+                    session.error = e
+                    await session.stop()
+            await self._respawn(i)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.info(f"[MCP] health check 失敗: {e!r}")
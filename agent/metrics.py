@@ -0,0 +1,201 @@
+"""
+簡易統計 - 以固定 bucket 的直方圖記錄數值分佈（如 ReAct 回合數、延遲），以及累加的計數器
+
+- 直方圖另保留有上限的樣本（reservoir sampling），用於計算 p50/p95/p99
+- 指標可帶 labels（如 node="classify"），同名不同 labels 為不同的時間序列
+- render_prometheus() 輸出 Prometheus 文字格式（可寫入 node_exporter textfile collector 的目錄）
+"""
+
+import os
+import random
+import re
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+# 每個直方圖保留的樣本數上限（超過後以 reservoir sampling 均勻取樣）
+RESERVOIR_SIZE = 4096
+# Prometheus 指標名稱前綴
+PROMETHEUS_PREFIX = "email_agent_"
+
+
+def _label_text(labels: dict[str, str]) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+
+
+class Histogram:
+    """固定 bucket 直方圖：bucket 為各區間上限（含），超過最後一個上限的落在 +Inf"""
+
+    def __init__(self, name: str, buckets: list[float], labels: dict[str, str] | None = None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.samples: list[float] = []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        """顯示用名稱（含 labels）"""
+        return f"{self.name}{{{_label_text(self.labels)}}}" if self.labels else self.name
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.n += 1
+            if len(self.samples) < RESERVOIR_SIZE:
+                self.samples.append(value)
+            else:
+                i = self._random.randrange(self.n)
+                if i < RESERVOIR_SIZE:
+                    self.samples[i] = value
+
+    def quantile(self, q: float) -> float | None:
+        """第 q 分位數（0 <= q <= 1，nearest-rank）；沒有資料時回傳 None"""
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        rank = max(1, min(len(samples), round(q * len(samples) + 0.5)))
+        return samples[rank - 1]
+
+    def render(self, width: int = 30) -> list[str]:
+        """文字直方圖，每個 bucket 一行"""
+        if not self.n:
+            return [f"{self.label}: 無資料"]
+        lines = [f"{self.label}（n={self.n}，平均 {self.total / self.n:.2f}）"]
+        peak = max(self.counts)
+        labels = [f"<= {b:g}" for b in self.buckets] + [f"> {self.buckets[-1]:g}"]
+        for label, count in zip(labels, self.counts):
+            bar = "#" * round(width * count / peak) if peak else ""
+            lines.append(f"   {label:>8} | {bar} {count}")
+        return lines
+
+
+def render_quantiles(
+    hists: list[Histogram],
+    label: str,
+    quantiles: tuple[float, ...] = (0.5, 0.95, 0.99),
+    scale: float = 1000,
+) -> list[str]:
+    """各直方圖（依 label 區分，如 node / tool）的分位數表，數值乘上 scale（預設秒 → 毫秒）"""
+    names = [h.labels.get(label, h.name) for h in hists]
+    width = max([20, *map(len, names)])
+    header = "".join(f"{f'p{q * 100:g}':>9}" for q in quantiles)
+    lines = [f"{label:<{width}} {'n':>6}{header}"]
+    for name, h in zip(names, hists):
+        values = "".join(f"{h.quantile(q) * scale:>9.1f}" for q in quantiles)
+        lines.append(f"{name:<{width}} {h.n:>6}{values}")
+    return lines
+
+
+class Counter:
+    """只增不減的計數器（如 token 數、工具呼叫次數）"""
+
+    def __init__(self, name: str, labels: dict[str, str] | None = None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}{{{_label_text(self.labels)}}}" if self.labels else self.name
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+_registry: dict[tuple, Histogram] = {}
+_counters: dict[tuple, Counter] = {}
+_registry_lock = threading.Lock()
+
+
+def _key(name: str, labels: dict[str, str] | None) -> tuple:
+    return (name, tuple(sorted((labels or {}).items())))
+
+
+def histogram(name: str, buckets: list[float], labels: dict[str, str] | None = None) -> Histogram:
+    """取得（或建立）具名直方圖"""
+    key = _key(name, labels)
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = Histogram(name, buckets, labels)
+        return _registry[key]
+
+
+def histograms(prefix: str = "") -> list[Histogram]:
+    """依名稱排序列出（指定前綴的）直方圖"""
+    with _registry_lock:
+        return [h for key, h in sorted(_registry.items()) if key[0].startswith(prefix)]
+
+
+def counter(name: str, labels: dict[str, str] | None = None) -> Counter:
+    """取得（或建立）具名計數器"""
+    key = _key(name, labels)
+    with _registry_lock:
+        if key not in _counters:
+            _counters[key] = Counter(name, labels)
+        return _counters[key]
+
+
+def counters(prefix: str = "") -> list[Counter]:
+    """依名稱排序列出（指定前綴的）計數器"""
+    with _registry_lock:
+        return [c for key, c in sorted(_counters.items()) if key[0].startswith(prefix)]
+
+
+def _prometheus_name(name: str) -> str:
+    return PROMETHEUS_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _prometheus_labels(labels: dict[str, str], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items())]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """所有指標的 Prometheus 文字格式（text exposition format 0.0.4）"""
+    lines = []
+    typed = set()
+    for c in counters():
+        name = _prometheus_name(c.name) + "_total"
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_prometheus_labels(c.labels)} {c.value:g}")
+    for h in histograms():
+        name = _prometheus_name(h.name)
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        with h._lock:
+            counts, total, n = list(h.counts), h.total, h.n
+        cumulative = 0
+        for bound, count in zip(h.buckets + [None], counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound is None else f'le="{bound:g}"'
+            lines.append(f"{name}_bucket{_prometheus_labels(h.labels, le)} {cumulative}")
+        lines.append(f"{name}_sum{_prometheus_labels(h.labels)} {total:g}")
+        lines.append(f"{name}_count{_prometheus_labels(h.labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: Path | str) -> None:
+    """以「寫暫存檔 → os.replace」原子性寫出 render_prometheus()（collector 不會讀到寫一半的檔案）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(render_prometheus(), encoding="utf-8")
+    os.replace(tmp, path)
@@ -5,11 +5,13 @@
 import logging
 from typing import Literal
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 from pydantic import BaseModel, Field
 
 from ..state import AgentState
-from ..llm import get_llm
+from ..cache import ainvoke_cached
+from ..rules import get_pre_classifier
 
 logger = logging.getLogger("agent")
 
@@ -43,28 +45,30 @@ SYSTEM_PROMPT = """你是一個郵件分類助理。請分析郵件並分類。
 """
 
 
-def classify(state: AgentState) -> Command[Literal["meeting_agent", "generate_reply", "finalize"]]:
+async def classify(state: AgentState, config: RunnableConfig) -> Command[Literal["meeting_agent", "generate_reply", "finalize"]]:
     """分類郵件，並根據結果路由"""
     email = state["email"]
 
     logger.info(f"[Classify] 分類郵件: {email['subject']}")
 
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(ClassificationResult)
-
-    # 分離 system/user message（支援 prompt cache）
-    messages = [
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=f"""請分類以下郵件：
-
-寄件者: {email["sender"]}
-主題: {email["subject"]}
-時間: {email["timestamp"]}
-內容: {email["content"]}
-"""),
-    ]
-
-    result: ClassificationResult = structured_llm.invoke(messages)
+    # 批次處理時由 GraphRunner 提供共用的 LLM client、回應快取與規則預分類器
+    configurable = config.get("configurable", {})
+    pre_classifier = configurable.get("pre_classifier") or get_pre_classifier()
+
+    if state.get("category"):
+        # run.py 已用批次分類處理過
+        logger.info("[Classify] 使用批次預分類結果")
+        result = ClassificationResult(
+            category=state["category"],
+            priority=state["priority"],
+            reasoning=state["reasoning"],
+        )
+    elif matched := pre_classifier.classify(email):
+        # 明顯的郵件（no-reply、已知垃圾網域等）直接由規則分類，不呼叫 LLM
+        logger.info("[Classify] 規則命中，略過 LLM")
+        result = ClassificationResult(**matched)
+    else:
+        result = await classify_with_llm(email, configurable.get("llm"), configurable.get("cache"))
 
     logger.info(f"[Classify] 結果: {result.category} (優先級 {result.priority})")
     logger.info(f"[Classify] 理由: {result.reasoning}")
@@ -87,3 +91,26 @@ def classify(state: AgentState) -> Command[Literal["meeting_agent", "generate_re
         },
         goto=next_node,
     )
+
+
+def render_email(email: dict) -> str:
+    """郵件的 prompt 表示（單封與批次分類共用）"""
+    return f"""寄件者: {email["sender"]}
+主題: {email["subject"]}
+時間: {email["timestamp"]}
+內容: {email["content"]}
+"""
+
+
+async def classify_with_llm(email: dict, llm=None, cache=None) -> ClassificationResult:
+    """以 LLM 分類單封郵件"""
+    # 分離 system/user message（支援 prompt cache）
+    messages = [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=f"""請分類以下郵件：
+
+{render_email(email)}"""),
+    ]
+
+    # 非同步呼叫，等待網路回應時不阻塞 event loop，其他郵件可同時處理
+    return await ainvoke_cached(ClassificationResult, messages, llm, cache)
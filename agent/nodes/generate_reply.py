@@ -5,11 +5,12 @@
 import logging
 from typing import Literal
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 from pydantic import BaseModel, Field
 
 from ..state import AgentState
-from ..llm import get_llm
+from ..cache import ainvoke_cached
 
 logger = logging.getLogger("agent")
 
@@ -38,7 +39,7 @@ SYSTEM_PROMPT = """你是一個郵件回覆助理。請根據郵件資訊生成
 """
 
 
-def generate_reply(state: AgentState) -> Command[Literal["check_guardrails", "finalize"]]:
+async def generate_reply(state: AgentState, config: RunnableConfig) -> Command[Literal["check_guardrails", "finalize"]]:
     """生成回覆"""
     category = state.get("category", "")
     email = state["email"]
@@ -59,8 +60,8 @@ def generate_reply(state: AgentState) -> Command[Literal["check_guardrails", "fi
     meeting_info = state.get("meeting_info")
     meeting_info_str = "無" if not meeting_info else str(meeting_info)
 
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(ReplyResult)
+    # 批次處理時由 GraphRunner 提供共用的 LLM client 與回應快取
+    configurable = config.get("configurable", {})
 
     # 分離 system/user message（支援 prompt cache）
     messages = [
@@ -88,7 +89,9 @@ def generate_reply(state: AgentState) -> Command[Literal["check_guardrails", "fi
 """),
     ]
 
-    result: ReplyResult = structured_llm.invoke(messages)
+    result: ReplyResult = await ainvoke_cached(
+        ReplyResult, messages, configurable.get("llm"), configurable.get("cache")
+    )
 
     if result.needs_reply:
         logger.info(f"[Reply] 生成回覆: {result.reply[:100]}...")
@@ -5,19 +5,29 @@ LLM 自主決定呼叫 MCP Tools（從 Server 動態取得）
 """
 
 import logging
+import time
+from contextlib import nullcontext
 from typing import Literal, Optional
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 from langgraph.prebuilt import create_react_agent
 
 from ..state import AgentState
 from ..mcp_client import get_mcp_tools
 from ..llm import get_llm
+from ..metrics import histogram
+from ..tracing import NODE_LATENCY_BUCKETS
+from ..preflight import run_preflight, render_preflight
 
 # Agent Logger
 agent_logger = logging.getLogger("agent")
 
+# ReAct 回合數（AIMessage 數）與延遲（秒）的 bucket
+TURN_BUCKETS = [1, 2, 3, 4, 5, 6, 8, 10]
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60]
+
 
 class MeetingResult(BaseModel):
     """會議處理結果"""
@@ -40,9 +50,10 @@ SYSTEM_PROMPT = """你是會議排程助理。
 1. 確認日期是否為工作日（週末和國定假日不可安排會議）
 2. 確認時段是否有衝突
 3. 兩者皆通過才能新增會議；否則建議 2-3 個替代時段
-4. 改期請求需先移除舊會議再新增新會議
+4. 改期請求以 move_calendar_event 一次完成（不要先刪除再新增）
 
 請善用可用的工具來完成任務。務必確保 is_working_day 欄位正確反映日期檢查結果。
+若訊息中已附上「預先查詢結果」，請直接採用，不要重複查詢相同的資訊。
 """
 
 
@@ -72,17 +83,44 @@ def _log_messages(messages: list) -> None:
                 agent_logger.info(f"[Agent] LLM: {content}")
 
 
-async def meeting_agent(state: AgentState) -> Command[Literal["generate_reply"]]:
-    """會議處理 - ReAct Agent with Pydantic structured output"""
+async def meeting_agent(state: AgentState, config: RunnableConfig) -> Command[Literal["generate_reply"]]:
+    """會議處理 - ReAct Agent with Pydantic structured output
+
+    並行模式下會等待 turnstile 輪到本郵件，確保行事曆操作依郵件順序執行。
+    """
+    configurable = config.get("configurable", {})
+    turnstile = configurable.get("turnstile")
+    gate = turnstile.turn(configurable.get("seq", 0)) if turnstile else nullcontext()
+
+    started = time.perf_counter()
+    async with gate:
+        if turnstile:
+            # 節點延遲包含輪候時間，另外記錄以便區分
+            histogram("node.wait", NODE_LATENCY_BUCKETS, {"node": "meeting_agent"}).observe(time.perf_counter() - started)
+        return await _run_meeting_agent(state, configurable)
+
+
+async def _run_meeting_agent(state: AgentState, configurable: dict) -> Command[Literal["generate_reply"]]:
     email = state["email"]
     today = state["today"]
 
     agent_logger.info(f"[Agent] === 處理會議邀約: {email['subject']} ===")
 
-    # 從 MCP Server 動態取得 Tools
-    tools = await get_mcp_tools()
-
-    llm = get_llm()
+    # 從 MCP Server 動態取得 Tools（批次處理時由 GraphRunner 提供）
+    get_tools = configurable.get("get_tools") or get_mcp_tools
+    tools = await get_tools()
+
+    # 預查：確定性地抽取日期時段並直接查詢工作日與衝突（不經 LLM）
+    facts = None
+    if configurable.get("preflight", True):
+        try:
+            facts = await run_preflight(email, today, tools)
+        except Exception as e:
+            agent_logger.info(f"[Agent] 預查失敗，交由 LLM 自行查詢: {e!r}")
+    if facts:
+        agent_logger.info(f"[Agent] 預查: {facts['proposal']}")
+
+    llm = configurable.get("llm") or get_llm()
     agent = create_react_agent(
         llm,
         tools,
@@ -98,12 +136,23 @@ async def meeting_agent(state: AgentState) -> Command[Literal["generate_reply"]]
 主題: {email["subject"]}
 內容: {email["content"]}
 """
+    if facts:
+        user_message += "\n" + render_preflight(facts) + "\n"
 
+    started = time.perf_counter()
     result = await agent.ainvoke({"messages": [HumanMessage(content=user_message)]})
+    elapsed = time.perf_counter() - started
 
     # Log 執行過程
     _log_messages(result["messages"])
 
+    # 依是否有預查結果分開統計，方便比較
+    mode = "preflight" if facts else "baseline"
+    turns = sum(1 for m in result["messages"] if isinstance(m, AIMessage))
+    histogram(f"meeting.turns.{mode}", TURN_BUCKETS).observe(turns)
+    histogram(f"meeting.latency.{mode}", LATENCY_BUCKETS).observe(elapsed)
+    agent_logger.info(f"[Agent] 回合數: {turns}，耗時 {elapsed:.2f}s")
+
     structured: MeetingResult = result["structured_response"]
 
     agent_logger.info(f"[Agent] 結果: date={structured.date}, is_working_day={structured.is_working_day}, "
@@ -0,0 +1,242 @@
+"""
+會議預查 - 在 ReAct loop 之前，先以確定性規則抽取邀約的日期與時段，
+直接呼叫 MCP 工具（不經 LLM）檢查工作日與衝突，將結果放進 prompt。
+
+LLM 原本要花 3-5 個回合依序呼叫 check_working_day → get_calendar_events → add_calendar_event；
+預查後通常一個回合就能決定（最多再呼叫一次寫入工具）。
+抽取不到日期時回傳 None，meeting_agent 照原本流程讓 LLM 自行查詢。
+"""
+
+import json
+import re
+from datetime import date, datetime, timedelta
+
+DEFAULT_DURATION = timedelta(hours=1)
+
+_DATE_RE = re.compile(r"(?<![\d/])(\d{1,2})\s*/\s*(\d{1,2})(?![\d/])")
+_RELATIVE_RE = re.compile(r"(今天|明天|後天)")
+_RELATIVE_DAYS = {"今天": 0, "明天": 1, "後天": 2}
+_RESCHEDULE_RE = re.compile(r"(改到|改成|改期到|改期至|挪到|延到|移到)")
+_PERIOD = r"(上午|早上|中午|下午|晚上)?\s*"
+_RANGE_RE = re.compile(
+    _PERIOD + r"(\d{1,2})(?:[:：](\d{2}))?\s*點?\s*[~～\-－到至]\s*(\d{1,2})(?:[:：](\d{2}))?\s*點"
+    r"|" + _PERIOD + r"(\d{1,2})[:：](\d{2})\s*[~～\-－到至]\s*(\d{1,2})[:：](\d{2})"
+)
+_TIME_RE = re.compile(_PERIOD + r"(\d{1,2})(?:[:：](\d{2})|\s*點(半)?)")
+_NOON_RE = re.compile(r"中午")
+_DURATION_RE = re.compile(r"(半個?小時)|(\d+(?:\.\d+)?)\s*個?小時|(\d+)\s*分鐘")
+
+
+def _hour(period: str | None, hour: int) -> int:
+    if period in ("下午", "晚上") and hour < 12:
+        return hour + 12
+    if period == "中午" and hour < 6:
+        return hour + 12
+    return hour
+
+
+def _find_date(text: str, today: date) -> tuple[date, int] | None:
+    """找出第一個日期（M/D 或 今天/明天/後天），回傳 (日期, 結束位置)"""
+    m = _DATE_RE.search(text)
+    if m:
+        month, day = int(m.group(1)), int(m.group(2))
+        try:
+            d = date(today.year, month, day)
+        except ValueError:
+            return None
+        if d < today - timedelta(days=180):
+            d = d.replace(year=today.year + 1)
+        return d, m.end()
+    m = _RELATIVE_RE.search(text)
+    if m:
+        return today + timedelta(days=_RELATIVE_DAYS[m.group(1)]), m.end()
+    return None
+
+
+def _find_time(text: str) -> tuple[tuple[int, int], tuple[int, int] | None] | None:
+    """找出時段，回傳 ((時, 分), (結束時, 分) 或 None)"""
+    m = _RANGE_RE.search(text)
+    if m:
+        if m.group(2) is not None:
+            period, h1, m1, h2, m2 = m.group(1, 2, 3, 4, 5)
+        else:
+            period, h1, m1, h2, m2 = m.group(6, 7, 8, 9, 10)
+        start = (_hour(period, int(h1)), int(m1 or 0))
+        end = (_hour(period, int(h2)), int(m2 or 0))
+        if end > start:
+            return start, end
+    m = _TIME_RE.search(text)
+    if m:
+        period, h, minute, half = m.groups()
+        return (_hour(period, int(h)), int(minute or (30 if half else 0))), None
+    if _NOON_RE.search(text):
+        return (12, 0), None
+    return None
+
+
+def _find_duration(text: str) -> timedelta:
+    m = _DURATION_RE.search(text)
+    if not m:
+        return DEFAULT_DURATION
+    if m.group(1):
+        return timedelta(minutes=30)
+    if m.group(2):
+        return timedelta(hours=float(m.group(2)))
+    return timedelta(minutes=int(m.group(3)))
+
+
+def extract_proposal(email: dict, today: str) -> dict | None:
+    """從郵件抽取邀約時段
+
+    Returns:
+        {date, start, end, is_reschedule, original_date}；start/end 找不到時為 None。
+        找不到日期時回傳 None。
+    """
+    today_d = date.fromisoformat(today)
+    text = f"{email['subject']}\n{email['content']}"
+
+    is_reschedule = False
+    original = None
+    segment = email["content"]
+    m = _RESCHEDULE_RE.search(email["content"])
+    if m:
+        # 「1/27 ... 改到 1/23 下午 2 ~ 4 點」：關鍵詞之後是新時段，之前是原時段
+        is_reschedule = True
+        before = _find_date(email["content"][:m.start()], today_d) or _find_date(email["subject"], today_d)
+        original = before[0] if before else None
+        segment = email["content"][m.end():]
+
+    found = _find_date(segment, today_d)
+    if found is None and not is_reschedule:
+        found = _find_date(text, today_d)
+        segment = text
+    if found is None:
+        return None
+    d, pos = found
+
+    # 時段通常跟在日期後面，找不到再看整段
+    times = _find_time(segment[pos:]) or _find_time(segment)
+    start = end = None
+    if times:
+        (h1, m1), end_hm = times
+        start = datetime.combine(d, datetime.min.time()).replace(hour=h1, minute=m1)
+        if end_hm:
+            end = start.replace(hour=end_hm[0], minute=end_hm[1])
+        else:
+            end = start + _find_duration(email["content"])
+
+    return {
+        "date": d.isoformat(),
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "is_reschedule": is_reschedule,
+        "original_date": original.isoformat() if original else None,
+    }
+
+
+def _parse_tool_output(output) -> list:
+    """解析 MCP tool 回傳的文字（可能是多個連續的 JSON 值）"""
+    if isinstance(output, list):
+        output = "\n".join(b["text"] if isinstance(b, dict) else str(b) for b in output)
+    decoder = json.JSONDecoder()
+    values, i, text = [], 0, output.strip()
+    while i < len(text):
+        value, i = decoder.raw_decode(text, i)
+        values.extend(value if isinstance(value, list) else [value])
+        while i < len(text) and text[i].isspace():
+            i += 1
+    return values
+
+
+def _span(event: dict) -> str:
+    event_id = f"，id={event['id']}" if "id" in event else ""
+    return f"{event['title']}（{event['start'][11:16]}-{event['end'][11:16]}{event_id}）"
+
+
+async def run_preflight(email: dict, today: str, tools: list) -> dict | None:
+    """抽取邀約時段並直接呼叫工具檢查
+
+    Returns:
+        {proposal, working_day, conflicts, free_slots, original_events}；抽取不到日期時回傳 None
+    """
+    by_name = {t.name: t for t in tools}
+    if "check_working_day" not in by_name or "get_calendar_events" not in by_name:
+        return None
+
+    proposal = extract_proposal(email, today)
+    if proposal is None:
+        return None
+
+    working_day = _parse_tool_output(
+        await by_name["check_working_day"].ainvoke({"date_str": proposal["date"]})
+    )[0]
+
+    conflicts = None
+    if proposal["start"] and working_day["is_working"]:
+        conflicts = _parse_tool_output(await by_name["get_calendar_events"].ainvoke({
+            "start_date": proposal["start"],
+            "end_date": proposal["end"],
+        }))
+
+    # 無法安排時一併查詢替代時段（server 有提供 find_free_slots 時）
+    free_slots = None
+    blocked = not working_day["is_working"] or bool(conflicts)
+    if blocked and "find_free_slots" in by_name:
+        args = {"start_date": proposal["date"], "max_results": 3}
+        if proposal["start"]:
+            length = datetime.fromisoformat(proposal["end"]) - datetime.fromisoformat(proposal["start"])
+            args["duration_minutes"] = int(length.total_seconds() // 60)
+        free_slots = _parse_tool_output(await by_name["find_free_slots"].ainvoke(args))
+
+    original_events = None
+    if proposal["original_date"]:
+        d = date.fromisoformat(proposal["original_date"])
+        original_events = _parse_tool_output(await by_name["get_calendar_events"].ainvoke({
+            "start_date": d.isoformat(),
+            "end_date": (d + timedelta(days=1)).isoformat(),
+        }))
+
+    return {
+        "proposal": proposal,
+        "working_day": working_day,
+        "conflicts": conflicts,
+        "free_slots": free_slots,
+        "original_events": original_events,
+    }
+
+
+def render_preflight(facts: dict) -> str:
+    """將預查結果整理成 prompt 段落"""
+    p = facts["proposal"]
+    wd = facts["working_day"]
+    lines = ["## 預先查詢結果（系統已直接呼叫工具確認，可直接採用，不需重複查詢）"]
+
+    if p["start"]:
+        lines.append(f"- 推算的邀約時段: {p['date']} {p['start'][11:16]}-{p['end'][11:16]}"
+                     "（依郵件內容推算；若與郵件不符，請自行查詢）")
+    else:
+        lines.append(f"- 推算的邀約日期: {p['date']}（郵件未明確指定時間）")
+
+    if wd["is_working"]:
+        lines.append(f"- {p['date']} 是工作日")
+    else:
+        lines.append(f"- {p['date']} 不是工作日（{wd.get('reason')}），"
+                     f"建議替代日期: {', '.join(wd.get('suggested_alternatives', []))}")
+
+    if facts["conflicts"] is not None:
+        if facts["conflicts"]:
+            lines.append("- 該時段既有行程（衝突）: " + "、".join(_span(e) for e in facts["conflicts"]))
+        else:
+            lines.append("- 該時段沒有既有行程（無衝突）")
+
+    if facts.get("free_slots"):
+        lines.append("- 可用的替代時段: " + "、".join(
+            f"{s['start'][:10]} {s['start'][11:16]}-{s['end'][11:16]}" for s in facts["free_slots"]
+        ))
+
+    if p["is_reschedule"]:
+        lines.append(f"- 改期請求，原會議日期: {p['original_date'] or '未知'}")
+        if facts["original_events"]:
+            lines.append("- 原日期的行程: " + "、".join(_span(e) for e in facts["original_events"]))
+
+    return "\n".join(lines)
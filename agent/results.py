@@ -0,0 +1,118 @@
+"""
+處理結果的增量輸出 - 每處理完一封郵件就寫入一行 JSONL，並更新 checkpoint
+
+- results.jsonl：依郵件順序，每封一行 {"seq": 序號, ...結果}，寫入後立即 flush + fsync
+- checkpoint.json：最後一封已寫入的郵件（processed 封數、last_id）、results.jsonl 的有效長度，
+  以及該郵件處理完時的行事曆版本（calendar_version），以「寫暫存檔 → os.replace」原子性更新
+
+當機後以 resume 開啟：results.jsonl 截到 checkpoint 記錄的長度（丟掉寫了結果但還沒更新 checkpoint 的尾行），
+收件匣跳過前 processed 封，行事曆還原到 calendar_version（撤銷之後才寫入、但結果還沒寫入的郵件所做的修改），
+接續處理。記憶體不隨郵件數成長，最終統計再從 results.jsonl 串流讀回。
+"""
+
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+DEFAULT_DIR = Path(__file__).parent.parent / "output"
+
+
+class ResultLog:
+    """results.jsonl + checkpoint.json"""
+
+    def __init__(self, directory: Path | str = DEFAULT_DIR, fsync: bool = True):
+        directory = Path(directory)
+        self.path = directory / "results.jsonl"
+        self.checkpoint_path = directory / "checkpoint.json"
+        self.fsync = fsync
+        self.processed = 0
+        self.last_id: str | None = None
+        self.calendar_version: int | None = None
+        self._file = None
+
+    def load_checkpoint(self) -> dict | None:
+        if not self.checkpoint_path.exists():
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def open(self, resume: bool = False) -> dict | None:
+        """開始寫入；resume 時接續 checkpoint 並回傳它（沒有 checkpoint 時從頭開始，回傳 None）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = self.load_checkpoint() if resume else None
+        if checkpoint is None:
+            self.checkpoint_path.unlink(missing_ok=True)
+            self._file = open(self.path, "wb")
+            return None
+
+        self._file = open(self.path, "r+b")
+        self._file.truncate(checkpoint["offset"])
+        self._file.seek(checkpoint["offset"])
+        self.processed = checkpoint["processed"]
+        self.last_id = checkpoint["last_id"]
+        self.calendar_version = checkpoint.get("calendar_version")
+        return checkpoint
+
+    def append(self, email: dict, result: dict, calendar_version: int | None = None) -> None:
+        """寫入一封郵件的結果並更新 checkpoint（calendar_version 為這封郵件處理完時的行事曆版本）"""
+        record = {"seq": self.processed, **result}
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.processed += 1
+        self.last_id = email["id"]
+        if calendar_version is not None:
+            self.calendar_version = calendar_version
+        self._write_checkpoint()
+
+    def set_calendar_version(self, version: int) -> None:
+        """更新 checkpoint 記錄的行事曆版本（resume 還原行事曆後，版本號已往前遞增）"""
+        self.calendar_version = version
+        self._write_checkpoint()
+
+    def _write_checkpoint(self) -> None:
+        checkpoint = {"processed": self.processed, "last_id": self.last_id, "offset": self._file.tell()}
+        if self.calendar_version is not None:
+            checkpoint["calendar_version"] = self.calendar_version
+        tmp = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def skip_processed(self, emails: Iterable[dict]) -> Iterable[dict]:
+        """跳過 checkpoint 之前已處理的郵件（list 回傳切片，串流則先讀過已處理的部分）
+
+        Raises:
+            ValueError: 收件匣第 processed 封的 id 與 checkpoint 不符（收件匣已變動）
+        """
+        if not self.processed:
+            return emails
+        if isinstance(emails, list):
+            last = emails[self.processed - 1] if len(emails) >= self.processed else None
+            remaining = emails[self.processed:]
+        else:
+            remaining = iter(emails)
+            last = None
+            for last in islice(remaining, self.processed):
+                pass
+        if last is None or last["id"] != self.last_id:
+            found = last["id"] if last else "（收件匣已結束）"
+            raise ValueError(f"收件匣與 checkpoint 不符：第 {self.processed} 封應為 {self.last_id}，實際為 {found}")
+        return remaining
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def results(self) -> Iterator[dict]:
+        """逐筆讀回 results.jsonl（含 resume 之前的結果）"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
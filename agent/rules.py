@@ -0,0 +1,205 @@
+"""
+規則式預分類 - 在 classify 呼叫 LLM 之前，先以確定性規則處理明顯的郵件
+
+規則來源（皆可由 JSON 設定檔覆寫，見 DEFAULT_RULES 的結構）：
+- sender_patterns：寄件者正規表示式（如 no-reply / noreply）
+- sender_local_parts：寄件者 @ 前的帳號名稱（如 newsletter）
+- sender_domains：寄件者網域表（含上層網域，如 mail.spam.com 命中 spam.com）
+- subject_patterns：主題正規表示式（如 【限時優惠】）
+- keywords：以 Aho–Corasick 一次掃描主題與內容的關鍵詞，每個命中的詞累加 weight
+
+每條規則對某分類給出 confidence，同分類累加（上限 1.0）。
+最高分達到 threshold 且沒有其他分類同樣達標時，直接回傳分類結果；
+否則回傳 None，交由 LLM 分類。
+
+設定檔路徑可由環境變數 CLASSIFY_RULES_PATH 指定。
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+from pathlib import Path
+
+DEFAULT_THRESHOLD = 0.9
+
+DEFAULT_RULES = {
+    "threshold": DEFAULT_THRESHOLD,
+    "sender_patterns": [
+        {"pattern": r"^(no-?reply|do-?not-?reply)@", "category": "一般", "priority": 1,
+         "confidence": 0.95, "reason": "自動發送的通知（no-reply 寄件者）"},
+    ],
+    "sender_local_parts": {
+        "newsletter": {"category": "垃圾", "priority": 1, "confidence": 0.9, "reason": "Newsletter 寄件者"},
+        "marketing": {"category": "垃圾", "priority": 1, "confidence": 0.6, "reason": "行銷寄件者"},
+        "promo": {"category": "垃圾", "priority": 1, "confidence": 0.6, "reason": "促銷寄件者"},
+    },
+    "sender_domains": {
+        "spam_service.net": {"category": "垃圾", "priority": 1, "confidence": 0.95, "reason": "已知垃圾郵件網域"},
+    },
+    "subject_patterns": [
+        {"pattern": r"^【\s*(限時優惠|限時特價|促銷|獨家優惠|免費試用)\s*】", "category": "垃圾", "priority": 1,
+         "confidence": 0.9, "reason": "主題含促銷標記"},
+    ],
+    "keywords": {
+        "垃圾": {
+            "priority": 1,
+            "weight": 0.35,
+            "words": ["限時優惠", "免費試用", "點擊連結", "保證", "業績成長", "取消訂閱", "unsubscribe"],
+        },
+    },
+}
+
+
+class AhoCorasick:
+    """多關鍵詞比對（Aho–Corasick 自動機），一次掃描找出所有出現的關鍵詞"""
+
+    def __init__(self, words: list[str]):
+        # goto[state][char] -> state；output[state] -> 在此狀態結束的關鍵詞
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[str]] = [[]]
+
+        for word in words:
+            state = 0
+            for ch in word.lower():
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = nxt
+            self._output[state].append(word)
+
+        # BFS 建立 failure link
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find(self, text: str) -> set[str]:
+        """回傳 text 中出現過的關鍵詞"""
+        found = set()
+        state = 0
+        for ch in text.lower():
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._output[state]:
+                found.update(self._output[state])
+        return found
+
+
+class PreClassifier:
+    """規則式預分類器"""
+
+    def __init__(self, rules: dict | None = None):
+        rules = rules or DEFAULT_RULES
+        self.threshold = rules.get("threshold", DEFAULT_THRESHOLD)
+        self._sender_patterns = [(re.compile(r["pattern"], re.I), r) for r in rules.get("sender_patterns", [])]
+        self._local_parts = {k.lower(): v for k, v in rules.get("sender_local_parts", {}).items()}
+        self._domains = {k.lower(): v for k, v in rules.get("sender_domains", {}).items()}
+        self._subject_patterns = [(re.compile(r["pattern"]), r) for r in rules.get("subject_patterns", [])]
+
+        # 關鍵詞 -> (分類, 優先級, 權重)
+        self._keywords: dict[str, tuple[str, int, float]] = {}
+        for category, spec in rules.get("keywords", {}).items():
+            for word in spec["words"]:
+                self._keywords[word] = (category, spec["priority"], spec["weight"])
+        self._matcher = AhoCorasick(list(self._keywords))
+
+        self._lock = threading.Lock()
+        self.total = 0
+        self.matched = 0
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "PreClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _domain_rule(self, domain: str) -> dict | None:
+        # 由完整網域往上層找（mail.spam.com → spam.com）
+        parts = domain.split(".")
+        for i in range(len(parts) - 1):
+            rule = self._domains.get(".".join(parts[i:]))
+            if rule:
+                return rule
+        return None
+
+    def classify(self, email: dict) -> dict | None:
+        """規則分類，回傳 {category, priority, reasoning}；信心不足時回傳 None"""
+        sender = email["sender"].lower()
+        local, _, domain = sender.partition("@")
+        subject = email["subject"]
+
+        # 分類 -> [分數, 優先級, 理由]
+        scores: dict[str, list] = {}
+
+        def hit(category: str, priority: int, confidence: float, reason: str):
+            entry = scores.setdefault(category, [0.0, priority, []])
+            entry[0] = min(1.0, entry[0] + confidence)
+            entry[1] = min(entry[1], priority)
+            entry[2].append(reason)
+
+        for pattern, rule in self._sender_patterns:
+            if pattern.search(sender):
+                hit(rule["category"], rule["priority"], rule["confidence"], rule["reason"])
+
+        rule = self._local_parts.get(local)
+        if rule:
+            hit(rule["category"], rule["priority"], rule["confidence"], rule["reason"])
+
+        rule = self._domain_rule(domain)
+        if rule:
+            hit(rule["category"], rule["priority"], rule["confidence"], f"{rule['reason']}（{domain}）")
+
+        for pattern, rule in self._subject_patterns:
+            if pattern.search(subject):
+                hit(rule["category"], rule["priority"], rule["confidence"], rule["reason"])
+
+        for word in sorted(self._matcher.find(f"{subject}\n{email['content']}")):
+            category, priority, weight = self._keywords[word]
+            hit(category, priority, weight, f"關鍵詞「{word}」")
+
+        confident = [(c, v) for c, v in scores.items() if v[0] >= self.threshold]
+
+        with self._lock:
+            self.total += 1
+            if len(confident) != 1:
+                return None
+            self.matched += 1
+
+        category, (_, priority, reasons) = confident[0]
+        return {
+            "category": category,
+            "priority": priority,
+            "reasoning": "規則判斷：" + "、".join(reasons),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "total": self.total,
+            "matched": self.matched,
+            "skip_ratio": self.matched / self.total if self.total else 0.0,
+        }
+
+
+# 預設預分類器（環境變數 CLASSIFY_RULES_PATH 可指定規則檔）
+_default_pre_classifier: PreClassifier | None = None
+
+
+def get_pre_classifier() -> PreClassifier:
+    global _default_pre_classifier
+    if _default_pre_classifier is None:
+        path = os.getenv("CLASSIFY_RULES_PATH")
+        _default_pre_classifier = PreClassifier.from_file(path) if path else PreClassifier()
+    return _default_pre_classifier
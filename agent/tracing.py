@@ -0,0 +1,251 @@
+"""
+結構化量測 - 每封郵件的節點、LLM 與 MCP 工具呼叫 span
+
+GraphRunner 為每封郵件建立一個 EmailTrace（LangChain callback handler），經 config["callbacks"] 傳入 graph；
+節點內的 LLM 與工具呼叫會沿用同一組 callbacks，依 parent_run_id 歸屬到所在的 graph 節點
+（meeting_agent 內層 ReAct agent 的節點也算在 meeting_agent）。
+
+記錄的內容：
+- node：節點牆鐘時間（meeting_agent 含等待 turnstile 的時間）、該節點的 LLM 呼叫次數、token 數與工具呼叫次數
+- llm：每次 LLM 呼叫的延遲與 prompt / completion / cached token（快取命中的呼叫不經 LLM，不會出現）
+- tool：每次工具呼叫的延遲與成功與否
+- email：整封郵件的總計，react_turns 為 meeting_agent 中的 LLM 呼叫次數
+
+span 逐封寫入 SpanLog（JSONL），同時累計到 agent.metrics 的直方圖與計數器（run.py 統計 p50/p95/p99，
+可輸出為 Prometheus 文字格式）。
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from .metrics import counter, histogram
+
+DEFAULT_PATH = Path(__file__).parent.parent / "output" / "spans.jsonl"
+
+# 延遲（秒）的 bucket
+NODE_LATENCY_BUCKETS = [0.001, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60]
+LLM_LATENCY_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 20, 30, 60]
+TOOL_LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5]
+EMAIL_LATENCY_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120]
+
+# 執行 ReAct 迴圈的節點
+REACT_NODE = "meeting_agent"
+
+_TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+class SpanLog:
+    """spans.jsonl：每封郵件處理完後一次寫入它的所有 span"""
+
+    def __init__(self, path: Path | str = DEFAULT_PATH, resume: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, spans: list[dict]) -> None:
+        lines = "".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _usage(response) -> dict:
+    """由 LLMResult 取出 token 用量（usage_metadata；舊版 provider 退回 llm_output["token_usage"]）"""
+    usage = dict.fromkeys(_TOKEN_FIELDS, 0)
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                found = True
+                usage["prompt_tokens"] += metadata.get("input_tokens", 0)
+                usage["completion_tokens"] += metadata.get("output_tokens", 0)
+                usage["cached_tokens"] += (metadata.get("input_token_details") or {}).get("cache_read", 0)
+    if not found:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        usage["prompt_tokens"] = token_usage.get("prompt_tokens", 0)
+        usage["completion_tokens"] = token_usage.get("completion_tokens", 0)
+        usage["cached_tokens"] = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    return usage
+
+
+class EmailTrace(AsyncCallbackHandler):
+    """單封郵件的 span 收集器（重試時沿用同一個，跨次累計）"""
+
+    def __init__(self, email_id: str, sink: SpanLog | None = None):
+        self.email_id = email_id
+        self.sink = sink
+        self.spans: list[dict] = []
+        self.totals = {"llm_calls": 0, **dict.fromkeys(_TOKEN_FIELDS, 0), "tool_calls": 0, "react_turns": 0}
+        self._started = time.time()
+        self._perf = time.perf_counter()
+        # graph 最外層的 run（每次 astream 一個）
+        self._root: UUID | None = None
+        # run_id -> 所屬節點
+        self._node_of: dict[UUID, str | None] = {}
+        # 進行中的 span：run_id -> (span, perf_counter 起點)
+        self._open: dict[UUID, tuple[dict, float]] = {}
+        # 進行中的節點 span：節點名稱 -> span
+        self._node_spans: dict[str, dict] = {}
+
+    def _start(self, run_id: UUID, kind: str, name: str, node: str | None, **fields) -> None:
+        span = {
+            "kind": kind,
+            "email_id": self.email_id,
+            "name": name,
+            "node": node,
+            "start": time.time(),
+            **fields,
+        }
+        self._open[run_id] = (span, time.perf_counter())
+
+    def _end(self, run_id: UUID, error: BaseException | None = None) -> dict | None:
+        item = self._open.pop(run_id, None)
+        if item is None:
+            return None
+        span, started = item
+        elapsed = time.perf_counter() - started
+        span["duration_ms"] = round(elapsed * 1000, 3)
+        span["status"] = "ok" if error is None else "error"
+        if error is not None:
+            span["error"] = repr(error)
+        self.spans.append(span)
+        return span
+
+    def _node_span(self, run_id: UUID) -> dict | None:
+        # run 所屬節點的 span；LLM / 工具的用量同時累加到這裡
+        return self._node_spans.get(self._node_of.get(run_id))
+
+    # --- graph 節點 ---
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        if parent_run_id is None:
+            self._root = run_id
+        elif parent_run_id == self._root and name and (metadata or {}).get("langgraph_node") == name:
+            self._node_of[run_id] = name
+            self._start(run_id, "node", name, name, llm_calls=0, **dict.fromkeys(_TOKEN_FIELDS, 0), tool_calls=0)
+            self._node_spans[name] = self._open[run_id][0]
+        elif parent_run_id in self._node_of:
+            self._node_of[run_id] = self._node_of[parent_run_id]
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish_node(run_id)
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish_node(run_id, error)
+
+    def _finish_node(self, run_id: UUID, error: BaseException | None = None) -> None:
+        self._node_of.pop(run_id, None)
+        if run_id == self._root:
+            self._root = None
+        span = self._end(run_id, error)
+        if span is None or span["kind"] != "node":
+            return
+        self._node_spans.pop(span["name"], None)
+        histogram("node.latency", NODE_LATENCY_BUCKETS, {"node": span["name"]}).observe(span["duration_ms"] / 1000)
+        if error is not None:
+            counter("node.errors", {"node": span["name"]}).inc()
+
+    # --- LLM ---
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._llm_start(run_id, parent_run_id, serialized, metadata)
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._llm_start(run_id, parent_run_id, serialized, metadata)
+
+    def _llm_start(self, run_id: UUID, parent_run_id: UUID | None, serialized: dict | None, metadata: dict | None) -> None:
+        node = self._node_of.get(parent_run_id)
+        self._node_of[run_id] = node
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, "llm", model, node)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        node_span = self._node_span(run_id)
+        span = self._end(run_id)
+        self._node_of.pop(run_id, None)
+        if span is None:
+            return
+        span.update(_usage(response))
+        self._count_llm(span, node_span)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        node_span = self._node_span(run_id)
+        span = self._end(run_id, error)
+        self._node_of.pop(run_id, None)
+        if span is not None:
+            self._count_llm(span, node_span)
+
+    def _count_llm(self, span: dict, node_span: dict | None) -> None:
+        node = span["node"] or "-"
+        self.totals["llm_calls"] += 1
+        if span["node"] == REACT_NODE:
+            self.totals["react_turns"] += 1
+        if node_span is not None:
+            node_span["llm_calls"] += 1
+        histogram("llm.latency", LLM_LATENCY_BUCKETS, {"node": node}).observe(span["duration_ms"] / 1000)
+        counter("llm.calls", {"node": node}).inc()
+        for field in _TOKEN_FIELDS:
+            tokens = span.get(field, 0)
+            self.totals[field] += tokens
+            if node_span is not None:
+                node_span[field] += tokens
+            counter("llm.tokens", {"node": node, "type": field.removesuffix("_tokens")}).inc(tokens)
+
+    # --- MCP 工具 ---
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        node = self._node_of.get(parent_run_id)
+        self._node_of[run_id] = node
+        self._start(run_id, "tool", kwargs.get("name") or (serialized or {}).get("name") or "tool", node)
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, error)
+
+    def _finish_tool(self, run_id: UUID, error: BaseException | None = None) -> None:
+        node_span = self._node_span(run_id)
+        span = self._end(run_id, error)
+        self._node_of.pop(run_id, None)
+        if span is None:
+            return
+        self.totals["tool_calls"] += 1
+        if node_span is not None:
+            node_span["tool_calls"] += 1
+        histogram("tool.latency", TOOL_LATENCY_BUCKETS, {"tool": span["name"]}).observe(span["duration_ms"] / 1000)
+        counter("tool.calls", {"tool": span["name"], "status": span["status"]}).inc()
+
+    # --- 整封郵件 ---
+
+    def finish(self, status: str = "ok", attempts: int = 1) -> dict:
+        """結束這封郵件：寫入所有 span（最後一筆為 email 總計）並回傳總計"""
+        elapsed = time.perf_counter() - self._perf
+        email_span = {
+            "kind": "email",
+            "email_id": self.email_id,
+            "name": "process",
+            "node": None,
+            "start": self._started,
+            "duration_ms": round(elapsed * 1000, 3),
+            "status": status,
+            "attempts": attempts,
+            **self.totals,
+        }
+        self.spans.append(email_span)
+        histogram("email.latency", EMAIL_LATENCY_BUCKETS).observe(elapsed)
+        counter("emails", {"status": status}).inc()
+        if self.sink is not None:
+            self.sink.write(self.spans)
+        return email_span
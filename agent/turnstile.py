@@ -0,0 +1,49 @@
+"""
+行事曆閘門 - 並行處理郵件時，讓會動到行事曆的 meeting_agent 依郵件順序逐一執行
+
+每封郵件依 timestamp 排序取得序號 seq。meeting_agent 進入前等待輪到自己；
+分類後確定不會進入 meeting_agent 的郵件立即 release，讓後面的郵件不必等它回覆完成。
+如此「郵件 A 加入行程後，郵件 B 能偵測剛產生的衝突」的行為與循序處理一致。
+
+閘門放行過某個序號時（該郵件與之前的郵件都不再動到行事曆）呼叫 on_advance(seq)，
+run.py 藉此記下每封郵件處理完後的行事曆版本，寫入 checkpoint。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable
+
+
+class CalendarTurnstile:
+    """依序號放行的非同步閘門"""
+
+    def __init__(self, on_advance: Callable[[int], None] | None = None):
+        self._on_advance = on_advance
+        self._next = 0
+        self._released: set[int] = set()
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def turn(self, seq: int):
+        """等待輪到 seq，正常離開時自動 release
+
+        發生例外時不 release：呼叫端可由 checkpoint 重試（仍輪到自己，後面的郵件繼續等待），
+        放棄時須自行呼叫 release(seq)。
+        """
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._next == seq)
+        yield
+        await self.release(seq)
+
+    async def release(self, seq: int) -> None:
+        """標記 seq 已不再需要行事曆（可重複呼叫）"""
+        async with self._cond:
+            if seq < self._next:
+                return
+            self._released.add(seq)
+            while self._next in self._released:
+                self._released.discard(self._next)
+                if self._on_advance is not None:
+                    self._on_advance(self._next)
+                self._next += 1
+            self._cond.notify_all()
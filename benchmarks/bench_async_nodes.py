@@ -0,0 +1,65 @@
+"""
+Benchmark：classify / generate_reply 非同步呼叫 LLM 時，多封郵件的網路等待能否重疊
+
+以假 LLM 注入固定延遲，比較：
+- blocking：ainvoke 內部同步 sleep（等同在 async 節點裡呼叫同步 invoke，阻塞 event loop）
+- async：ainvoke 以 asyncio.sleep 等待（目前節點的做法）
+
+執行: python -m benchmarks.bench_async_nodes [郵件數] [並行數] [延遲秒數]
+"""
+
+import asyncio
+import sys
+import time
+
+from agent.cache import ResponseCache
+from agent.graph import GraphRunner
+from benchmarks.fake_llm import FakeLLM
+
+TODAY = "2026-01-19"
+
+
+def _email(i: int) -> dict:
+    return {
+        "id": f"BM{i:05d}",
+        "sender": "hr@company.com",
+        "subject": "員工滿意度調查",
+        "timestamp": "2026-01-19T09:00:00",
+        "content": "請花 5 分鐘填寫問卷。",
+    }
+
+
+async def run_batch(llm: FakeLLM, n: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async with GraphRunner(llm=llm, tools=[], cache=ResponseCache(enabled=False)) as runner:
+        async def one(i: int):
+            async with sem:
+                await runner.process(_email(i), TODAY)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        return time.perf_counter() - start
+
+
+async def main(n: int, concurrency: int, latency: float) -> None:
+    # 「一般」郵件會經過 classify + generate_reply 兩次 LLM 呼叫
+    blocking = FakeLLM(latency, category="一般", blocking=True)
+    overlapped = FakeLLM(latency, category="一般")
+
+    t_blocking = await run_batch(blocking, n, concurrency)
+    t_async = await run_batch(overlapped, n, concurrency)
+
+    ideal = blocking.calls * latency
+    print(f"郵件數: {n}，並行數: {concurrency}，每次 LLM 延遲: {latency * 1000:.0f} ms，LLM 呼叫: {blocking.calls}")
+    print(f"blocking（阻塞 event loop）: {t_blocking:7.2f} s  （循序總延遲 {ideal:.2f} s）")
+    print(f"async（ainvoke）:           {t_async:7.2f} s  （{t_blocking / t_async:.1f}x）")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if len(args) > 0 else 40,
+        int(args[1]) if len(args) > 1 else 8,
+        float(args[2]) if len(args) > 2 else 0.1,
+    ))
@@ -0,0 +1,119 @@
+"""
+Benchmark：mcp_server.py 的行事曆工具本身（in-process 直接呼叫，不經 MCP stdio 傳輸）
+
+以合成的大量事件建立一份獨立的行事曆（output/calendars/bench-*），依固定比例混合呼叫各工具，
+回報載入時間、整體 ops/sec 與每個工具延遲的 p50/p95/p99。結束後刪除該行事曆的檔案。
+
+儲存引擎依 CALENDAR_BACKEND（json / sqlite），可用 --backend 覆寫。
+
+執行: python -m benchmarks.bench_calendar_tools [--events 100000] [--ops 5000] [--backend json|sqlite]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from agent.metrics import histogram, histograms, render_quantiles
+from benchmarks.synthetic import TODAY, generate_events
+
+# 每種操作的比例（讀多寫少）
+OP_MIX = [
+    ("get_calendar_events", 0.30),
+    ("get_calendar_events_multi", 0.10),
+    ("find_free_slots", 0.20),
+    ("check_working_day", 0.20),
+    ("get_calendar_version", 0.05),
+    ("add_calendar_event", 0.08),
+    ("move_calendar_event", 0.04),
+    ("delete_calendar_event", 0.03),
+]
+LATENCY_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5]
+# 查詢的日期範圍：TODAY 前後（合成事件以 TODAY 為中心）
+SPAN_DAYS = 365
+
+
+def _slot(rng: random.Random) -> tuple[str, str]:
+    d = date.fromisoformat(TODAY) + timedelta(days=rng.randint(-SPAN_DAYS, SPAN_DAYS))
+    hour = rng.randint(8, 19)
+    start = f"{d.isoformat()}T{hour:02d}:{rng.choice(['00', '30'])}:00"
+    return start, f"{d.isoformat()}T{hour + 1:02d}:{start[14:16]}:00"
+
+
+def _call(mcp_server, op: str, rng: random.Random, calendar_id: str, added: list[str]):
+    start, end = _slot(rng)
+    if op == "get_calendar_events":
+        return mcp_server.get_calendar_events(start[:10], end[:10], calendar_id=calendar_id)
+    if op == "get_calendar_events_multi":
+        ranges = [dict(zip(("start_date", "end_date"), _slot(rng))) for _ in range(3)]
+        return mcp_server.get_calendar_events_multi(ranges, calendar_id=calendar_id)
+    if op == "find_free_slots":
+        return mcp_server.find_free_slots(start[:10], calendar_id=calendar_id)
+    if op == "check_working_day":
+        return mcp_server.check_working_day(start[:10])
+    if op == "get_calendar_version":
+        return mcp_server.get_calendar_version(calendar_id)
+    if op == "add_calendar_event":
+        result = mcp_server.add_calendar_event("bench", start, end, calendar_id=calendar_id)
+        if result["success"]:
+            added.append(result["event"]["id"])
+        return result
+    if op == "move_calendar_event" and added:
+        return mcp_server.move_calendar_event(start, end, event_id=rng.choice(added), calendar_id=calendar_id)
+    if op == "delete_calendar_event" and added:
+        return mcp_server.delete_calendar_event(event_id=added.pop(rng.randrange(len(added))), calendar_id=calendar_id)
+    return None
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.backend:
+        os.environ["CALENDAR_BACKEND"] = args.backend
+    import mcp_server
+
+    calendar_id = f"bench-{int(time.time())}"
+    rng = random.Random(args.seed)
+    ops, weights = zip(*OP_MIX)
+    added: list[str] = []
+    try:
+        started = time.perf_counter()
+        mcp_server._open_store(calendar_id).reset(list(generate_events(args.events, args.seed)))
+        written = time.perf_counter() - started
+
+        # 第一次呼叫時載入並建立索引
+        started = time.perf_counter()
+        mcp_server.get_calendar_version(calendar_id)
+        loaded = time.perf_counter() - started
+        print(f"行事曆: {args.events} 筆事件（{mcp_server.CALENDAR_BACKEND}），寫入 {written:.2f} s，載入 {loaded:.2f} s")
+
+        calls = 0
+        started = time.perf_counter()
+        for _ in range(args.ops):
+            op = rng.choices(ops, weights)[0]
+            t = time.perf_counter()
+            # 還沒有新增過事件時略過 move / delete
+            if _call(mcp_server, op, rng, calendar_id, added) is not None:
+                histogram("calendar_tool.latency", LATENCY_BUCKETS, {"tool": op}).observe(time.perf_counter() - t)
+                calls += 1
+        elapsed = time.perf_counter() - started
+    finally:
+        for path in mcp_server.CALENDARS_DIR.glob(f"{calendar_id}.*"):
+            path.unlink()
+
+    print(f"{calls} 次呼叫，耗時 {elapsed:.2f} s，{calls / elapsed:.0f} ops/sec")
+    print("\n工具延遲（微秒）:")
+    for line in render_quantiles(histograms("calendar_tool.latency"), "tool", scale=1e6):
+        print(f"   {line}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="行事曆工具延遲（in-process）")
+    parser.add_argument("--events", type=int, default=100_000, help="行事曆事件數（預設 100000）")
+    parser.add_argument("--ops", type=int, default=5000, help="工具呼叫次數（預設 5000）")
+    parser.add_argument("--backend", choices=["json", "sqlite"], help="儲存引擎（預設依 CALENDAR_BACKEND）")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
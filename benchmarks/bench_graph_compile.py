@@ -0,0 +1,76 @@
+"""
+Micro-benchmark：每封郵件重新編譯 graph vs 共用編譯好的 graph（GraphRunner）
+
+執行: python -m benchmarks.bench_graph_compile [郵件數]
+"""
+
+import asyncio
+import sys
+import time
+
+from agent.cache import ResponseCache
+from agent.graph import GraphRunner, create_graph, _to_result
+from benchmarks.fake_llm import FakeLLM
+
+TODAY = "2026-01-19"
+
+
+def _email(i: int) -> dict:
+    return {
+        "id": f"BM{i:05d}",
+        "sender": "newsletter@example.com",
+        "subject": "每週精選",
+        "timestamp": "2026-01-19T09:00:00",
+        "content": "本週熱門文章。",
+    }
+
+
+async def per_email_compile(n: int, llm) -> float:
+    """舊做法：每封郵件 create_graph() + compile"""
+    start = time.perf_counter()
+    for i in range(n):
+        email = _email(i)
+        graph = create_graph()
+        state = await graph.ainvoke(
+            {"email": email, "today": TODAY},
+            {"configurable": {"llm": llm, "cache": ResponseCache(enabled=False)}},
+        )
+        _to_result(email, state)
+    return time.perf_counter() - start
+
+
+async def shared_runner(n: int, llm) -> float:
+    """新做法：GraphRunner 共用編譯好的 graph 與 LLM client"""
+    start = time.perf_counter()
+    async with GraphRunner(llm=llm, tools=[], cache=ResponseCache(enabled=False)) as runner:
+        for i in range(n):
+            await runner.process(_email(i), TODAY)
+    return time.perf_counter() - start
+
+
+def compile_only(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        create_graph()
+    return time.perf_counter() - start
+
+
+async def main(n: int) -> None:
+    llm = FakeLLM()
+
+    # 預熱（import、第一次編譯）
+    await shared_runner(5, llm)
+
+    t_compile = compile_only(n)
+    t_old = await per_email_compile(n, llm)
+    t_new = await shared_runner(n, llm)
+
+    print(f"郵件數: {n}（假 LLM，垃圾郵件路徑 classify → finalize）")
+    print(f"create_graph() + compile 單次:  {t_compile / n * 1000:8.3f} ms")
+    print(f"每封重新編譯:                   {t_old / n * 1000:8.3f} ms/封")
+    print(f"GraphRunner 共用 graph:         {t_new / n * 1000:8.3f} ms/封")
+    print(f"每封節省:                       {(t_old - t_new) / n * 1000:8.3f} ms ({t_old / t_new:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
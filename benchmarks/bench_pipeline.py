@@ -0,0 +1,139 @@
+"""
+Benchmark：run.py 式的批次處理吞吐量（假 chat model + 真的 MCP Server 與行事曆）
+
+- LLM 以 FakeChatModel 取代（可設定延遲、抖動與失敗率），meeting_agent 的 ReAct 迴圈會真的呼叫 MCP 工具
+- 行事曆為合成的大量事件，寫在獨立的工作檔案（output/bench/calendar-*，以 CALENDAR_WORKING_BASE 指給 MCP Server），
+  不動 run.py 的工作行事曆（output/calendar.*，--resume 依賴它）；MCP Server 以長駐連線池存取，結束後刪除
+- 收件匣為合成郵件（寫成 JSONL 後以 InboxStream 串流讀取，與 run.py --inbox 相同）
+
+回報 emails/sec、各節點與 MCP 工具延遲的 p50/p95/p99（透過 agent/tracing.py 的 span 量測）。
+失敗的郵件計入統計但不中止整批（與 run.py 不同）；--retries 時由 checkpoint 接續重試。
+
+執行: python -m benchmarks.bench_pipeline [--emails 1000] [--events 100000] [--concurrency 8]
+      [--latency 0.05] [--jitter 0.02] [--failure-rate 0] [--retries 0] [--no-preflight] [--inbox PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from itertools import islice
+from pathlib import Path
+
+from agent.cache import ResponseCache
+from agent.graph import GraphRunner
+from agent.inbox import InboxStream
+from agent.metrics import counters, histograms, render_quantiles
+from agent.tracing import SpanLog
+from agent.turnstile import CalendarTurnstile
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.synthetic import BENCH_DIR, TODAY, generate_emails, generate_events, write_jsonl
+from calendar_engine import open_store
+from calendar_engine.backends import DEFAULT_BACKEND
+
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", DEFAULT_BACKEND)
+
+
+async def process_batch(runner: GraphRunner, emails, concurrency: int) -> dict:
+    """以 concurrency 個 worker 處理郵件（同 run.process_all：共用 iterator 依序取件，turnstile 維持行事曆順序）"""
+    turnstile = CalendarTurnstile()
+    source = enumerate(emails)
+    stats = {"ok": 0, "failed": 0}
+
+    async def worker():
+        for seq, email in source:
+            try:
+                await runner.process(email, TODAY, turnstile, seq)
+                stats["ok"] += 1
+            except Exception:
+                stats["failed"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return stats
+
+
+def _print_table(title: str, prefix: str, label: str) -> None:
+    hists = histograms(prefix)
+    if hists:
+        print(f"\n{title}（毫秒）:")
+        for line in render_quantiles(hists, label):
+            print(f"   {line}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    # MCP Server 每次工具呼叫的 INFO log 會干擾輸出
+    os.environ.setdefault("FASTMCP_LOG_LEVEL", "WARNING")
+    working = BENCH_DIR / f"calendar-{int(time.time())}"
+    os.environ["CALENDAR_WORKING_BASE"] = str(working)
+    store = open_store(CALENDAR_BACKEND, working)
+    started = time.perf_counter()
+    store.reset(list(generate_events(args.events, args.seed)))
+    print(f"行事曆: {args.events} 筆事件（{CALENDAR_BACKEND}，寫入 {time.perf_counter() - started:.2f} s）")
+
+    llm = FakeChatModel(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, seed=args.seed)
+    spans = SpanLog(args.spans) if args.spans else None
+    try:
+        inbox = args.inbox
+        if inbox is None:
+            inbox = BENCH_DIR / "inbox.jsonl"
+            write_jsonl(inbox, generate_emails(args.emails, args.seed))
+        emails = islice(InboxStream(inbox), args.emails)
+
+        async with GraphRunner(
+            llm=llm,
+            cache=ResponseCache(enabled=False),
+            preflight=not args.no_preflight,
+            checkpoint="memory" if args.retries else None,
+            attempts=args.retries + 1,
+            spans=spans,
+        ) as runner:
+            # 先啟動 MCP 連線池並讓每個 server process 載入行事曆，不計入處理時間
+            warmup = time.perf_counter()
+            await runner.get_tools()
+            for _ in range(runner.mcp_pool.size * 2):
+                await runner.mcp_pool.call_tool("get_calendar_version", {})
+            print(f"MCP Server 啟動並載入行事曆: {time.perf_counter() - warmup:.2f} s")
+
+            started = time.perf_counter()
+            stats = await process_batch(runner, emails, args.concurrency)
+            elapsed = time.perf_counter() - started
+    finally:
+        if spans is not None:
+            spans.close()
+        if hasattr(store, "close"):
+            store.close()
+        for path in BENCH_DIR.glob(f"{working.name}.*"):
+            path.unlink()
+
+    total = stats["ok"] + stats["failed"]
+    print(
+        f"\n郵件: {total} 封（成功 {stats['ok']}，失敗 {stats['failed']}），並行數 {args.concurrency}，"
+        f"LLM 延遲 {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms，失敗率 {args.failure_rate:.0%}"
+    )
+    print(f"耗時 {elapsed:.2f} s，{total / elapsed:.1f} emails/sec")
+    tool_calls = sum(c.value for c in counters("tool.calls"))
+    print(f"LLM 呼叫 {llm.calls} 次（注入失敗 {llm.failures} 次），MCP 工具呼叫 {tool_calls:.0f} 次")
+
+    _print_table("節點延遲", "node.latency", "node")
+    _print_table("其中等待 turnstile", "node.wait", "node")
+    _print_table("MCP 工具延遲（client 端，含 stdio 往返）", "tool.latency", "tool")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="run.py 式批次處理吞吐量（假 LLM）")
+    parser.add_argument("--emails", type=int, default=1000, help="處理的郵件數（預設 1000）")
+    parser.add_argument("--events", type=int, default=100_000, help="行事曆事件數（預設 100000）")
+    parser.add_argument("--concurrency", type=int, default=8, help="並行數（預設 8）")
+    parser.add_argument("--latency", type=float, default=0.05, help="每次 LLM 呼叫的延遲秒數（預設 0.05）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延遲的隨機抖動上限秒數（預設 0.02）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="LLM 呼叫失敗的機率（預設 0）")
+    parser.add_argument("--retries", type=int, default=0, help="失敗郵件由 checkpoint 接續重試的次數（預設 0）")
+    parser.add_argument("--no-preflight", action="store_true", help="會議邀約不做預查")
+    parser.add_argument("--inbox", type=Path, help="使用既有的收件匣（JSONL 或 JSON array），預設產生合成郵件")
+    parser.add_argument("--spans", type=Path, help="span 輸出位置（JSONL，預設不寫）")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,247 @@
+"""
+Benchmark 用的假 LLM - 不需 API
+
+- FakeLLM：只支援 with_structured_output，依 schema 回傳固定的結構化輸出（不經 LangChain，開銷最小）。
+  latency 為每次呼叫注入的延遲（秒），模擬 LLM round-trip；
+  blocking=True 時 ainvoke 以 time.sleep 等待，模擬在 async 節點中呼叫同步 API 阻塞 event loop。
+- FakeChatModel：LangChain chat model，支援 structured output 與 tool calling（meeting_agent 的 ReAct 迴圈
+  會真的呼叫 MCP 工具），可設定延遲、抖動與失敗率，並回傳 token 用量，供端到端的吞吐量量測。
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from agent.batch_classify import estimate_tokens
+from agent.nodes.classify import ClassificationResult
+from agent.nodes.generate_reply import ReplyResult
+from agent.preflight import extract_proposal
+
+TODAY = "2026-01-19"
+
+
+def fake_output(schema, category: str = "垃圾"):
+    """依 schema 產生固定輸出"""
+    if schema is ClassificationResult:
+        return ClassificationResult(category=category, priority=1, reasoning="fake")
+    if schema is ReplyResult:
+        return ReplyResult(needs_reply=True, reply="已收到，謝謝。")
+    raise ValueError(f"unsupported schema: {schema}")
+
+
+class FakeStructuredLLM:
+    def __init__(self, llm: "FakeLLM", schema):
+        self.llm = llm
+        self.schema = schema
+
+    def invoke(self, messages, config=None):
+        self.llm.calls += 1
+        time.sleep(self.llm.latency)
+        return fake_output(self.schema, self.llm.category)
+
+    async def ainvoke(self, messages, config=None):
+        self.llm.calls += 1
+        if self.llm.blocking:
+            time.sleep(self.llm.latency)
+        else:
+            await asyncio.sleep(self.llm.latency)
+        return fake_output(self.schema, self.llm.category)
+
+
+class FakeLLM:
+    """只支援 with_structured_output 的最小假 LLM"""
+
+    def __init__(self, latency: float = 0.0, category: str = "垃圾", blocking: bool = False):
+        self.latency = latency
+        self.category = category
+        self.blocking = blocking
+        self.calls = 0
+
+    def with_structured_output(self, schema, **kwargs):
+        return FakeStructuredLLM(self, schema)
+
+
+# --- 支援 tool calling 的假 chat model（可經過 LangChain callbacks、create_react_agent 與 with_structured_output）---
+
+_MEETING_WORDS = ("會議", "邀約", "開會", "聚餐", "改到", "討論")
+_CATEGORY_WORDS = [
+    ("急件", ("緊急",)),
+    ("會議邀約", _MEETING_WORDS),
+    ("垃圾", ("優惠", "免費", "點擊")),
+    ("詢價", ("報價", "詢價")),
+]
+_TODAY_RE = re.compile(r"今天是 (\d{4}-\d{2}-\d{2})")
+
+
+class FakeLLMError(RuntimeError):
+    """FakeChatModel 依 failure_rate 注入的失敗"""
+
+
+def _fake_category(text: str) -> str:
+    for category, words in _CATEGORY_WORDS:
+        if any(w in text for w in words):
+            return category
+    return "一般"
+
+
+def _human_text(messages: list) -> str:
+    # 分類只看郵件內容（System Prompt 裡列有各分類的名稱）
+    return "\n".join(str(m.content) for m in messages if isinstance(m, HumanMessage))
+
+
+def _proposal(text: str) -> dict | None:
+    m = _TODAY_RE.search(text)
+    return extract_proposal({"subject": "", "content": text}, m.group(1) if m else TODAY)
+
+
+def _tool_results(messages: list) -> dict[str, str]:
+    return {m.name: str(m.content) for m in messages if isinstance(m, ToolMessage)}
+
+
+def _structured_args(schema: str, messages: list) -> dict:
+    text = _human_text(messages)
+    if schema == "ClassificationResult":
+        category = _fake_category(text)
+        return {"category": category, "priority": 5 if category == "急件" else 3, "reasoning": "fake"}
+    if schema == "BatchClassificationResult":
+        results = []
+        for part in text.split("### email_id: ")[1:]:
+            email_id, _, body = part.partition("\n")
+            results.append({"email_id": email_id.strip(), "category": _fake_category(body), "priority": 3, "reasoning": "fake"})
+        return {"results": results}
+    if schema == "ReplyResult":
+        return {"needs_reply": True, "reply": "您好，已收到您的來信，將盡快回覆。"}
+    if schema == "MeetingResult":
+        proposal = _proposal(text) or {}
+        results = _tool_results(messages)
+        start, end = proposal.get("start") or "", proposal.get("end") or ""
+        return {
+            "date": proposal.get("date", TODAY),
+            "time": f"{start[11:16]}-{end[11:16]}" if start else "",
+            "is_working_day": '"is_working": false' not in results.get("check_working_day", "") and "不是工作日" not in text,
+            "conflict": None,
+            "added": '"success": true' in results.get("add_calendar_event", ""),
+            "reason": "fake",
+            "suggested_dates": [],
+        }
+    raise ValueError(f"unsupported schema: {schema}")
+
+
+def _react_call(messages: list, tool_names: set[str]) -> dict | None:
+    """ReAct 的下一個工具呼叫：沒有預查時依序查工作日、查衝突、新增；有預查且無衝突時直接新增"""
+    text = _human_text(messages)
+    proposal = _proposal(text)
+    if not proposal or not proposal["start"]:
+        return None
+    done = _tool_results(messages)
+    if "預先查詢結果" in text:
+        plan = ["add_calendar_event"] if "無衝突" in text else []
+    else:
+        plan = ["check_working_day", "get_calendar_events", "add_calendar_event"]
+    args = {
+        "check_working_day": {"date_str": proposal["date"]},
+        "get_calendar_events": {"start_date": proposal["start"], "end_date": proposal["end"]},
+        "add_calendar_event": {"title": "會議", "start": proposal["start"], "end": proposal["end"]},
+    }
+    for name in plan:
+        if name in done:
+            continue
+        if name not in tool_names:
+            return None
+        # 非工作日或有衝突時不新增
+        if name == "add_calendar_event" and (
+            '"is_working": false' in done.get("check_working_day", "")
+            or done.get("get_calendar_events", "[]").strip() not in ("[]", "")
+        ):
+            return None
+        return {"name": name, "args": args[name], "id": f"call_{len(done)}"}
+    return None
+
+
+class FakeChatModel(BaseChatModel):
+    """決定性的假 chat model
+
+    - with_structured_output：以 tool call 回傳分類、回覆、會議結果等 schema 的固定內容
+    - bind_tools（ReAct）：依郵件中的邀約時段依序呼叫 check_working_day / get_calendar_events / add_calendar_event
+    - 每次呼叫等待 latency + [0, jitter) 秒，並以 failure_rate 的機率拋出 FakeLLMError
+    - 回傳 usage_metadata（token 數以 estimate_tokens 估算，System Prompt 視為 prompt cache 命中）
+
+    延遲與失敗由 (seed, prompt 內容, 第幾次嘗試) 決定，與並行時的執行順序無關；
+    同一個 prompt 失敗後重試會重新抽籤。
+    """
+
+    model_name: str = "fake-chat"
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    calls: int = 0
+    failures: int = 0
+    _attempts: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _plan(self, messages: list, tools: list | None, tool_choice) -> tuple[float, ChatResult]:
+        self.calls += 1
+        key = hashlib.sha256("\n".join(str(m.content) for m in messages).encode("utf-8")).hexdigest()
+        attempt = self._attempts.get(key, 0)
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        delay = self.latency + rng.uniform(0, self.jitter)
+        if rng.random() < self.failure_rate:
+            self._attempts[key] = attempt + 1
+            self.failures += 1
+            return delay, None
+        self._attempts.pop(key, None)
+
+        names = [t["function"]["name"] for t in tools or []]
+        if tool_choice and names:
+            # with_structured_output：schema 以唯一的 tool 傳入
+            message = AIMessage(content="", tool_calls=[
+                {"name": names[0], "args": _structured_args(names[0], messages), "id": "call_structured"}
+            ])
+        else:
+            call = _react_call(messages, set(names))
+            message = AIMessage(content="", tool_calls=[call]) if call else AIMessage(content="已完成排程檢查。")
+
+        cached = estimate_tokens(str(messages[0].content)) if isinstance(messages[0], SystemMessage) else 0
+        output = json.dumps([c["args"] for c in message.tool_calls], ensure_ascii=False) + str(message.content)
+        message.usage_metadata = {
+            "input_tokens": sum(estimate_tokens(str(m.content)) for m in messages),
+            "output_tokens": estimate_tokens(output),
+            "total_tokens": 0,
+            "input_token_details": {"cache_read": cached},
+        }
+        message.usage_metadata["total_tokens"] = message.usage_metadata["input_tokens"] + message.usage_metadata["output_tokens"]
+        return delay, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        delay, result = self._plan(messages, tools, tool_choice)
+        time.sleep(delay)
+        if result is None:
+            raise FakeLLMError("fake LLM failure")
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        delay, result = self._plan(messages, tools, tool_choice)
+        await asyncio.sleep(delay)
+        if result is None:
+            raise FakeLLMError("fake LLM failure")
+        return result
@@ -0,0 +1,106 @@
+"""
+壓力測試：多個 process 同時寫入同一份行事曆
+
+每個 worker 各自 import mcp_server（獨立的記憶體索引，共用同一份 snapshot + journal），
+對少數幾個時段反覆搶預約，一半直接新增（靠檔案鎖內的衝突檢查），
+一半走「讀版本 → 查衝突 → 帶 expected_version 新增」的樂觀流程並在 version_conflict 時重試。
+結束後重新載入，確認沒有重疊事件、成功次數與事件數一致、版本號等於寫入次數。
+
+執行: python -m benchmarks.stress_calendar_writes [process 數] [每個 process 嘗試次數]
+"""
+
+import multiprocessing as mp
+import random
+import sys
+import time
+
+DAYS = ["2026-03-02", "2026-03-03", "2026-03-04"]
+SLOTS = [(day, hour) for day in DAYS for hour in range(9, 18)]
+
+
+def _slot(day: str, hour: int) -> tuple[str, str]:
+    return f"{day}T{hour:02d}:00:00", f"{day}T{hour + 1:02d}:00:00"
+
+
+def worker(calendar_id: str, worker_id: int, attempts: int, out: mp.Queue) -> None:
+    import mcp_server
+
+    rng = random.Random(worker_id)
+    stats = {"added": 0, "conflict": 0, "version_conflict": 0, "busy": 0}
+    for i in range(attempts):
+        day, hour = rng.choice(SLOTS)
+        start, end = _slot(day, hour)
+        title = f"W{worker_id}-{i}"
+        if worker_id % 2 == 0:
+            result = mcp_server.add_calendar_event(title, start, end, calendar_id=calendar_id)
+        else:
+            # 樂觀流程：讀取時記下版本，期間有其他寫入就重新讀取
+            while True:
+                version = mcp_server.get_calendar_version(calendar_id)["version"]
+                events = mcp_server.get_calendar_events(day, day, calendar_id=calendar_id)
+                if any(e["start"] == start for e in events):
+                    result = {"success": False, "reason": "conflict"}
+                    break
+                result = mcp_server.add_calendar_event(
+                    title, start, end, calendar_id=calendar_id, expected_version=version,
+                )
+                if result.get("reason") != "version_conflict":
+                    break
+                stats["version_conflict"] += 1
+
+        if result["success"]:
+            stats["added"] += 1
+        else:
+            stats[result["reason"]] += 1
+    out.put(stats)
+
+
+def check(calendar_id: str) -> tuple[list[dict], int]:
+    """重新載入行事曆，回傳 (事件, 版本號)；有重疊事件時拋出 AssertionError"""
+    from mcp_server import _open_store
+
+    store = _open_store(calendar_id)
+    events = sorted(store.load(), key=lambda e: e["start"])
+    for prev, cur in zip(events, events[1:]):
+        assert prev["end"] <= cur["start"], f"重疊事件: {prev} / {cur}"
+    return events, store.version
+
+
+def main(processes: int, attempts: int) -> None:
+    from mcp_server import CALENDARS_DIR
+
+    calendar_id = f"stress-{int(time.time())}"
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    workers = [ctx.Process(target=worker, args=(calendar_id, i, attempts, out)) for i in range(processes)]
+
+    start = time.perf_counter()
+    for p in workers:
+        p.start()
+    totals: dict[str, int] = {}
+    for _ in workers:
+        for key, value in out.get().items():
+            totals[key] = totals.get(key, 0) + value
+    for p in workers:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    try:
+        events, version = check(calendar_id)
+        assert totals["added"] == len(events), f"成功 {totals['added']} 次，但行事曆有 {len(events)} 筆事件"
+        assert version == totals["added"], f"版本號 {version} 與寫入次數 {totals['added']} 不符"
+    finally:
+        for path in CALENDARS_DIR.glob(f"{calendar_id}.*"):
+            path.unlink()
+
+    print(f"{processes} processes × {attempts} 次嘗試，{len(SLOTS)} 個時段，耗時 {elapsed:.2f}s")
+    print(f"  成功新增: {totals['added']}（行事曆事件數 {len(events)}，版本 {version}）")
+    print(f"  時間衝突: {totals['conflict']}，版本衝突重試: {totals['version_conflict']}，鎖逾時: {totals['busy']}")
+    print("  OK：沒有重疊事件，成功次數與事件數一致")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
@@ -0,0 +1,187 @@
+"""
+合成資料產生器 - 大量郵件與行事曆事件（決定性，同一個 seed 產生相同內容）
+
+- 收件匣：各類郵件依固定比例混合（會議邀約的日期時段寫法與 data/emails.json 相同，預查可抽取），
+  timestamp 大致遞增，disorder 比例的郵件時間往前挪（模擬匯出時的少量亂序，見 agent/inbox.py）
+- 行事曆：以 TODAY 為中心，每天 per_day 個互不重疊的事件（08:00-20:00，以 30 分鐘為單位）
+
+皆以 generator 逐筆產生並串流寫檔，百萬封郵件也不需整份放在記憶體。
+
+執行:
+    python -m benchmarks.synthetic inbox --count 100000 [--out output/bench/inbox.jsonl]
+    python -m benchmarks.synthetic calendar --count 100000 [--out output/bench/calendar.json]
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator
+
+ROOT = Path(__file__).parent.parent
+BENCH_DIR = ROOT / "output" / "bench"
+TODAY = "2026-01-19"
+
+# 郵件種類與比例
+EMAIL_MIX = [
+    ("meeting", 0.30),
+    ("reschedule", 0.03),
+    ("spam", 0.15),
+    ("notification", 0.15),
+    ("inquiry", 0.10),
+    ("urgent", 0.05),
+    ("general", 0.22),
+]
+TOPICS = ["Q1 規劃", "技術整合", "年度預算", "產品展示", "合約續約", "專案進度", "招募面談", "客戶回饋"]
+PERIODS = [("上午", 9), ("上午", 10), ("上午", 11), ("下午", 2), ("下午", 3), ("下午", 4)]
+EVENT_TITLES = ["週會", "一對一", "客戶會議", "專案同步", "面試", "教育訓練", "部門會議", "專注時段"]
+
+# 每天可排事件的時段：08:00-20:00，每格 30 分鐘
+SLOT_START = 8 * 60
+SLOTS_PER_DAY = 24
+
+
+def _md(d: date) -> str:
+    return f"{d.month}/{d.day}"
+
+
+def _email(i: int, kind: str, rng: random.Random, today: date) -> dict:
+    topic = rng.choice(TOPICS)
+    d = today + timedelta(days=rng.randint(1, 60))
+    period, hour = rng.choice(PERIODS)
+    if kind == "meeting":
+        sender = f"partner{rng.randint(1, 500)}@client{rng.randint(1, 50)}.com"
+        subject = f"{_md(d)} {topic}會議邀約"
+        content = f"您好，想約您 {_md(d)} {period} {hour}:00 開會討論{topic}，大約一小時，不知道是否方便？"
+    elif kind == "reschedule":
+        new = d + timedelta(days=rng.randint(1, 7))
+        sender = f"partner{rng.randint(1, 500)}@client{rng.randint(1, 50)}.com"
+        subject = f"更改：關於 {_md(d)} 的會議"
+        content = f"抱歉，原本 {_md(d)} 的會議時間不方便，能不能改到 {_md(new)} {period} {hour} ~ {hour + 1} 點？"
+    elif kind == "spam":
+        sender = rng.choice(["newsletter@tech_daily.com", "marketing@spam_service.net", f"promo{i % 97}@deals.com"])
+        subject = "【限時優惠】本週獨家折扣"
+        content = "點擊連結即可獲得 7 天免費試用，保證讓您的業績成長！"
+    elif kind == "notification":
+        sender = rng.choice(["no-reply@uber.com", "noreply@bank.com", "no-reply@cloud.tw"])
+        subject = "您的收據"
+        content = f"感謝您的使用，本次金額為 NT$ {rng.randint(100, 5000)}。"
+    elif kind == "inquiry":
+        sender = f"buyer{rng.randint(1, 300)}@startup{rng.randint(1, 80)}.io"
+        subject = f"產品詢價：{topic}"
+        content = f"您好，我們對貴公司的產品很感興趣，預計部署規模為 {rng.randint(10, 500)} 人，希望能獲得報價單。"
+    elif kind == "urgent":
+        sender = "boss@company.com"
+        subject = f"緊急！{topic}資料修正"
+        content = f"{topic}的數據有出入，請在今天下班前修正並回傳，這非常重要！"
+    else:
+        sender = f"colleague{rng.randint(1, 200)}@company.com"
+        subject = f"{topic}相關資料"
+        content = f"附上{topic}的整理，有空再看即可。"
+    # 欄位順序與 data/emails.json 相同，timestamp 由呼叫端填入
+    return {"id": f"SYN{i:07d}", "sender": sender, "subject": subject, "timestamp": None, "content": content}
+
+
+def generate_emails(
+    count: int,
+    seed: int = 0,
+    today: str = TODAY,
+    interval_seconds: int = 30,
+    disorder: float = 0.01,
+    max_skew_seconds: int = 3600,
+) -> Iterator[dict]:
+    """逐封產生郵件；timestamp 每封遞增 interval_seconds，disorder 比例的郵件往前挪最多 max_skew_seconds"""
+    rng = random.Random(seed)
+    today_d = date.fromisoformat(today)
+    kinds, weights = zip(*EMAIL_MIX)
+    start = datetime.combine(today_d, datetime.min.time()).replace(hour=8)
+    for i in range(count):
+        email = _email(i, rng.choices(kinds, weights)[0], rng, today_d)
+        ts = start + timedelta(seconds=i * interval_seconds)
+        if rng.random() < disorder:
+            ts -= timedelta(seconds=rng.randint(1, max_skew_seconds))
+        email["timestamp"] = ts.isoformat()
+        yield email
+
+
+def generate_events(count: int, seed: int = 0, center: str = TODAY, per_day: int = 8) -> Iterator[dict]:
+    """依時間順序逐筆產生互不重疊的事件，日期範圍以 center 為中心"""
+    rng = random.Random(seed)
+    per_day = max(1, min(per_day, SLOTS_PER_DAY))
+    days = -(-count // per_day)
+    day = date.fromisoformat(center) - timedelta(days=days // 2)
+    produced = 0
+    while produced < count:
+        n = min(per_day, count - produced)
+        starts = sorted(rng.sample(range(SLOTS_PER_DAY), n))
+        base = datetime.combine(day, datetime.min.time())
+        for slot, next_slot in zip(starts, starts[1:] + [SLOTS_PER_DAY]):
+            length = min(rng.choice([1, 2, 2, 3, 4]), next_slot - slot)
+            begin = base + timedelta(minutes=SLOT_START + slot * 30)
+            yield {
+                "title": f"{rng.choice(EVENT_TITLES)} #{produced}",
+                "start": begin.isoformat(),
+                "end": (begin + timedelta(minutes=length * 30)).isoformat(),
+            }
+            produced += 1
+        day += timedelta(days=1)
+
+
+def write_jsonl(path: Path | str, records: Iterable[dict]) -> int:
+    """逐筆寫成 JSONL，回傳筆數"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def write_json_array(path: Path | str, records: Iterable[dict]) -> int:
+    """逐筆寫成 JSON array（data/calendar.json 的格式），回傳筆數"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            f.write(",\n" if n else "\n")
+            f.write(json.dumps(record, ensure_ascii=False))
+            n += 1
+        f.write("\n]" if n else "]")
+    return n
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="產生合成收件匣與行事曆")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    inbox = sub.add_parser("inbox", help="收件匣（JSONL）")
+    inbox.add_argument("--count", type=int, default=10_000, help="郵件數（預設 10000）")
+    inbox.add_argument("--disorder", type=float, default=0.01, help="時間亂序的郵件比例（預設 0.01）")
+    inbox.add_argument("--out", type=Path, default=BENCH_DIR / "inbox.jsonl")
+
+    calendar = sub.add_parser("calendar", help="行事曆（JSON array，可作為 seed 或以 migrate 匯入 SQLite）")
+    calendar.add_argument("--count", type=int, default=100_000, help="事件數（預設 100000）")
+    calendar.add_argument("--per-day", type=int, default=8, help="每天的事件數（預設 8）")
+    calendar.add_argument("--out", type=Path, default=BENCH_DIR / "calendar.json")
+
+    for p in (inbox, calendar):
+        p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.kind == "inbox":
+        n = write_jsonl(args.out, generate_emails(args.count, args.seed, disorder=args.disorder))
+        print(f"已產生 {n} 封郵件：{args.out}")
+    else:
+        n = write_json_array(args.out, generate_events(args.count, args.seed, per_day=args.per_day))
+        print(f"已產生 {n} 筆事件：{args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
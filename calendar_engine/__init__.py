@@ -0,0 +1,23 @@
+from .backends import open_store
+from .business import BusinessCalendar
+from .index import EventIndex, new_event_id, to_epoch
+from .registry import Calendar, CalendarRegistry, VersionConflict
+from .slots import find_common_availability, find_free_slots
+from .sqlite_store import SqliteStore
+from .storage import JournalStore, StoreBusy
+
+__all__ = [
+    "BusinessCalendar",
+    "Calendar",
+    "CalendarRegistry",
+    "EventIndex",
+    "JournalStore",
+    "SqliteStore",
+    "StoreBusy",
+    "VersionConflict",
+    "find_common_availability",
+    "find_free_slots",
+    "new_event_id",
+    "open_store",
+    "to_epoch",
+]
@@ -0,0 +1,30 @@
+"""
+儲存引擎選擇 - 依名稱建立行事曆儲存
+
+- json（預設）：snapshot + append-only journal（JournalStore），<base>.json
+- sqlite：SQLite（SqliteStore），<base>.sqlite3
+
+兩者介面相同（load / poll / lock / append / append_batch / compact / reset / rollback / version），
+Calendar 與 MCP tools 不需知道底層是哪一種。
+"""
+
+from pathlib import Path
+
+from .sqlite_store import SqliteStore
+from .storage import JournalStore
+
+DEFAULT_BACKEND = "json"
+BACKENDS = {
+    "json": (JournalStore, ".json"),
+    "sqlite": (SqliteStore, ".sqlite3"),
+}
+
+
+def open_store(backend: str, base_path: Path, seed_path: Path | None = None) -> JournalStore | SqliteStore:
+    """建立儲存（base_path 不含副檔名，依引擎加上 .json / .sqlite3）"""
+    try:
+        store_cls, suffix = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"不支援的儲存引擎: {backend!r}（可用: {', '.join(BACKENDS)}）") from None
+    base_path = Path(base_path)
+    return store_cls(base_path.with_name(base_path.name + suffix), seed_path=seed_path)
@@ -0,0 +1,136 @@
+"""
+工作日曆 - 週末、國定假日與補班日的預先計算查詢
+
+假日資料由 JSON 檔載入（格式見 data/holidays.json），可包含多個地區與多個年份：
+
+    {
+      "TW": {
+        "weekend": [5, 6],
+        "holidays": {"2026-02-16": "除夕", ...},
+        "workdays": {"2026-02-07": "補班"}
+      }
+    }
+
+每個年份第一次查詢時預先計算：
+- flags：一年每天一個 byte，1 表示工作日
+- cumulative：cumulative[i] 為當年第 0..i-1 天的工作日數
+
+「是否為工作日」為 O(1)；「兩日之間的工作日數」為兩次查表相減；
+「之後第 N 個工作日」以 bisect 在 cumulative 上搜尋，為 O(log n)。
+"""
+
+import json
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+from pathlib import Path
+
+DEFAULT_WEEKEND = (5, 6)
+WEEKDAY_NAMES = ["週一", "週二", "週三", "週四", "週五", "週六", "週日"]
+
+
+class _Year:
+    """單一年份的工作日 bitmap 與累計陣列"""
+
+    def __init__(self, year: int, weekend: set[int], holidays: dict[date, str], workdays: dict[date, str]):
+        self.start = date(year, 1, 1)
+        days = (date(year + 1, 1, 1) - self.start).days
+        first_weekday = self.start.weekday()
+
+        self.flags = bytearray(days)
+        self.cumulative = array("H", [0]) * (days + 1)
+        for i in range(days):
+            d = self.start + timedelta(days=i)
+            working = (first_weekday + i) % 7 not in weekend
+            if d in holidays:
+                working = False
+            if d in workdays:
+                working = True
+            self.flags[i] = working
+            self.cumulative[i + 1] = self.cumulative[i] + working
+
+    @property
+    def total(self) -> int:
+        return self.cumulative[-1]
+
+
+class BusinessCalendar:
+    """工作日曆：預先計算每年的工作日，提供 O(1) / O(log n) 查詢"""
+
+    def __init__(
+        self,
+        holidays: dict[date, str] | None = None,
+        weekend: tuple[int, ...] = DEFAULT_WEEKEND,
+        workdays: dict[date, str] | None = None,
+    ):
+        self.holidays = dict(holidays or {})
+        self.weekend = set(weekend)
+        # 補班日（週末但需上班）
+        self.workdays = dict(workdays or {})
+        self._years: dict[int, _Year] = {}
+
+    @classmethod
+    def from_file(cls, path: Path | str, region: str = "TW") -> "BusinessCalendar":
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)[region]
+        return cls(
+            holidays={date.fromisoformat(k): v for k, v in spec.get("holidays", {}).items()},
+            weekend=tuple(spec.get("weekend", DEFAULT_WEEKEND)),
+            workdays={date.fromisoformat(k): v for k, v in spec.get("workdays", {}).items()},
+        )
+
+    def _year(self, year: int) -> _Year:
+        table = self._years.get(year)
+        if table is None:
+            table = self._years[year] = _Year(year, self.weekend, self.holidays, self.workdays)
+        return table
+
+    def _position(self, d: date) -> tuple[_Year, int]:
+        table = self._year(d.year)
+        return table, (d - table.start).days
+
+    def is_working_day(self, d: date) -> bool:
+        table, i = self._position(d)
+        return bool(table.flags[i])
+
+    def check(self, d: date) -> tuple[bool, str | None]:
+        """回傳 (是否為工作日, 非工作日的原因)"""
+        if self.is_working_day(d):
+            return True, None
+        if d.weekday() in self.weekend:
+            return False, WEEKDAY_NAMES[d.weekday()]
+        return False, self.holidays[d]
+
+    def working_days_between(self, start: date, end: date) -> int:
+        """[start, end) 之間的工作日數（end 早於 start 時為負數）"""
+        if end < start:
+            return -self.working_days_between(end, start)
+        start_table, i = self._position(start)
+        end_table, j = self._position(end)
+        if start.year == end.year:
+            return end_table.cumulative[j] - start_table.cumulative[i]
+        count = start_table.total - start_table.cumulative[i]
+        for year in range(start.year + 1, end.year):
+            count += self._year(year).total
+        return count + end_table.cumulative[j]
+
+    def next_working_days(self, from_date: date, count: int = 3) -> list[date]:
+        """from_date 之後（不含當天）的 count 個工作日"""
+        result: list[date] = []
+        table, i = self._position(from_date)
+        # 已經過的工作日數（含 from_date）
+        seen = table.cumulative[i + 1]
+        year = from_date.year
+        while len(result) < count:
+            # 當年第 seen+1 個工作日位於 cumulative 首次達到 seen+1 的位置
+            k = bisect_left(table.cumulative, seen + 1)
+            if k > len(table.flags):
+                year += 1
+                table = self._year(year)
+                seen = 0
+                if table.total == 0:
+                    raise ValueError(f"{year} 年沒有工作日")
+                continue
+            result.append(table.start + timedelta(days=k - 1))
+            seen += 1
+        return result
@@ -0,0 +1,193 @@
+"""
+行事曆事件索引 - 常駐記憶體的區間索引
+
+事件依開始時間排序（bisect），時間在建立索引時一次解析為 epoch 秒，
+查詢時不再重複呼叫 datetime.fromisoformat。
+
+重疊查詢：事件長度不超過 LONG_EVENT_SECONDS 時，與 [qs, qe) 重疊的事件
+開始時間必落在 [qs - LONG_EVENT_SECONDS, qe) 之間，用 bisect 切出範圍即可；
+超長事件（跨日活動）另外放在一個小清單中，查詢時一併檢查。
+整體為 O(log n + k)。
+
+每個事件有穩定的 id（新事件建立時產生；舊資料沒有 id 時由內容雜湊推導，重新載入後不變），
+並以標題的字元 n-gram 建立反向索引：查詢時取各 n-gram 倒排集合的交集，再確認子字串，
+不需掃描全部事件。
+"""
+
+import hashlib
+import uuid
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import count
+
+# 超過此長度的事件另外索引（秒）
+LONG_EVENT_SECONDS = 24 * 60 * 60
+
+_EPOCH = datetime(1970, 1, 1)
+
+# 標題索引的 n-gram 長度（查詢字串短於此長度時改用單字元索引）
+GRAM = 3
+
+
+def new_event_id() -> str:
+    """新事件的 id"""
+    return "evt_" + uuid.uuid4().hex[:12]
+
+
+def derived_event_id(event: dict) -> str:
+    """沒有 id 的舊資料：由內容推導 id（同一份資料每次載入都相同）"""
+    key = f"{event['title']}\0{event['start']}\0{event['end']}".encode("utf-8")
+    return "evt_" + hashlib.sha1(key).hexdigest()[:12]
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) < GRAM:
+        return set(text)
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)} | set(text)
+
+
+def to_epoch(value: str | datetime) -> int:
+    """ISO 時間轉 epoch 秒（無時區視為當地牆上時間，有時區則轉成 UTC）"""
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((dt - _EPOCH).total_seconds())
+
+
+class EventIndex:
+    """行事曆事件的區間索引，新增/刪除皆就地更新"""
+
+    def __init__(self, events: list[dict] | None = None):
+        # (start, seq)，依開始時間排序；seq 為插入序號，確保同時間事件維持插入順序
+        self._short: list[tuple[int, int]] = []
+        self._long: list[tuple[int, int]] = []
+        # seq -> (start, end, event)
+        self._entries: dict[int, tuple[int, int, dict]] = {}
+        self._seq = count()
+        # id -> seq；標題 n-gram（含單字元）-> seq 集合
+        self._ids: dict[str, int] = {}
+        self._grams: dict[str, set[int]] = {}
+
+        for e in events or []:
+            self.add(e)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, event: dict) -> int:
+        """加入事件，回傳內部序號（沒有 id 的事件會補上推導的 id）"""
+        start = to_epoch(event["start"])
+        end = to_epoch(event["end"])
+        if "id" not in event:
+            base = candidate = derived_event_id(event)
+            # 內容完全相同的重複事件依載入順序加上編號
+            n = 1
+            while candidate in self._ids:
+                n += 1
+                candidate = f"{base}-{n}"
+            event["id"] = candidate
+        if event["id"] in self._ids:
+            raise ValueError(f"事件 id 重複: {event['id']}")
+
+        seq = next(self._seq)
+        self._entries[seq] = (start, end, event)
+        bucket = self._long if end - start > LONG_EVENT_SECONDS else self._short
+        insort(bucket, (start, seq))
+        self._ids[event["id"]] = seq
+        for gram in _grams(normalize_title(event["title"])):
+            self._grams.setdefault(gram, set()).add(seq)
+        return seq
+
+    def remove(self, seq: int) -> dict:
+        """依序號移除事件，回傳被移除的事件"""
+        start, end, event = self._entries.pop(seq)
+        bucket = self._long if end - start > LONG_EVENT_SECONDS else self._short
+        i = bisect_left(bucket, (start, seq))
+        del bucket[i]
+        del self._ids[event["id"]]
+        for gram in _grams(normalize_title(event["title"])):
+            postings = self._grams[gram]
+            postings.discard(seq)
+            if not postings:
+                del self._grams[gram]
+        return event
+
+    def get(self, event_id: str) -> tuple[int, dict] | None:
+        """依 id 取得 (seq, event)"""
+        seq = self._ids.get(event_id)
+        if seq is None:
+            return None
+        return seq, self._entries[seq][2]
+
+    def search_title(self, query: str) -> list[tuple[int, dict]]:
+        """標題包含 query（不分大小寫、空白正規化）的事件，回傳 (seq, event)，依開始時間排序"""
+        needle = normalize_title(query)
+        if not needle:
+            return []
+        grams = {needle[i:i + GRAM] for i in range(len(needle) - GRAM + 1)} if len(needle) >= GRAM else set(needle)
+        # 由最小的倒排集合開始取交集
+        postings = sorted((self._grams.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        hits = sorted(
+            (self._entries[seq][0], seq) for seq in candidates
+            if needle in normalize_title(self._entries[seq][2]["title"])
+        )
+        return [(seq, self._entries[seq][2]) for _, seq in hits]
+
+    def events(self) -> list[dict]:
+        """依開始時間排序的所有事件"""
+        return [self._entries[seq][2] for _, seq in merge(self._short, self._long)]
+
+    def overlapping(self, start: str | datetime, end: str | datetime) -> list[tuple[int, dict]]:
+        """與 [start, end) 重疊的事件，回傳 (seq, event)，依開始時間排序"""
+        hits = self._overlapping_keys(to_epoch(start), to_epoch(end))
+        return [(seq, self._entries[seq][2]) for _, seq in hits]
+
+    def intervals(self, start: str | datetime, end: str | datetime) -> list[tuple[int, int]]:
+        """與 [start, end) 重疊事件的 (開始, 結束) epoch 秒，依開始時間排序（不需再解析時間字串）"""
+        hits = self._overlapping_keys(to_epoch(start), to_epoch(end))
+        return [self._entries[seq][:2] for _, seq in hits]
+
+    def _overlapping_keys(self, qs: int, qe: int) -> list[tuple[int, int]]:
+        lo = bisect_left(self._short, (qs - LONG_EVENT_SECONDS,))
+        hi = bisect_left(self._short, (qe,))
+        hits = [key for key in self._short[lo:hi] if self._entries[key[1]][1] > qs]
+
+        hi = bisect_left(self._long, (qe,))
+        long_hits = [key for key in self._long[:hi] if self._entries[key[1]][1] > qs]
+        if long_hits:
+            hits = list(merge(hits, long_hits))
+        return hits
+
+    def ending_after(self, start: str | datetime) -> list[tuple[int, dict]]:
+        """結束時間晚於 start 的事件，回傳 (seq, event)，依開始時間排序"""
+        qs = to_epoch(start)
+        lo = bisect_left(self._short, (qs - LONG_EVENT_SECONDS,))
+        hits = merge(
+            (key for key in self._short[lo:] if self._entries[key[1]][1] > qs),
+            (key for key in self._long if self._entries[key[1]][1] > qs),
+        )
+        return [(seq, self._entries[seq][2]) for _, seq in hits]
+
+    def starting_at(self, start: str) -> list[tuple[int, dict]]:
+        """開始時間字串完全相同的事件，回傳 (seq, event)"""
+        qs = to_epoch(start)
+        hits = []
+        for bucket in (self._short, self._long):
+            i = bisect_left(bucket, (qs,))
+            while i < len(bucket) and bucket[i][0] == qs:
+                seq = bucket[i][1]
+                if self._entries[seq][2]["start"] == start:
+                    hits.append(bucket[i])
+                i += 1
+        hits.sort()
+        return [(seq, self._entries[seq][2]) for _, seq in hits]
+
+    def items(self) -> list[tuple[int, dict]]:
+        """所有 (seq, event)，依開始時間排序"""
+        return [(seq, self._entries[seq][2]) for _, seq in merge(self._short, self._long)]
@@ -0,0 +1,65 @@
+"""
+一次性遷移：JSON 行事曆 → SQLite
+
+來源可以是原始資料（data/calendar.json）或工作檔案（output/calendar.json，連同 journal 一起重播）。
+
+執行: python -m calendar_engine.migrate [--source data/calendar.json] [--target output/calendar.sqlite3] [--force]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .index import EventIndex
+from .sqlite_store import SqliteStore
+from .storage import JournalStore
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_SOURCE = ROOT / "data" / "calendar.json"
+DEFAULT_TARGET = ROOT / "output" / "calendar.sqlite3"
+
+
+def migrate(source: Path, target: Path, force: bool = False) -> int:
+    """將 source（snapshot + journal）的事件寫入 target，回傳遷移的事件數
+
+    Raises:
+        FileNotFoundError: 來源不存在
+        FileExistsError: 目標已有資料且未指定 force
+    """
+    if not Path(source).exists():
+        raise FileNotFoundError(f"找不到來源行事曆: {source}")
+    # 經過 EventIndex 補上 id（與 JSON 引擎載入時推導的 id 相同）
+    events = EventIndex(JournalStore(source).load()).events()
+
+    store = SqliteStore(target)
+    try:
+        if (store.load() or store.version) and not force:
+            raise FileExistsError(f"{target} 已有資料（版本 {store.version}），加上 --force 覆寫")
+        store.reset(events)
+        migrated = store.load()
+    finally:
+        store.close()
+
+    if [e["id"] for e in migrated] != [e["id"] for e in events]:
+        raise RuntimeError("遷移後的事件與來源不一致")
+    return len(migrated)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="JSON 行事曆遷移到 SQLite")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help="JSON 行事曆（預設 data/calendar.json）")
+    parser.add_argument("--target", type=Path, default=DEFAULT_TARGET, help="SQLite 檔案（預設 output/calendar.sqlite3）")
+    parser.add_argument("--force", action="store_true", help="目標已有資料時覆寫")
+    args = parser.parse_args(argv)
+
+    try:
+        count = migrate(args.source, args.target, args.force)
+    except (FileNotFoundError, FileExistsError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"已遷移 {count} 筆事件：{args.source} → {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+多行事曆 - 依 calendar_id 區分的行事曆命名空間
+
+每個行事曆有自己的 JournalStore（儲存分片）與 EventIndex，第一次使用時才載入；
+儲存引擎支援範圍查詢時（SQLite），單純的時段查詢（events_between）直接查詢儲存，不載入索引。
+常駐記憶體的行事曆數量有上限，超過時以 LRU 淘汰最久未使用的索引。
+淘汰不需寫檔：每次寫入都已追加到 journal，下次使用時重新 load() 即可。
+
+寫入一律透過 Calendar.transaction()：取得檔案鎖 → 追上其他 process 的寫入 →
+（可選）比對呼叫端預期的版本號 → 檢查並寫入。版本不符時拋出 VersionConflict，呼叫端可重新讀取後重試。
+"""
+
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from .index import EventIndex
+from .storage import JournalStore
+
+# 常駐記憶體的行事曆數量上限
+DEFAULT_MAX_LOADED = 64
+
+# calendar_id 會成為檔名，只允許安全字元
+CALENDAR_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@-]{0,127}$")
+
+
+def validate_calendar_id(calendar_id: str) -> str:
+    if not CALENDAR_ID_RE.match(calendar_id) or ".." in calendar_id:
+        raise ValueError(f"不合法的 calendar_id: {calendar_id!r}")
+    return calendar_id
+
+
+class VersionConflict(Exception):
+    """行事曆版本與呼叫端預期的不符（期間有其他寫入），重新讀取後可重試"""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"版本不符：預期 {expected}，目前 {current}")
+        self.expected = expected
+        self.current = current
+
+
+class Calendar:
+    """單一行事曆：儲存分片 + 常駐記憶體的事件索引"""
+
+    def __init__(self, store: JournalStore):
+        self.store = store
+        self._index: EventIndex | None = None
+
+    @property
+    def version(self) -> int:
+        return self.store.version
+
+    def _load(self) -> EventIndex:
+        # 讀取 snapshot 並重播 journal；需要 compaction 時在鎖內重新讀取再寫入
+        events = self.store.load()
+        if self.store.should_compact():
+            with self.store.lock():
+                events = self.store.load()
+                if self.store.should_compact():
+                    self.store.compact(events)
+        return EventIndex(events)
+
+    def get_index(self) -> EventIndex:
+        """取得事件索引（第一次使用時建立，之後追上其他 process 的寫入）"""
+        if self._index is None:
+            self._index = self._load()
+            return self._index
+
+        # 多個 server process 共用同一份行事曆時，追上其他 process 的寫入（只 stat，無變化時不讀檔）
+        records = self.store.poll()
+        if records is None:
+            self._index = self._load()
+        else:
+            for record in records:
+                _apply(self._index, record)
+        return self._index
+
+    def events_between(self, start: str | None = None, end: str | None = None) -> list[dict]:
+        """與 [start, end) 重疊的事件，依開始時間排序；只給 start 時為結束時間晚於 start 的事件，都不給時為全部
+
+        儲存引擎能直接做範圍查詢時（SqliteStore.events_between）不載入整份行事曆，否則查詢記憶體索引。
+        """
+        query = getattr(self.store, "events_between", None)
+        if query is not None:
+            return query(start, end if start else None)
+        index = self.get_index()
+        if start and end:
+            return [e for _, e in index.overlapping(start, end)]
+        if start:
+            return [e for _, e in index.ending_after(start)]
+        return index.events()
+
+    @contextmanager
+    def transaction(self, expected_version: int | None = None) -> Iterator[EventIndex]:
+        """寫入交易：持有檔案鎖期間取得最新的索引，交易內以 commit / commit_batch 寫入
+
+        Raises:
+            VersionConflict: 指定了 expected_version 且與目前版本不符
+            StoreBusy: 等待檔案鎖逾時
+        """
+        with self.store.lock():
+            index = self.get_index()
+            if expected_version is not None and expected_version != self.store.version:
+                raise VersionConflict(expected_version, self.store.version)
+            yield index
+
+    def commit(self, op: str, event: dict) -> None:
+        """追加 journal（須在 transaction 內）；累積足夠操作後 compaction 成新 snapshot"""
+        self.store.append(op, event)
+        self._maybe_compact()
+
+    def commit_batch(self, records: list[dict]) -> None:
+        """以單一 journal 行追加多筆必須一起生效的操作（須在 transaction 內）"""
+        self.store.append_batch(records)
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self.store.should_compact():
+            self.store.compact(self._index.events())
+
+
+def _apply(index: EventIndex, record: dict) -> None:
+    # 套用其他 process 寫入 journal 的操作
+    event = record["event"]
+    if record["op"] == "add":
+        index.add(event)
+    elif record["op"] == "delete":
+        hit = index.get(event["id"]) if "id" in event else None
+        if hit is not None:
+            index.remove(hit[0])
+            return
+        for seq, e in index.starting_at(event["start"]):
+            if e["title"] == event["title"] and e["end"] == event["end"]:
+                index.remove(seq)
+                break
+
+
+class CalendarRegistry:
+    """calendar_id -> Calendar，延遲載入並以 LRU 限制常駐數量"""
+
+    def __init__(self, open_store: Callable[[str], JournalStore], max_loaded: int = DEFAULT_MAX_LOADED):
+        self.open_store = open_store
+        self.max_loaded = max(1, max_loaded)
+        self._loaded: OrderedDict[str, Calendar] = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._loaded)
+
+    def get(self, calendar_id: str) -> Calendar:
+        calendar = self._loaded.get(calendar_id)
+        if calendar is not None:
+            self._loaded.move_to_end(calendar_id)
+            return calendar
+
+        calendar = Calendar(self.open_store(validate_calendar_id(calendar_id)))
+        self._loaded[calendar_id] = calendar
+        self.loads += 1
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+            self.evictions += 1
+        return calendar
@@ -0,0 +1,147 @@
+"""
+空檔搜尋 - 在搜尋區間內找出前 N 個不衝突的時段
+
+先以 EventIndex.intervals 取出整個搜尋區間內的事件（已依開始時間排序），
+再逐日沿時間軸單次掃描：事件前後各加上 buffer 視為忙碌，
+工作時段內兩個忙碌區間之間足夠長的空檔切成 duration 長度的時段。
+跨日的長事件以「目前為止最晚的結束時間」延續到後面的日子，不需逐日重新查詢。
+
+多人共同空檔：各行事曆的忙碌區間以 heapq.merge 做 k-way 合併，再走同一個掃描。
+"""
+
+from datetime import date, datetime, time, timedelta
+from heapq import merge
+from typing import Callable, Iterable
+
+from .index import EventIndex, to_epoch
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _from_epoch(seconds: int) -> str:
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat()
+
+
+def _is_weekday(d: date) -> bool:
+    return d.weekday() < 5
+
+
+def _busy(index: EventIndex, ws: int, we: int, buffer: int) -> list[tuple[int, int]]:
+    # 忙碌區間（含 buffer），依開始時間排序
+    window = index.intervals(_from_epoch(ws - buffer), _from_epoch(we + buffer))
+    if not buffer:
+        return window
+    return [(start - buffer, end + buffer) for start, end in window]
+
+
+def _sweep(
+    busy: Iterable[tuple[int, int]],
+    ws: int,
+    we: int,
+    duration: int,
+    day_open: time,
+    day_close: time,
+    max_results: int,
+    is_working_day: Callable[[date], bool],
+) -> list[dict]:
+    """沿依開始時間排序的忙碌區間單次掃描，回傳前 max_results 個空檔時段"""
+    slots: list[dict] = []
+    busy = iter(busy)
+    pending = next(busy, None)
+    # 已掃過的事件中最晚的結束時間（讓跨日事件延續到後面的日子）
+    carry = ws
+
+    def emit(gap_start: int, gap_end: int) -> None:
+        free_minutes = (gap_end - gap_start) // 60
+        while gap_start + duration <= gap_end and len(slots) < max_results:
+            slots.append({
+                "start": _from_epoch(gap_start),
+                "end": _from_epoch(gap_start + duration),
+                "free_minutes": free_minutes,
+            })
+            gap_start += duration
+
+    day = (_EPOCH + timedelta(seconds=ws)).date()
+    last_day = (_EPOCH + timedelta(seconds=we - 1)).date()
+    while day <= last_day and len(slots) < max_results:
+        open_at = max(to_epoch(datetime.combine(day, day_open)), ws)
+        close_at = min(to_epoch(datetime.combine(day, day_close)), we)
+        day += timedelta(days=1)
+        if open_at >= close_at or not is_working_day(day - timedelta(days=1)):
+            continue
+
+        cursor = max(open_at, carry)
+        while pending is not None and pending[0] < close_at:
+            start, end = pending
+            if start > cursor:
+                emit(cursor, start)
+            cursor = max(cursor, end)
+            carry = max(carry, end)
+            pending = next(busy, None)
+        if cursor < close_at:
+            emit(cursor, close_at)
+
+    return slots
+
+
+def find_free_slots(
+    index: EventIndex,
+    window_start: str | datetime,
+    window_end: str | datetime,
+    duration_minutes: int = 60,
+    work_start: str = "09:00",
+    work_end: str = "18:00",
+    buffer_minutes: int = 0,
+    max_results: int = 3,
+    is_working_day: Callable[[date], bool] = _is_weekday,
+) -> list[dict]:
+    """找出 [window_start, window_end) 內前 max_results 個不衝突的時段
+
+    Args:
+        index: 行事曆事件索引
+        window_start / window_end: 搜尋區間（ISO 格式或 datetime，無時區）
+        duration_minutes: 時段長度（分鐘）
+        work_start / work_end: 每日工作時段（HH:MM）
+        buffer_minutes: 與既有事件之間至少間隔的分鐘數
+        max_results: 最多回傳幾個時段
+        is_working_day: 判斷日期是否可安排（預設排除週末）
+
+    Returns:
+        [{"start": ISO, "end": ISO, "free_minutes": 所在空檔長度}, ...]，依時間排序
+    """
+    return find_common_availability(
+        [index], window_start, window_end, duration_minutes, work_start, work_end,
+        buffer_minutes, max_results, is_working_day,
+    )
+
+
+def find_common_availability(
+    indexes: list[EventIndex],
+    window_start: str | datetime,
+    window_end: str | datetime,
+    duration_minutes: int = 60,
+    work_start: str = "09:00",
+    work_end: str = "18:00",
+    buffer_minutes: int = 0,
+    max_results: int = 3,
+    is_working_day: Callable[[date], bool] = _is_weekday,
+) -> list[dict]:
+    """找出所有行事曆都空閒的時段
+
+    各行事曆的忙碌區間本身已依開始時間排序，以 heapq.merge 做 k-way 合併後
+    交給同一個單次掃描，整體為 O(N log k)（N 為區間內事件總數、k 為行事曆數）。
+    參數與回傳值同 find_free_slots，時段依時間排序（最早可行者優先）。
+    """
+    ws = to_epoch(window_start)
+    we = to_epoch(window_end)
+    duration = duration_minutes * 60
+    if duration <= 0 or max_results <= 0 or we <= ws:
+        return []
+
+    buffer = buffer_minutes * 60
+    busy = merge(*(_busy(index, ws, we, buffer) for index in indexes))
+    return _sweep(
+        busy, ws, we, duration,
+        time.fromisoformat(work_start), time.fromisoformat(work_end),
+        max_results, is_working_day,
+    )
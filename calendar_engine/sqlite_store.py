@@ -0,0 +1,317 @@
+"""
+行事曆持久化 - SQLite 儲存引擎（與 JournalStore 相同介面，可互換）
+
+- events：每個事件一列，開始/結束時間另存 epoch 秒並建索引，範圍查詢直接在 SQL 內完成（events_between）
+- changes：每次寫入（一次修改，batch 也算一次）一列，主鍵即版本號；
+  其他 process 以 poll() 讀取自己版本之後的紀錄，與 journal 的增量重播相同
+- meta：目前版本號
+
+WAL 模式下讀取不會被寫入擋住。lock() 以 BEGIN IMMEDIATE 開啟寫入交易，
+交易內的所有 append 在離開時一起 commit（發生例外則 rollback），等同 journal 的整行寫入。
+compaction 只需刪除已套用的 changes 紀錄：events 表本身永遠是最新狀態。
+rollback(version) 以 changes 中的紀錄撤銷該版本之後的寫入（紀錄已被 compaction 刪除時無法撤銷）。
+
+第一次開啟時若資料庫是空的，以 seed_path 的 JSON 事件為初始內容（與 JournalStore 相同）。
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+from .index import EventIndex, to_epoch
+from .storage import COMPACT_EVERY, LOCK_TIMEOUT, StoreBusy, expand, invert
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events(start_ts);
+CREATE INDEX IF NOT EXISTS events_end ON events(end_ts);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER PRIMARY KEY,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _with_ids(events: list[dict]) -> list[dict]:
+    # 沒有 id 的舊資料補上推導的 id（由 EventIndex 補上，與 JSON 引擎載入時的 id 一致）
+    if all("id" in e for e in events):
+        return events
+    return [e for _, e in EventIndex(events).items()]
+
+
+class SqliteStore:
+    """SQLite 的行事曆儲存"""
+
+    def __init__(
+        self,
+        path: Path,
+        seed_path: Path | None = None,
+        compact_every: int = COMPACT_EVERY,
+        timeout: float = LOCK_TIMEOUT,
+    ):
+        self.path = Path(path)
+        self.seed_path = Path(seed_path) if seed_path else None
+        self.compact_every = compact_every
+        self.timeout = timeout
+        # 自上次 compaction 以來的操作數
+        self.pending = 0
+        # 目前狀態的版本號（每次寫入加一）
+        self.version = 0
+        self._lock_depth = 0
+        self._conn: sqlite3.Connection | None = None
+        # PRAGMA data_version：其他連線 commit 後才會改變，沒有變化時 poll() 不查詢
+        self._data_version: int | None = None
+        # 已寫入的交易被 rollback 後，記憶體中的索引可能已與資料庫不同，下次 poll() 要求重新載入
+        self._stale = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None：交易由 lock() 明確控制
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            with self.lock():
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'version'").fetchone() is None:
+                    self._insert(self._read_seed())
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('version', 0)")
+        return self._conn
+
+    def _read_seed(self) -> list[dict]:
+        if self.seed_path and self.seed_path.exists():
+            return json.loads(self.seed_path.read_bytes())
+        return []
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def load(self) -> list[dict]:
+        """讀取所有事件與目前版本（僅啟動或 poll() 要求時呼叫）"""
+        conn = self._connect()
+        with self._read():
+            self.version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            self.pending = conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+            rows = conn.execute("SELECT event FROM events ORDER BY start_ts, rowid").fetchall()
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._stale = False
+        return [json.loads(event) for event, in rows]
+
+    def events_between(self, start: str | None = None, end: str | None = None) -> list[dict]:
+        """與 [start, end) 重疊的事件（省略的一端不限），依開始時間排序
+
+        以 start_ts / end_ts 索引直接在 SQL 內查詢，不需載入全部事件。
+        """
+        where, params = [], []
+        if end is not None:
+            where.append("start_ts < ?")
+            params.append(to_epoch(end))
+        if start is not None:
+            where.append("end_ts > ?")
+            params.append(to_epoch(start))
+        sql = "SELECT event FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._connect().execute(sql + " ORDER BY start_ts, rowid", params).fetchall()
+        return [json.loads(event) for event, in rows]
+
+    def poll(self) -> list[dict] | None:
+        """讀取自上次 load/poll 後其他 process 寫入的操作
+
+        Returns:
+            新增的操作（{"op", "event"}）列表；需要的紀錄已被 compaction 刪除或資料被重置時回傳 None，
+            呼叫端需重新 load()
+        """
+        if self._stale:
+            return None
+        conn = self._connect()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        with self._read():
+            current = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            rows = conn.execute(
+                "SELECT version, record FROM changes WHERE version > ? ORDER BY version", (self.version,)
+            ).fetchall()
+        if current == self.version:
+            return []
+        if len(rows) != current - self.version:
+            return None
+
+        ops = []
+        for _, record in rows:
+            record = json.loads(record)
+            if record["op"] == "reset":
+                return None
+            ops.extend(expand(record))
+        self.version = current
+        self.pending += len(ops)
+        return ops
+
+    def changes_since(self, version: int) -> list[dict] | None:
+        """version 之後寫入的操作（{"op", "event"}，依寫入順序）
+
+        Returns:
+            操作列表；需要的紀錄已被 compaction 刪除、資料被重置過或 version 比目前新時回傳 None
+        """
+        with self.lock():
+            self.load()
+            if version == self.version:
+                return []
+            if version > self.version:
+                return None
+            rows = self._conn.execute(
+                "SELECT record FROM changes WHERE version > ? ORDER BY version", (version,)
+            ).fetchall()
+            if len(rows) != self.version - version:
+                return None
+            ops = []
+            for record, in rows:
+                record = json.loads(record)
+                if record["op"] == "reset":
+                    return None
+                ops.extend(expand(record))
+            return ops
+
+    def rollback(self, version: int) -> int | None:
+        """撤銷 version 之後的寫入（反向操作寫成一個版本），回傳撤銷的操作數；無法撤銷時回傳 None（不修改）"""
+        with self.lock():
+            ops = self.changes_since(version)
+            if ops is None:
+                return None
+            self.append_batch(invert(ops))
+        return len(ops)
+
+    def append(self, op: str, event: dict) -> None:
+        """寫入一筆操作（op 為 "add" 或 "delete"）"""
+        self._write({"op": op, "event": event}, [{"op": op, "event": event}])
+
+    def append_batch(self, records: list[dict]) -> None:
+        """以單一版本寫入多筆操作（{"op", "event"}），同一個交易內全部生效"""
+        if records:
+            self._write({"op": "batch", "ops": records}, records)
+
+    def _write(self, record: dict, ops: list[dict]) -> None:
+        conn = self._connect()
+        with self.lock():
+            for op in ops:
+                event = op["event"]
+                if op["op"] == "add":
+                    self._insert([event])
+                elif op["op"] == "delete":
+                    self._delete(event)
+            self.version += 1
+            conn.execute(
+                "INSERT INTO changes (version, record) VALUES (?, ?)",
+                (self.version, json.dumps(record, ensure_ascii=False)),
+            )
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (self.version,))
+        self.pending += len(ops)
+
+    def _insert(self, events: list[dict]) -> None:
+        self._conn.executemany(
+            "INSERT INTO events (id, start_ts, end_ts, event) VALUES (?, ?, ?, ?)",
+            [
+                (e["id"], to_epoch(e["start"]), to_epoch(e["end"]), json.dumps(e, ensure_ascii=False))
+                for e in _with_ids(events)
+            ],
+        )
+
+    def _delete(self, event: dict) -> None:
+        if "id" in event:
+            if self._conn.execute("DELETE FROM events WHERE id = ?", (event["id"],)).rowcount:
+                return
+        # 沒有 id（或 id 不存在）時刪除內容相同的第一筆
+        for event_id, data in self._conn.execute(
+            "SELECT id, event FROM events WHERE start_ts = ? ORDER BY rowid", (to_epoch(event["start"]),)
+        ).fetchall():
+            e = json.loads(data)
+            if (e["title"], e["start"], e["end"]) == (event["title"], event["start"], event["end"]):
+                self._conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+                return
+
+    @contextmanager
+    def _read(self):
+        # 讀取多個表時包在同一個讀取交易中（WAL 下不會擋住寫入），確保版本與內容一致
+        if self._lock_depth:
+            yield
+            return
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self._conn.execute("COMMIT")
+
+    @contextmanager
+    def lock(self, timeout: float | None = None):
+        """寫入交易（BEGIN IMMEDIATE，跨 process 排他）；等待逾時拋出 StoreBusy"""
+        conn = self._conn or self._connect()
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        if timeout is not None:
+            conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            raise StoreBusy(f"等待 {self.path.name} 逾時") from e
+        finally:
+            if timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+
+        self._lock_depth = 1
+        version, pending = self.version, self.pending
+        try:
+            yield
+        except BaseException:
+            self._lock_depth = 0
+            conn.execute("ROLLBACK")
+            if self.version != version:
+                self.version, self.pending = version, pending
+                self._stale = True
+            raise
+        self._lock_depth = 0
+        conn.execute("COMMIT")
+        # 自己的 commit 不會改變 data_version，記下目前的值，poll() 不必重新查詢
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def should_compact(self) -> bool:
+        return self.pending >= self.compact_every
+
+    def compact(self, events: list[dict] | None = None) -> None:
+        """刪除已套用的 changes 紀錄（events 表已是最新狀態，不需改寫）"""
+        with self.lock():
+            self._conn.execute("DELETE FROM changes WHERE version <= ?", (self.version,))
+        self.pending = 0
+
+    def reset(self, events: list[dict]) -> None:
+        """以指定事件重置儲存（版本號接續之前的版本，其他 process 會重新載入）"""
+        conn = self._connect()
+        with self.lock():
+            self.version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0] + 1
+            conn.execute("DELETE FROM events")
+            conn.execute("DELETE FROM changes")
+            self._insert(events)
+            conn.execute("INSERT INTO changes (version, record) VALUES (?, ?)", (self.version, '{"op": "reset"}'))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (self.version,))
+        self.pending = 0
@@ -0,0 +1,334 @@
+"""
+行事曆持久化 - snapshot + append-only journal
+
+- snapshot：完整事件列表（JSON array），只在 compaction 時以「寫暫存檔 → fsync → os.replace」
+  原子性覆寫，寫到一半當機不會損毀
+- journal：每次新增/刪除追加一行 JSON（JSONL），第一行記錄對應 snapshot 的雜湊值；
+  必須一起生效的多筆操作寫成同一行（batch），當機時不會只留下一部分
+
+啟動時讀 snapshot 再重播 journal。若 journal 記錄的 snapshot 雜湊與目前 snapshot 不符，
+代表 journal 已被 compaction 併入 snapshot（或 snapshot 被外部重置），整份 journal 忽略。
+journal 最後一行若因當機而不完整（沒有換行結尾），重播時截掉。
+
+多個 process 共用同一份儲存時，poll() 以 stat 判斷是否有其他 process 追加的操作，
+只讀取新增的部分；snapshot 或 journal 被替換（compaction / reset）時要求重新 load()。
+
+版本號：每寫入一行 journal（一次修改，batch 也算一次）版本加一，compaction 時記在新 journal 的 header，
+之後的版本號接續，不會倒退。寫入方以 lock()（flock 檔案鎖）包住「追上最新狀態 → 檢查 → 追加」，
+多個 process 同時寫入時不會各自通過衝突檢查而重複預約。
+
+rollback(version) 撤銷某個版本之後的寫入（run.py --resume 用）：以反向操作追加一行 batch，版本號照樣遞增；
+需要的 journal 紀錄已被 compaction 併入 snapshot 時無法撤銷。
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows：沒有 flock，lock() 只在單一 process 內有效
+    fcntl = None
+
+# 累積多少筆操作後做一次 compaction
+COMPACT_EVERY = 1000
+# 等待檔案鎖的上限（秒）
+LOCK_TIMEOUT = 10.0
+
+
+class StoreBusy(TimeoutError):
+    """等待檔案鎖逾時（其他 process 長時間持有），可稍後重試"""
+
+
+def _digest(data: bytes | None) -> str | None:
+    if data is None:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+
+def _event_key(event: dict) -> tuple:
+    return event["title"], event["start"], event["end"]
+
+
+def expand(record: dict) -> list[dict]:
+    """將 journal 紀錄展開為單筆操作（batch 紀錄含多筆）"""
+    if record["op"] == "batch":
+        return record["ops"]
+    return [record]
+
+
+def invert(ops: list[dict]) -> list[dict]:
+    """撤銷 ops 的操作：反序，新增與刪除互換"""
+    return [{"op": "delete" if r["op"] == "add" else "add", "event": r["event"]} for r in reversed(ops)]
+
+
+class JournalStore:
+    """snapshot + append-only journal 的行事曆儲存"""
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        seed_path: Path | None = None,
+        compact_every: int = COMPACT_EVERY,
+        fsync: bool = True,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".journal.jsonl")
+        self.lock_path = self.snapshot_path.with_suffix(".lock")
+        self.seed_path = Path(seed_path) if seed_path else None
+        self.compact_every = compact_every
+        self.fsync = fsync
+        # 自上次 compaction 以來的操作數
+        self.pending = 0
+        # 目前狀態的版本號（每次寫入 journal 加一）
+        self.version = 0
+        self._lock_depth = 0
+        self._base: str | None = None
+        # 已讀到的 journal 位置，以及 load 時 snapshot / journal 的檔案識別
+        self._offset = 0
+        self._snapshot_sig: tuple | None = None
+        self._journal_ino: int | None = None
+
+    def _read_snapshot(self) -> tuple[list[dict], bytes | None]:
+        if self.snapshot_path.exists():
+            data = self.snapshot_path.read_bytes()
+            return json.loads(data), data
+        # snapshot 不存在時以原始資料為起點（不寫檔，直到第一次 compaction）
+        if self.seed_path and self.seed_path.exists():
+            return json.loads(self.seed_path.read_bytes()), None
+        return [], None
+
+    @staticmethod
+    def _stat(path: Path) -> tuple | None:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def load(self) -> list[dict]:
+        """讀取 snapshot 並重播 journal（僅啟動或 poll() 要求時呼叫）"""
+        self._snapshot_sig = self._stat(self.snapshot_path)
+        events, data = self._read_snapshot()
+        self._base = _digest(data)
+        self.pending = 0
+        self.version = 0
+        self._offset = 0
+        self._journal_ino = None
+
+        if not self.journal_path.exists():
+            return events
+
+        data = self.journal_path.read_bytes()
+        # 只有以換行結尾的行才算寫入完成；之後的殘段是當機造成的不完整尾行，截掉
+        valid = data.rfind(b"\n") + 1
+        if valid < len(data):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid)
+        lines = data[:valid].decode("utf-8").splitlines()
+        self._journal_ino = self.journal_path.stat().st_ino
+        self._offset = valid
+        if not lines:
+            return events
+
+        header = json.loads(lines[0])
+        if header.get("base") != self._base:
+            # journal 已併入 snapshot（compaction 途中當機）或 snapshot 被外部重置：
+            # 換一份對應目前 snapshot 的空 journal，避免之後的操作追加到舊 journal
+            self.version = header.get("version", 0) + len(lines)
+            self._reset_journal()
+            return events
+
+        self.version = header.get("version", 0) + len(lines) - 1
+
+        # 以 key -> 事件清單做多重集合，刪除時不必線性掃描
+        buckets: dict[tuple, list[dict]] = {}
+        for e in events:
+            buckets.setdefault(_event_key(e), []).append(e)
+
+        for line in lines[1:]:
+            for record in expand(json.loads(line)):
+                event = record["event"]
+                if record["op"] == "add":
+                    buckets.setdefault(_event_key(event), []).append(event)
+                elif record["op"] == "delete":
+                    same = buckets.get(_event_key(event))
+                    if same:
+                        # 內容相同的事件中優先刪除 id 相符的
+                        i = next((i for i, e in enumerate(same) if e.get("id") == event.get("id")), -1)
+                        same.pop(i)
+                self.pending += 1
+
+        return [e for same in buckets.values() for e in same]
+
+    def poll(self) -> list[dict] | None:
+        """讀取自上次 load/poll 後其他 process 追加的操作
+
+        Returns:
+            新增的操作（{"op", "event"}）列表；snapshot 或 journal 已被替換時回傳 None，
+            呼叫端需重新 load()
+        """
+        if self._stat(self.snapshot_path) != self._snapshot_sig:
+            return None
+        st = self._stat(self.journal_path)
+        if st is None:
+            return [] if self._journal_ino is None else None
+        ino, _, size = st
+        if self._journal_ino is not None and ino != self._journal_ino:
+            return None
+        if size < self._offset:
+            return None
+        if size == self._offset:
+            return []
+
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # 只處理完整的行，寫到一半的尾行留待下次
+        valid = data.rfind(b"\n") + 1
+        lines = data[:valid].decode("utf-8").splitlines()
+
+        if self._journal_ino is None:
+            # load 時還沒有 journal，由其他 process 建立：先確認 header
+            if not lines:
+                return []
+            self._journal_ino = ino
+            header = json.loads(lines[0])
+            if header.get("base") != self._base:
+                return None
+            self.version = header.get("version", 0)
+            lines = lines[1:]
+
+        self._offset += valid
+        self.version += len(lines)
+        ops = [op for line in lines for op in expand(json.loads(line))]
+        self.pending += len(ops)
+        return ops
+
+    def append(self, op: str, event: dict) -> None:
+        """追加一筆操作（op 為 "add" 或 "delete"）"""
+        self._append_line({"op": op, "event": event}, 1)
+
+    def append_batch(self, records: list[dict]) -> None:
+        """以單一 journal 行追加多筆操作（{"op", "event"}）
+
+        整批寫成一行，寫到一半當機時整行會在重播時截掉，不會只套用部分操作。
+        """
+        if records:
+            self._append_line({"op": "batch", "ops": records}, len(records))
+
+    def _append_line(self, record: dict, count: int) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = []
+        if not self.journal_path.exists() or self.journal_path.stat().st_size == 0:
+            lines.append(json.dumps({"base": self._base, "version": self.version}))
+        lines.append(json.dumps(record, ensure_ascii=False))
+
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._offset = f.tell()
+            self._journal_ino = os.fstat(f.fileno()).st_ino
+        self.pending += count
+        self.version += 1
+
+    def changes_since(self, version: int) -> list[dict] | None:
+        """version 之後寫入的操作（{"op", "event"}，依寫入順序）
+
+        Returns:
+            操作列表；需要的紀錄已被 compaction 併入 snapshot、儲存被重置過或 version 比目前新時回傳 None
+        """
+        with self.lock():
+            self.load()
+            if version == self.version:
+                return []
+            if version > self.version or not self.journal_path.exists():
+                return None
+            lines = self.journal_path.read_bytes().decode("utf-8").splitlines()
+            header = json.loads(lines[0])
+            base = header.get("version", 0)
+            if header.get("base") != self._base or version < base:
+                return None
+            return [op for line in lines[1 + version - base:] for op in expand(json.loads(line))]
+
+    def rollback(self, version: int) -> int | None:
+        """撤銷 version 之後的寫入（反向操作寫成一行 batch），回傳撤銷的操作數；無法撤銷時回傳 None（不修改）"""
+        with self.lock():
+            ops = self.changes_since(version)
+            if ops is None:
+                return None
+            self.append_batch(invert(ops))
+        return len(ops)
+
+    @contextmanager
+    def lock(self, timeout: float = LOCK_TIMEOUT):
+        """跨 process 的排他鎖（flock），寫入前取得；逾時拋出 StoreBusy"""
+        if self._lock_depth:
+            # 同一個 store 重入（如交易中的 compaction）
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise StoreBusy(f"等待 {self.lock_path.name} 逾時")
+                        time.sleep(0.002)
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def should_compact(self) -> bool:
+        return self.pending >= self.compact_every
+
+    def compact(self, events: list[dict]) -> None:
+        """將目前事件寫成新 snapshot，並清空 journal"""
+        data = json.dumps(events, indent=2, ensure_ascii=False).encode("utf-8")
+        self._write_atomic(self.snapshot_path, data)
+        self._base = _digest(data)
+        # 新 journal 只含 header；若在此之前當機，舊 journal 的 base 與新 snapshot 不符會被忽略
+        self._reset_journal()
+        self.pending = 0
+        self._snapshot_sig = self._stat(self.snapshot_path)
+
+    def _reset_journal(self) -> None:
+        header = (json.dumps({"base": self._base, "version": self.version}) + "\n").encode("utf-8")
+        self._write_atomic(self.journal_path, header)
+        self._journal_ino = self.journal_path.stat().st_ino
+        self._offset = len(header)
+
+    def reset(self, events: list[dict]) -> None:
+        """以指定事件重置儲存（snapshot 覆寫、journal 清空；版本號接續之前的版本）"""
+        with self.lock():
+            self.load()
+            self.version += 1
+            self.compact(events)
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
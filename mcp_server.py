@@ -5,80 +5,83 @@ Calendar MCP Server
 """
 
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+import os
 from datetime import date, datetime, timedelta
-import json
 from pathlib import Path
 
-mcp = FastMCP("Calendar")
-
-# 2026 台灣假日
-HOLIDAYS_2026 = {
-    date(2026, 1, 1): "元旦",
-    date(2026, 2, 14): "春節假期",
-    date(2026, 2, 15): "小年夜",
-    date(2026, 2, 16): "除夕",
-    date(2026, 2, 17): "春節",
-    date(2026, 2, 18): "春節",
-    date(2026, 2, 19): "春節",
-    date(2026, 2, 20): "春節假期",
-    date(2026, 2, 28): "和平紀念日",
-    date(2026, 4, 4): "兒童節",
-    date(2026, 4, 5): "清明節",
-    date(2026, 5, 1): "勞動節",
-    date(2026, 5, 31): "端午節",
-    date(2026, 10, 1): "中秋節",
-    date(2026, 10, 10): "國慶日",
-}
+import calendar_engine
+from calendar_engine import (
+    BusinessCalendar,
+    Calendar,
+    CalendarRegistry,
+    EventIndex,
+    JournalStore,
+    SqliteStore,
+    StoreBusy,
+    VersionConflict,
+    new_event_id,
+)
+from calendar_engine.backends import BACKENDS, DEFAULT_BACKEND, open_store
+from calendar_engine.registry import DEFAULT_MAX_LOADED
+
+# FASTMCP_LOG_LEVEL=WARNING 可關閉每次工具呼叫的 INFO log（大量呼叫時，如 benchmark）
+mcp = FastMCP("Calendar", log_level=os.getenv("FASTMCP_LOG_LEVEL", "INFO"))
+
+# 工作日曆：假日資料檔（HOLIDAYS_PATH，預設 data/holidays.json）中的地區（HOLIDAY_REGION，預設 TW）
+HOLIDAYS_FILE = Path(os.getenv("HOLIDAYS_PATH", Path(__file__).parent / "data" / "holidays.json"))
+_business = BusinessCalendar.from_file(HOLIDAYS_FILE, os.getenv("HOLIDAY_REGION", "TW"))
 
 
 def _is_working_day(d: date) -> tuple[bool, str | None]:
     """判斷是否為工作日"""
-    if d.weekday() == 5:
-        return False, "週六"
-    if d.weekday() == 6:
-        return False, "週日"
-    if d in HOLIDAYS_2026:
-        return False, HOLIDAYS_2026[d]
-    return True, None
+    return _business.check(d)
 
 
 def _get_next_working_days(from_date: date, count: int = 3) -> list[date]:
     """取得接下來的工作日"""
-    result = []
-    current = from_date
-    while len(result) < count:
-        current += timedelta(days=1)
-        if _is_working_day(current)[0]:
-            result.append(current)
-    return result
+    return _business.next_working_days(from_date, count)
+
+# 儲存引擎（CALENDAR_BACKEND）：json（snapshot + journal，預設）或 sqlite
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", DEFAULT_BACKEND)
+if CALENDAR_BACKEND not in BACKENDS:
+    raise ValueError(f"不支援的 CALENDAR_BACKEND: {CALENDAR_BACKEND!r}（可用: {', '.join(BACKENDS)}）")
 
-# 原始資料（唯讀）
+# 預設行事曆：原始資料（唯讀）與工作檔案（可寫，output/calendar.json 或 output/calendar.sqlite3）
+# CALENDAR_WORKING_BASE 可改用其他工作檔案（不含副檔名；benchmark 以此隔離，不動 run.py 的工作行事曆）
 ORIGINAL_FILE = Path(__file__).parent / "data" / "calendar.json"
-# 工作檔案（可寫）
-WORKING_FILE = Path(__file__).parent / "output" / "calendar.json"
+WORKING_BASE = Path(os.getenv("CALENDAR_WORKING_BASE", Path(__file__).parent / "output" / "calendar"))
+DEFAULT_CALENDAR = "default"
 
+# 其他行事曆：種子資料 data/calendars/<id>.json（可無），工作檔案 output/calendars/<id>.json（或 .sqlite3）
+SEED_DIR = Path(__file__).parent / "data" / "calendars"
+CALENDARS_DIR = Path(__file__).parent / "output" / "calendars"
 
-def _load() -> list[dict]:
-    # 優先讀取工作檔案，若不存在則讀取原始檔案
-    if WORKING_FILE.exists():
-        with open(WORKING_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    if ORIGINAL_FILE.exists():
-        with open(ORIGINAL_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
 
+def _open_store(calendar_id: str) -> JournalStore | SqliteStore:
+    # 每個行事曆一份獨立的儲存（JSON 時 journal 與 snapshot 同目錄，副檔名 .journal.jsonl）
+    if calendar_id == DEFAULT_CALENDAR:
+        return open_store(CALENDAR_BACKEND, WORKING_BASE, seed_path=ORIGINAL_FILE)
+    return open_store(CALENDAR_BACKEND, CALENDARS_DIR / calendar_id, seed_path=SEED_DIR / f"{calendar_id}.json")
 
-def _save(events: list[dict]) -> None:
-    # 確保 output 目錄存在
-    WORKING_FILE.parent.mkdir(exist_ok=True)
-    events.sort(key=lambda x: x["start"])
-    with open(WORKING_FILE, "w", encoding="utf-8") as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
 
+# 依 calendar_id 延遲載入，常駐記憶體的行事曆數量以 LRU 限制（CALENDAR_MAX_LOADED）
+_registry = CalendarRegistry(
+    _open_store,
+    max_loaded=int(os.getenv("CALENDAR_MAX_LOADED", DEFAULT_MAX_LOADED)),
+)
 
-@mcp.tool()
-def get_calendar_events(start_date: str = None, end_date: str = None) -> list[dict]:
+
+def _get_calendar(calendar_id: str | None) -> Calendar:
+    return _registry.get(calendar_id or DEFAULT_CALENDAR)
+
+
+# 唯讀工具標記 readOnlyHint，client 端可安全地分散到多個 server process
+READ_ONLY = ToolAnnotations(readOnlyHint=True)
+
+
+@mcp.tool(annotations=READ_ONLY)
+def get_calendar_events(start_date: str = None, end_date: str = None, calendar_id: str = None) -> list[dict]:
     """查詢行事曆事件，檢查時間衝突或尋找可用時段。
 
     使用時機：
@@ -90,114 +93,256 @@ def get_calendar_events(start_date: str = None, end_date: str = None) -> list[di
     Args:
         start_date: 篩選開始時間（ISO 格式，如 2026-01-20 或 2026-01-20T14:00:00）
         end_date: 篩選結束時間（ISO 格式）
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
 
     Returns:
         與查詢時段重疊的事件列表，每個事件包含 title, start, end
     """
-    events = _load()
+    # 與查詢時段重疊的事件；只有 start_date 時為該時間點之後的事件（SQLite 引擎直接以 SQL 範圍查詢）
+    return _get_calendar(calendar_id).events_between(start_date, end_date)
+
+
+def _write(calendar_id: str | None, expected_version: int | None, apply) -> dict:
+    # 在寫入交易內執行 apply(calendar, index)；版本不符或鎖逾時回傳可重試的錯誤
+    calendar = _get_calendar(calendar_id)
+    try:
+        with calendar.transaction(expected_version) as index:
+            result = apply(calendar, index)
+    except VersionConflict as e:
+        return {
+            "success": False,
+            "reason": "version_conflict",
+            "retryable": True,
+            "expected_version": e.expected,
+            "current_version": e.current,
+        }
+    except StoreBusy:
+        return {"success": False, "reason": "busy", "retryable": True}
+    result["version"] = calendar.version
+    return result
 
-    if start_date and end_date:
-        # 找出與查詢時段重疊的事件
-        query_start = datetime.fromisoformat(start_date)
-        query_end = datetime.fromisoformat(end_date)
-        events = [
-            e for e in events
-            if datetime.fromisoformat(e["start"]) < query_end
-            and datetime.fromisoformat(e["end"]) > query_start
-        ]
-    elif start_date:
-        # 只有 start_date：找該時間點之後的事件
-        start = datetime.fromisoformat(start_date)
-        events = [e for e in events if datetime.fromisoformat(e["end"]) > start]
 
-    return events
+@mcp.tool(annotations=READ_ONLY)
+def get_calendar_version(calendar_id: str = None) -> dict:
+    """取得行事曆目前的版本號（每次修改加一）。
+
+    需要「讀取 → 決定 → 寫入」之間不被其他寫入插隊時，將讀到的版本傳給寫入工具的 expected_version。
+
+    Args:
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+
+    Returns:
+        {"calendar_id": ..., "version": 版本號, "event_count": 事件數}
+    """
+    calendar = _get_calendar(calendar_id)
+    index = calendar.get_index()
+    return {"calendar_id": calendar_id or DEFAULT_CALENDAR, "version": calendar.version, "event_count": len(index)}
 
 
 @mcp.tool()
-def add_calendar_event(title: str, start: str, end: str) -> dict:
+def add_calendar_event(
+    title: str,
+    start: str,
+    end: str,
+    calendar_id: str = None,
+    expected_version: int = None,
+) -> dict:
     """新增行事曆事件。
 
     ⚠️ 呼叫此工具前，必須先完成以下檢查：
     1. 呼叫 check_working_day 確認該日為工作日（is_working=true）
     2. 呼叫 get_calendar_events 確認無時間衝突
 
-    若為「改期」請求（如「1/27 改到 1/23」）：
-    - 先呼叫 delete_calendar_event 刪除舊會議
-    - 再呼叫此工具新增新會議
+    若為「改期」請求（如「1/27 改到 1/23」）：請改用 move_calendar_event，一次完成
 
     Args:
         title: 事件標題（如「合作洽談」「視訊會議」）
         start: 開始時間（ISO 格式，如 2026-01-20T14:00:00）
         end: 結束時間（ISO 格式，如 2026-01-20T15:00:00）
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+        expected_version: 預期的行事曆版本（可省略，見 get_calendar_version）；與目前版本不符時不修改，
+            回傳 {"success": false, "reason": "version_conflict", "retryable": true}。成功時回傳新的 version
 
     Returns:
         成功: {"success": true, "event": {...}}
         衝突: {"success": false, "reason": "conflict", "conflict_with": "衝突事件名稱"}
     """
-    events = _load()
-    new_start = datetime.fromisoformat(start)
-    new_end = datetime.fromisoformat(end)
-
-    # 檢查衝突
-    for e in events:
-        e_start = datetime.fromisoformat(e["start"])
-        e_end = datetime.fromisoformat(e["end"])
-        if new_start < e_end and new_end > e_start:
+    def apply(calendar: Calendar, index: EventIndex) -> dict:
+        # 檢查衝突
+        conflicts = index.overlapping(start, end)
+        if conflicts:
             return {
                 "success": False,
                 "reason": "conflict",
-                "conflict_with": e["title"],
+                "conflict_with": conflicts[0][1]["title"],
             }
 
-    new_event = {"title": title, "start": start, "end": end}
-    events.append(new_event)
-    _save(events)
+        new_event = {"id": new_event_id(), "title": title, "start": start, "end": end}
+        index.add(new_event)
+        calendar.commit("add", new_event)
 
-    return {"success": True, "event": new_event}
+        return {"success": True, "event": new_event}
+
+    return _write(calendar_id, expected_version, apply)
+
+
+def _find_matches(
+    index: EventIndex,
+    title: str | None = None,
+    start: str | None = None,
+    event_id: str | None = None,
+) -> list[tuple[int, dict]]:
+    # 依 id、標題（部分匹配，走標題索引）或開始時間找出 (seq, event)；同時給 title 與 start 時兩者皆須符合
+    if event_id:
+        hit = index.get(event_id)
+        return [hit] if hit else []
+    if title:
+        return [(seq, e) for seq, e in index.search_title(title) if not start or e["start"] == start]
+    return index.starting_at(start)
 
 
 @mcp.tool()
-def delete_calendar_event(title: str = None, start: str = None) -> dict:
+def delete_calendar_event(
+    title: str = None,
+    start: str = None,
+    event_id: str = None,
+    dry_run: bool = False,
+    require_unique: bool = False,
+    calendar_id: str = None,
+    expected_version: int = None,
+) -> dict:
     """刪除行事曆事件。
 
     使用時機：
-    - 處理「改期」請求時，必須先刪除舊會議再新增新會議
-    - 例如：郵件說「1/27 改到 1/23」→ 先刪除 1/27，再新增 1/23
+    - 會議取消時刪除該會議
+    - 「改期」請求（如「1/27 改到 1/23」）請改用 move_calendar_event，不要先刪除再新增
 
-    ⚠️ 改期請求的正確流程：
-    1. delete_calendar_event(start="2026-01-27T14:00:00")  # 刪除舊的
-    2. check_working_day("2026-01-23")  # 檢查新日期
-    3. add_calendar_event(...)  # 新增新的
+    建議以 event_id（get_calendar_events 回傳的 id）指定事件。
+    依標題或時間刪除時會刪除所有符合的事件；不確定會刪到哪些事件時，先以 dry_run=true 預覽，
+    或設定 require_unique=true（符合多個事件時不刪除並回傳候選清單）。
 
     Args:
         title: 依標題刪除（部分匹配，如「視訊會議」）
         start: 依開始時間刪除（ISO 格式，如 2026-01-27T14:00:00）
+        event_id: 依事件 id 刪除（最精確）
+        dry_run: true 時只回傳符合的事件與目前的 version，不刪除（唯讀，不檢查 expected_version）
+        require_unique: true 時只在恰好符合一個事件時刪除
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+        expected_version: 預期的行事曆版本（可省略，見 get_calendar_version）；與目前版本不符時不修改，
+            回傳 {"success": false, "reason": "version_conflict", "retryable": true}。成功時回傳新的 version
 
     Returns:
-        成功: {"success": true, "deleted_count": 刪除數量}
-        失敗: {"success": false, "reason": "錯誤原因"}
+        成功: {"success": true, "deleted_count": 刪除數量, "deleted": [...]}
+        預覽: {"success": true, "dry_run": true, "matches": [...], "version": 目前版本}
+        失敗: {"success": false, "reason": "錯誤原因"}（require_unique 且符合多個事件時附 matches）
     """
-    if not title and not start:
-        return {"success": False, "reason": "需提供 title 或 start"}
+    if not event_id and not title and not start:
+        return {"success": False, "reason": "需提供 event_id、title 或 start"}
+
+    if dry_run:
+        # 預覽不進入寫入交易（不取檔案鎖 / SQLite 寫入交易）
+        calendar = _get_calendar(calendar_id)
+        matches = _find_matches(calendar.get_index(), title, start, event_id)
+        if not matches:
+            return {"success": False, "reason": "找不到符合的事件"}
+        return {"success": True, "dry_run": True, "matches": [e for _, e in matches], "version": calendar.version}
+
+    def apply(calendar: Calendar, index: EventIndex) -> dict:
+        matches = _find_matches(index, title, start, event_id)
+        if not matches:
+            return {"success": False, "reason": "找不到符合的事件"}
+        if len(matches) > 1 and require_unique:
+            return {
+                "success": False,
+                "reason": f"符合 {len(matches)} 個事件，請以 event_id 指定",
+                "matches": [e for _, e in matches],
+            }
 
-    events = _load()
-    original_count = len(events)
+        deleted = [index.remove(seq) for seq, _ in matches]
+        # 多筆刪除寫成同一行 journal
+        calendar.commit_batch([{"op": "delete", "event": e} for e in deleted])
+        return {"success": True, "deleted_count": len(deleted), "deleted": deleted}
+
+    return _write(calendar_id, expected_version, apply)
 
-    if title:
-        events = [e for e in events if title.lower() not in e["title"].lower()]
-    elif start:
-        events = [e for e in events if e["start"] != start]
 
-    deleted = original_count - len(events)
-    if deleted == 0:
-        return {"success": False, "reason": "找不到符合的事件"}
+@mcp.tool()
+def move_calendar_event(
+    new_start: str,
+    new_end: str,
+    title: str = None,
+    start: str = None,
+    event_id: str = None,
+    new_title: str = None,
+    calendar_id: str = None,
+    expected_version: int = None,
+) -> dict:
+    """將既有事件移到新時段（改期），刪除舊時段與新增新時段在同一個交易中完成。
 
-    _save(events)
-    return {"success": True, "deleted_count": deleted}
+    使用時機：
+    - 「改期」請求，如郵件說「1/27 改到 1/23 下午 2 ~ 4 點」
+      → move_calendar_event(start="2026-01-27T14:00:00", new_start="2026-01-23T14:00:00",
+                            new_end="2026-01-23T16:00:00")
 
+    ⚠️ 呼叫前仍須以 check_working_day 確認新日期為工作日。
+    衝突檢查會排除被移動的事件本身（新舊時段重疊也可移動）。
+    新時段有衝突時不做任何修改，舊會議保持原樣。
 
-@mcp.tool()
-def check_working_day(date_str: str) -> dict:
+    Args:
+        new_start: 新的開始時間（ISO 格式，如 2026-01-23T14:00:00）
+        new_end: 新的結束時間（ISO 格式）
+        title: 依標題找出要移動的事件（部分匹配，如「合作廠商會議」）
+        start: 依開始時間找出要移動的事件（ISO 格式，如 2026-01-27T14:00:00）
+        event_id: 依事件 id 找出要移動的事件（最精確）
+        new_title: 新的標題（可省略，沿用原標題）
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+        expected_version: 預期的行事曆版本（可省略，見 get_calendar_version）；與目前版本不符時不修改，
+            回傳 {"success": false, "reason": "version_conflict", "retryable": true}。成功時回傳新的 version
+
+    Returns:
+        成功: {"success": true, "old_event": {...}, "event": {...}}（移動後保留原 id）
+        衝突: {"success": false, "reason": "conflict", "conflict_with": "衝突事件名稱"}
+        失敗: {"success": false, "reason": "錯誤原因"}（找不到事件或符合多個事件）
+    """
+    if not event_id and not title and not start:
+        return {"success": False, "reason": "需提供 event_id、title 或 start"}
+
+    def apply(calendar: Calendar, index: EventIndex) -> dict:
+        matches = _find_matches(index, title, start, event_id)
+        if not matches:
+            return {"success": False, "reason": "找不到符合的事件"}
+        if len(matches) > 1:
+            return {
+                "success": False,
+                "reason": "符合多個事件，請以 event_id 指定",
+                "matches": [e for _, e in matches],
+            }
+
+        seq = matches[0][0]
+        conflicts = [e for other, e in index.overlapping(new_start, new_end) if other != seq]
+        if conflicts:
+            return {"success": False, "reason": "conflict", "conflict_with": conflicts[0]["title"]}
+
+        old_event = index.remove(seq)
+        new_event = {
+            "id": old_event["id"],
+            "title": new_title or old_event["title"],
+            "start": new_start,
+            "end": new_end,
+        }
+        index.add(new_event)
+        # 刪除與新增寫成同一行 journal
+        calendar.commit_batch([
+            {"op": "delete", "event": old_event},
+            {"op": "add", "event": new_event},
+        ])
+        return {"success": True, "old_event": old_event, "event": new_event}
+
+    return _write(calendar_id, expected_version, apply)
+
+
+@mcp.tool(annotations=READ_ONLY)
+def check_working_day(date_str: str | list[str]) -> dict | list[dict]:
     """檢查日期是否為工作日（排除週末和國定假日）。
 
     ⚠️ 處理會議邀約時，必須首先呼叫此工具！
@@ -212,14 +357,23 @@ def check_working_day(date_str: str) -> dict:
     - 若為非工作日，使用 suggested_alternatives 建議替代日期
 
     Args:
-        date_str: 日期，格式為 YYYY-MM-DD（如 2026-01-20）
+        date_str: 日期，格式為 YYYY-MM-DD（如 2026-01-20）；
+            有多個候選日期時可傳入列表（如 ["2026-01-22", "2026-01-23"]），一次檢查
 
     Returns:
+        單一日期回傳一個結果，列表則依序回傳結果列表。每個結果包含：
         - date: 查詢的日期
         - is_working: true/false
         - reason: 若為非工作日，說明原因（如「週六」「除夕」）
-        - suggested_alternatives: 若為非工作日，提供 3 個替代工作日
+        - suggested_alternatives: 若為非工作日，提供 3 個替代工作日（只有日期，
+          需要具體時段請用 find_free_slots）
     """
+    if isinstance(date_str, list):
+        return [_check_date(d) for d in date_str]
+    return _check_date(date_str)
+
+
+def _check_date(date_str: str) -> dict:
     d = date.fromisoformat(date_str)
     is_working, reason = _is_working_day(d)
 
@@ -233,5 +387,226 @@ def check_working_day(date_str: str) -> dict:
     return result
 
 
+@mcp.tool(annotations=READ_ONLY)
+def check_working_days(dates: list[str]) -> list[dict]:
+    """一次檢查多個日期是否為工作日（有多個候選日期時使用，取代逐一呼叫 check_working_day）。
+
+    Args:
+        dates: 日期列表，格式為 YYYY-MM-DD（如 ["2026-01-22", "2026-01-23"]）
+
+    Returns:
+        依輸入順序的結果列表，欄位同 check_working_day
+    """
+    return [_check_date(d) for d in dates]
+
+
+@mcp.tool(annotations=READ_ONLY)
+def get_calendar_events_multi(ranges: list[dict], calendar_id: str = None) -> list[dict]:
+    """一次查詢多個時段的行事曆事件（比較多個候選時段時使用，取代逐一呼叫 get_calendar_events）。
+
+    Args:
+        ranges: 時段列表，每個時段包含 start_date、end_date（ISO 格式），
+            如 [{"start_date": "2026-01-22T14:00:00", "end_date": "2026-01-22T15:00:00"}]
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+
+    Returns:
+        依輸入順序的結果列表，每個結果包含 start_date, end_date,
+        events（與該時段重疊的事件；有事件即表示有衝突）
+    """
+    calendar = _get_calendar(calendar_id)
+    return [
+        {
+            "start_date": r["start_date"],
+            "end_date": r["end_date"],
+            "events": calendar.events_between(r["start_date"], r["end_date"]),
+        }
+        for r in ranges
+    ]
+
+
+@mcp.tool()
+def apply_calendar_ops(ops: list[dict], calendar_id: str = None, expected_version: int = None) -> dict:
+    """依序執行多個新增/刪除操作，全部成功才生效（任何一個失敗則全部不生效）。
+
+    使用時機：
+    - 需要一起完成的多個修改（如一次新增多個會議；單純改期請用 move_calendar_event）
+    - 新增的衝突檢查會考慮同一批中先前的操作（例如先刪除再於同時段新增）
+
+    Args:
+        ops: 操作列表，每個操作為：
+            {"op": "add", "title": ..., "start": ..., "end": ...}
+            {"op": "delete", "event_id": ...}、{"op": "delete", "title": ...} 或 {"op": "delete", "start": ...}
+            欄位意義同 add_calendar_event / delete_calendar_event（delete 預設刪除所有符合的事件，可加 "require_unique": true）
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+        expected_version: 預期的行事曆版本（可省略，見 get_calendar_version）；與目前版本不符時不修改，
+            回傳 {"success": false, "reason": "version_conflict", "retryable": true}。成功時回傳新的 version
+
+    Returns:
+        成功: {"success": true, "results": [每個操作的結果]}
+        失敗: {"success": false, "failed_op": 失敗操作的索引, "reason": "錯誤原因"}（行事曆不變）
+    """
+    def apply(calendar: Calendar, index: EventIndex) -> dict:
+        records: list[dict] = []
+        # 失敗時依反序還原記憶體索引：("add", seq) 或 ("delete", event)
+        undo: list[tuple[str, int | dict]] = []
+        results: list[dict] = []
+        failure = None
+
+        for i, op in enumerate(ops):
+            try:
+                kind = op.get("op")
+                if kind == "add":
+                    conflicts = index.overlapping(op["start"], op["end"])
+                    if conflicts:
+                        failure = {"reason": "conflict", "conflict_with": conflicts[0][1]["title"]}
+                    else:
+                        event = {"id": new_event_id(), "title": op["title"], "start": op["start"], "end": op["end"]}
+                        undo.append(("add", index.add(event)))
+                        records.append({"op": "add", "event": event})
+                        results.append({"op": "add", "event": event})
+                elif kind == "delete":
+                    if not op.get("event_id") and not op.get("title") and not op.get("start"):
+                        failure = {"reason": "需提供 event_id、title 或 start"}
+                    elif not (matches := _find_matches(index, op.get("title"), op.get("start"), op.get("event_id"))):
+                        failure = {"reason": "找不到符合的事件"}
+                    elif len(matches) > 1 and op.get("require_unique"):
+                        failure = {"reason": f"符合 {len(matches)} 個事件，請以 event_id 指定"}
+                    else:
+                        for seq, _ in matches:
+                            event = index.remove(seq)
+                            undo.append(("delete", event))
+                            records.append({"op": "delete", "event": event})
+                        results.append({"op": "delete", "deleted_count": len(matches)})
+                else:
+                    failure = {"reason": f"不支援的操作: {kind!r}"}
+            except (KeyError, ValueError, AttributeError) as e:
+                failure = {"reason": f"操作格式錯誤: {e!r}"}
+
+            if failure is not None:
+                for kind, item in reversed(undo):
+                    if kind == "add":
+                        index.remove(item)
+                    else:
+                        index.add(item)
+                return {"success": False, "failed_op": i, **failure}
+
+        # 整批寫成一行 journal
+        calendar.commit_batch(records)
+        return {"success": True, "results": results}
+
+    return _write(calendar_id, expected_version, apply)
+
+
+# 未指定 end_date 時的搜尋天數
+DEFAULT_SEARCH_DAYS = 14
+
+
+def _window_bound(value: str, end: bool = False) -> datetime:
+    # 只有日期時：開始取當天 00:00，結束取隔天 00:00（含當天）
+    dt = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        dt += timedelta(days=1)
+    return dt
+
+
+@mcp.tool(annotations=READ_ONLY)
+def find_free_slots(
+    start_date: str,
+    end_date: str = None,
+    duration_minutes: int = 60,
+    work_start: str = "09:00",
+    work_end: str = "18:00",
+    buffer_minutes: int = 0,
+    max_results: int = 3,
+    calendar_id: str = None,
+) -> list[dict]:
+    """尋找可安排會議的空檔（已排除週末、國定假日與既有行程）。
+
+    使用時機：
+    - 邀約日期不是工作日或時段有衝突，需要建議替代時段時
+    - 一次取得多個可用時段，不需逐日呼叫 get_calendar_events 試探
+
+    Args:
+        start_date: 搜尋開始（ISO 格式，如 2026-01-20 或 2026-01-20T14:00:00）
+        end_date: 搜尋結束（ISO 格式；只有日期時包含當天），預設為開始後 14 天
+        duration_minutes: 會議長度（分鐘），預設 60
+        work_start: 每日最早開始時間（HH:MM），預設 09:00
+        work_end: 每日最晚結束時間（HH:MM），預設 18:00
+        buffer_minutes: 與既有行程之間至少間隔的分鐘數，預設 0
+        max_results: 最多回傳幾個時段，預設 3
+        calendar_id: 行事曆 ID（多使用者時區分不同人的行事曆），預設 "default"
+
+    Returns:
+        依時間排序的可用時段列表，每個時段包含 start, end, free_minutes（所在空檔的總長度）
+    """
+    window_start = _window_bound(start_date)
+    window_end = (
+        _window_bound(end_date, end=True) if end_date
+        else window_start + timedelta(days=DEFAULT_SEARCH_DAYS)
+    )
+    return calendar_engine.find_free_slots(
+        _get_calendar(calendar_id).get_index(),
+        window_start,
+        window_end,
+        duration_minutes=duration_minutes,
+        work_start=work_start,
+        work_end=work_end,
+        buffer_minutes=buffer_minutes,
+        max_results=max_results,
+        is_working_day=_business.is_working_day,
+    )
+
+
+@mcp.tool(annotations=READ_ONLY)
+def find_common_availability(
+    calendar_ids: list[str],
+    start_date: str,
+    end_date: str = None,
+    duration_minutes: int = 60,
+    work_start: str = "09:00",
+    work_end: str = "18:00",
+    buffer_minutes: int = 0,
+    max_results: int = 3,
+) -> list[dict]:
+    """尋找所有與會者都有空的時段（多人會議用，一次查詢所有人的行事曆）。
+
+    使用時機：
+    - 會議邀約有多位與會者，需要找出大家都有空的時段
+    - 不需逐一呼叫 get_calendar_events 再自行比對
+
+    Args:
+        calendar_ids: 與會者的行事曆 ID 列表（如 ["default", "alice", "bob"]）
+        start_date: 搜尋開始（ISO 格式，如 2026-01-20 或 2026-01-20T14:00:00）
+        end_date: 搜尋結束（ISO 格式；只有日期時包含當天），預設為開始後 14 天
+        duration_minutes: 會議長度（分鐘），預設 60
+        work_start: 每日最早開始時間（HH:MM），預設 09:00
+        work_end: 每日最晚結束時間（HH:MM），預設 18:00
+        buffer_minutes: 與既有行程之間至少間隔的分鐘數，預設 0
+        max_results: 最多回傳幾個時段，預設 3
+
+    Returns:
+        依時間排序（最早可行者優先）的共同空檔列表，每個時段包含 start, end,
+        free_minutes（所在空檔的總長度）
+    """
+    window_start = _window_bound(start_date)
+    window_end = (
+        _window_bound(end_date, end=True) if end_date
+        else window_start + timedelta(days=DEFAULT_SEARCH_DAYS)
+    )
+    # 先取得所有索引再掃描（與會者多於 LRU 上限時，被淘汰的索引在本次查詢中仍可使用）
+    indexes = [_get_calendar(cid).get_index() for cid in dict.fromkeys(calendar_ids or [DEFAULT_CALENDAR])]
+    return calendar_engine.find_common_availability(
+        indexes,
+        window_start,
+        window_end,
+        duration_minutes=duration_minutes,
+        work_start=work_start,
+        work_end=work_end,
+        buffer_minutes=buffer_minutes,
+        max_results=max_results,
+        is_working_day=_business.is_working_day,
+    )
+
+
 if __name__ == "__main__":
     mcp.run()
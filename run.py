@@ -7,10 +7,23 @@ Email Agent 主程式
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
+import asyncio
 import json
 import logging
+import os
+import sys
+import textwrap
 from pathlib import Path
-from agent import process_email
+from typing import Callable, Iterable
+from agent import GraphRunner, CalendarTurnstile, ResponseCache
+from agent.batch_classify import classify_batch
+from agent.inbox import DEFAULT_WINDOW, InboxStream
+from agent.results import ResultLog
+from agent.metrics import Histogram, counters, histograms, render_quantiles, write_prometheus
+from agent.tracing import SpanLog
+from calendar_engine import open_store
+from calendar_engine.backends import DEFAULT_BACKEND
 
 # 設定 logging
 LOG_FILE = Path(__file__).parent / "output" / "agent.log"
@@ -45,8 +58,9 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 
 TODAY = "2026-01-19"
 
-# 工作用行事曆（MCP Server 會操作這個檔案）
-WORKING_CALENDAR = OUTPUT_DIR / "calendar.json"
+# 工作用行事曆（MCP Server 會操作這個檔案；CALENDAR_BACKEND 決定為 calendar.json 或 calendar.sqlite3）
+WORKING_CALENDAR = OUTPUT_DIR / "calendar"
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", DEFAULT_BACKEND)
 
 
 def load_emails() -> list[dict]:
@@ -64,104 +78,340 @@ def load_original_calendar() -> list[dict]:
 
 
 def load_calendar() -> list[dict]:
-    """載入目前行事曆（工作檔案）"""
-    if WORKING_CALENDAR.exists():
-        with open(WORKING_CALENDAR, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return load_original_calendar()
+    """載入目前行事曆（工作 snapshot + journal 或 SQLite）"""
+    events = open_store(CALENDAR_BACKEND, WORKING_CALENDAR, seed_path=DATA_DIR / "calendar.json").load()
+    events.sort(key=lambda x: x["start"])
+    return events
 
 
 def reset_working_calendar():
-    """重置工作行事曆為原始狀態"""
-    original = load_original_calendar()
-    with open(WORKING_CALENDAR, "w", encoding="utf-8") as f:
-        json.dump(original, f, indent=2, ensure_ascii=False)
-
-
-async def main():
+    """重置工作行事曆為原始狀態（同時清空 journal）"""
+    open_store(CALENDAR_BACKEND, WORKING_CALENDAR).reset(load_original_calendar())
+
+
+def rollback_working_calendar(log: ResultLog) -> str | None:
+    """resume 前將工作行事曆還原到 checkpoint 記錄的版本
+
+    當機時可能有郵件的 meeting_agent 已寫入行事曆、結果卻還沒寫入 log（不論是否並行），
+    resume 會重新處理這些郵件；先撤銷它們的修改，避免與自己先前加入的行程衝突或重複預約。
+
+    Returns:
+        無法還原時的錯誤訊息（行事曆不變）；已還原或不需還原時回傳 None
+    """
+    expected = log.calendar_version
+    if expected is None:
+        print("\ncheckpoint 沒有記錄行事曆版本，沿用目前的行事曆")
+        return None
+    store = open_store(CALENDAR_BACKEND, WORKING_CALENDAR, seed_path=DATA_DIR / "calendar.json")
+    store.load()
+    current = store.version
+    if current == expected:
+        return None
+    undone = store.rollback(expected) if current > expected else None
+    if undone is None:
+        return (
+            f"工作行事曆（版本 {current}）無法還原到 checkpoint 的版本 {expected}"
+            "（期間已 compaction 或被重置）；請不加 --resume 從頭執行"
+        )
+    log.set_calendar_version(store.version)
+    print(f"\n已撤銷 checkpoint 之後寫入行事曆的 {undone} 筆操作（版本 {expected} → {current} → {store.version}）")
+    return None
+
+
+def calendar_version_tracker() -> Callable[[], int]:
+    """回傳取得工作行事曆目前版本的函式（追上 MCP Server 寫入的操作，只 stat；被 compaction 替換時才重新讀取）"""
+    store = open_store(CALENDAR_BACKEND, WORKING_CALENDAR, seed_path=DATA_DIR / "calendar.json")
+    store.load()
+
+    def version() -> int:
+        if store.poll() is None:
+            store.load()
+        return store.version
+
+    return version
+
+
+def print_result(i: int, total: int | str, email: dict, result: dict) -> None:
+    """顯示單封郵件的處理結果"""
+    print("\n" + "-" * 60)
+    print(f"[{i}/{total}] {email['id']}: {email['subject']}")
+    print(f"寄件者: {email['sender']}")
+    print("-" * 60)
+
+    print(f"分類: {result.get('category', '?')}")
+    print(f"優先級: {result.get('priority', '?')}")
+    print(f"理由: {result.get('reasoning', '?')}")
+
+    if result.get("meeting_info"):
+        info = result["meeting_info"]
+        print(f"會議日期: {info.get('date')} {info.get('start_time')}-{info.get('end_time')}")
+
+    if not result.get("is_working_day", True):
+        print(f"非工作日: {result.get('non_working_reason')}")
+        print(f"建議日期: {result.get('suggested_dates')}")
+
+    if result.get("has_conflict"):
+        print(f"時間衝突: {result.get('conflict_with')}")
+        print(f"建議日期: {result.get('suggested_dates')}")
+
+    if result.get("guardrail_triggered"):
+        print(f"護欄觸發: {result.get('guardrail_reason')}")
+
+    if result.get("needs_human_review"):
+        print(">>> 需人工審核 <<<")
+
+    if result.get("reply"):
+        print(f"\n回覆內容:\n{result['reply']}")
+
+
+async def process_all(
+    runner: GraphRunner,
+    emails: Iterable[dict],
+    concurrency: int,
+    log: ResultLog,
+    preclassified: dict[str, dict] | None = None,
+    calendar_version: Callable[[], int] | None = None,
+) -> None:
+    """處理所有郵件，結果依郵件順序逐封寫入 log（results.jsonl + checkpoint）
+
+    concurrency > 1 時以固定數量的 worker 並行處理；分類與回覆生成彼此重疊，
+    只有 meeting_agent 透過 CalendarTurnstile 依郵件順序逐一執行，結果與循序處理一致。
+    preclassified 為批次分類結果（email_id -> 分類），有的郵件不再個別呼叫 LLM 分類。
+    worker 依序取件，輪候中的郵件之前的郵件必定已被取走，不會互相卡死。
+    emails 可以是串流（InboxStream）：worker 取件時才讀取下一封，第一封讀到即開始處理。
+    resume 時 emails 為尚未處理的部分，顯示的序號接續 log 中已處理的封數。
+    calendar_version 取得目前的行事曆版本：turnstile 放行每封郵件時記下，與結果一起寫入 checkpoint。
+    """
+    offset = log.processed
+    total = offset + len(emails) if isinstance(emails, list) else "?"
+    preclassified = preclassified or {}
+    # seq -> 該郵件（與之前的郵件）都不再動到行事曆時的版本；寫入 log 後移除
+    versions: dict[int, int] = {}
+
+    def record_version(seq: int) -> None:
+        versions[seq] = calendar_version()
+
+    turnstile = CalendarTurnstile(record_version if calendar_version else None)
+    loop = asyncio.get_running_loop()
+    source = enumerate(emails)
+    # 依取件順序排隊的 (seq, email, future)；None 表示所有郵件都已處理
+    ordered: asyncio.Queue[tuple[int, dict, asyncio.Future] | None] = asyncio.Queue()
+
+    async def worker():
+        # 多個 worker 共用同一個 iterator；next() 之間沒有 await，取件順序即 seq 順序
+        for seq, email in source:
+            future = loop.create_future()
+            ordered.put_nowait((seq, email, future))
+
+            # Log 分隔線
+            agent_logger.info("")
+            agent_logger.info("=" * 60)
+            agent_logger.info(f"[{offset + seq + 1}/{total}] {email['id']}: {email['subject']}")
+            agent_logger.info("=" * 60)
+
+            try:
+                result = await runner.process(email, TODAY, turnstile, seq, preclassified.get(email["id"]))
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            ordered.put_nowait(None)
+
+    workers = asyncio.create_task(run_workers())
+
+    # 依郵件順序顯示並寫入結果（結果不留在記憶體）
+    while (item := await ordered.get()) is not None:
+        seq, email, future = item
+        result = await future
+        print_result(offset + seq + 1, total, email, result)
+        log.append(email, result, versions.pop(seq, None))
+
+    await workers
+
+
+def print_latency_table(title: str, hists: list[Histogram], label: str) -> None:
+    """各 label（節點 / 工具）的延遲分位數（毫秒）"""
+    if not hists:
+        return
+    print(f"\n{title}（毫秒）:")
+    for line in render_quantiles(hists, label):
+        print(f"   {line}")
+
+
+def save_results_json(log: ResultLog) -> None:
+    """由 results.jsonl 串流寫出 results.json（格式同 json.dump(results, indent=2)）"""
+    with open(OUTPUT_DIR / "results.json", "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, record in enumerate(log.results()):
+            record.pop("seq", None)
+            f.write(",\n" if i else "\n")
+            f.write(textwrap.indent(json.dumps(record, indent=2, ensure_ascii=False), "  "))
+        f.write("\n]" if log.processed else "]")
+
+
+async def main(
+    concurrency: int = 1,
+    cache_bypass: bool = False,
+    batch_classify: int = 0,
+    preflight: bool = True,
+    inbox: Path | None = None,
+    reorder_window: int = DEFAULT_WINDOW,
+    resume: bool = False,
+    graph_checkpoint: str | None = None,
+    retries: int = 0,
+    spans_path: Path = OUTPUT_DIR / "spans.jsonl",
+    prometheus_path: Path | None = None,
+):
     print("\n" + "=" * 60)
     print("Email Agent (LangGraph + MCP)")
     print(f"今天: {TODAY}")
     print("=" * 60)
 
-    # 重置工作行事曆
-    reset_working_calendar()
-
-    emails = load_emails()
-    print(f"\n{len(emails)} 封郵件待處理")
-
-    print(f"\n初始行事曆:")
-    for e in load_original_calendar():
-        print(f"   - {e['title']}: {e['start']}")
-
-    results = []
-
-    for i, email in enumerate(emails, 1):
-        print("\n" + "-" * 60)
-        print(f"[{i}/{len(emails)}] {email['id']}: {email['subject']}")
-        print(f"寄件者: {email['sender']}")
-        print("-" * 60)
-
-        # Log 分隔線
-        agent_logger.info("")
-        agent_logger.info("=" * 60)
-        agent_logger.info(f"[{i}/{len(emails)}] {email['id']}: {email['subject']}")
-        agent_logger.info("=" * 60)
-
-        result = await process_email(email, TODAY)
-        results.append(result)
-
-        # 顯示結果
-        print(f"分類: {result.get('category', '?')}")
-        print(f"優先級: {result.get('priority', '?')}")
-        print(f"理由: {result.get('reasoning', '?')}")
-
-        if result.get("meeting_info"):
-            info = result["meeting_info"]
-            print(f"會議日期: {info.get('date')} {info.get('start_time')}-{info.get('end_time')}")
-
-        if not result.get("is_working_day", True):
-            print(f"非工作日: {result.get('non_working_reason')}")
-            print(f"建議日期: {result.get('suggested_dates')}")
-
-        if result.get("has_conflict"):
-            print(f"時間衝突: {result.get('conflict_with')}")
-            print(f"建議日期: {result.get('suggested_dates')}")
-
-        if result.get("guardrail_triggered"):
-            print(f"護欄觸發: {result.get('guardrail_reason')}")
-
-        if result.get("needs_human_review"):
-            print(">>> 需人工審核 <<<")
-
-        if result.get("reply"):
-            print(f"\n回覆內容:\n{result['reply']}")
+    # 逐封寫入 output/results.jsonl；resume 時接續 checkpoint，行事曆還原到當時的版本
+    log = ResultLog(OUTPUT_DIR)
+    checkpoint = log.open(resume)
+    rolled_back = False
+    if checkpoint is not None:
+        version = log.calendar_version
+        error = rollback_working_calendar(log)
+        if error is not None:
+            log.close()
+            print(f"\n{error}", file=sys.stderr)
+            return 1
+        # 有撤銷操作時版本號已往前遞增
+        rolled_back = log.calendar_version != version
+    # 節點 / LLM / 工具的 span（resume 時接在之前的紀錄後面）
+    spans = SpanLog(spans_path, resume=checkpoint is not None)
+    if checkpoint is None:
+        if resume:
+            print("\n沒有 checkpoint，從頭開始")
+        # 重置工作行事曆
+        reset_working_calendar()
+        # 從頭開始時不沿用上次中斷的郵件 checkpoint（只刪 SQLite 資料庫本身與它的 WAL / shared-memory 檔）
+        if graph_checkpoint not in (None, "memory"):
+            for suffix in ("", "-wal", "-shm"):
+                Path(graph_checkpoint + suffix).unlink(missing_ok=True)
+
+    stream = None
+    if inbox is not None:
+        # 串流讀取：不整份載入，依 timestamp 在有界視窗內重排（resume 時 emails 會換成略過已處理部分的 iterator）
+        emails = stream = InboxStream(inbox, window=reorder_window)
+        print(f"\n串流讀取 {inbox}（重排視窗 {reorder_window} 封，並行數 {concurrency}）")
+    else:
+        emails = load_emails()
+        print(f"\n{len(emails)} 封郵件待處理（並行數 {concurrency}）")
+
+    if checkpoint is None:
+        print(f"\n初始行事曆:")
+        for e in load_original_calendar():
+            print(f"   - {e['title']}: {e['start']}")
+    else:
+        emails = log.skip_processed(emails)
+        print(f"\n從 checkpoint 接續：已處理 {checkpoint['processed']} 封（最後一封 {checkpoint['last_id']}）")
+        print(f"\n目前行事曆:")
+        for e in load_calendar():
+            print(f"   - {e['title']}: {e['start']}")
+
+    cache = ResponseCache.from_env(bypass=cache_bypass) if cache_bypass else None
+    # 失敗的郵件由最後完成的節點重試；需要 checkpoint，未指定時使用記憶體
+    if retries > 0 and graph_checkpoint is None:
+        graph_checkpoint = "memory"
+    async with GraphRunner(
+        cache=cache,
+        preflight=preflight,
+        checkpoint=graph_checkpoint,
+        attempts=retries + 1,
+        spans=spans,
+        # 行事曆已撤銷中斷郵件的寫入：它們的節點 checkpoint（可能已過了 meeting_agent）不能再沿用
+        resume_interrupted=not rolled_back,
+    ) as runner:
+        preclassified = None
+        if batch_classify > 0:
+            # 先以批次請求分類整個收件匣，再逐封進入 graph
+            preclassified = await classify_batch(
+                emails,
+                runner.llm,
+                runner.cache,
+                runner.pre_classifier,
+                batch_size=batch_classify,
+                concurrency=concurrency,
+            )
+        try:
+            await process_all(runner, emails, concurrency, log, preclassified, calendar_version_tracker())
+        finally:
+            log.close()
+            spans.close()
+        cache_stats = runner.cache.stats()
+        rule_stats = runner.pre_classifier.stats()
 
     # 統計
     print("\n" + "=" * 60)
     print("處理完成")
     print("=" * 60)
 
+    # 由 results.jsonl 串流統計（resume 時包含之前已處理的郵件）
     cats = {}
-    for r in results:
+    human_review = 0
+    for r in log.results():
         c = r.get("category", "?")
         cats[c] = cats.get(c, 0) + 1
+        human_review += bool(r.get("needs_human_review"))
 
     print("\n分類統計:")
     for c, n in sorted(cats.items(), key=lambda x: -x[1]):
         print(f"   {c}: {n}")
 
-    human_review = [r for r in results if r.get("needs_human_review")]
-    print(f"\n需人工審核: {len(human_review)} 封")
+    print(f"\n需人工審核: {human_review} 封")
+
+    if stream is not None:
+        inbox_stats = stream.stats()
+        print(f"\n串流讀取: {inbox_stats['read']} 封，亂序超出視窗 {inbox_stats['late']} 封")
+
+    print(
+        f"\n規則預分類: {rule_stats['matched']}/{rule_stats['total']} 封略過 LLM"
+        f"（略過率 {rule_stats['skip_ratio']:.0%}）"
+    )
+    print(
+        f"LLM 回應快取: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}"
+        f"（命中率 {cache_stats['hit_rate']:.0%}）"
+    )
+
+    # 會議 ReAct 回合數與延遲（preflight / baseline 分開統計）
+    meeting_stats = histograms("meeting.")
+    if meeting_stats:
+        print("\n會議處理統計:")
+        for h in meeting_stats:
+            for line in h.render(width=20):
+                print(f"   {line}")
+
+    # 每個節點與工具的延遲分位數、LLM token 用量（本次執行；見 output/spans.jsonl）
+    print_latency_table("節點延遲", histograms("node.latency"), "node")
+    print_latency_table("其中等待 turnstile", histograms("node.wait"), "node")
+    print_latency_table("MCP 工具延遲", histograms("tool.latency"), "tool")
+    tokens: dict[str, float] = {}
+    for c in counters("llm.tokens"):
+        tokens[c.labels["type"]] = tokens.get(c.labels["type"], 0) + c.value
+    llm_calls = sum(c.value for c in counters("llm.calls"))
+    tool_calls = sum(c.value for c in counters("tool.calls"))
+    print(
+        f"\nLLM 呼叫 {llm_calls:.0f} 次：prompt {tokens.get('prompt', 0):.0f} / completion {tokens.get('completion', 0):.0f}"
+        f" / cached {tokens.get('cached', 0):.0f} tokens；MCP 工具呼叫 {tool_calls:.0f} 次"
+    )
+    if prometheus_path is not None:
+        write_prometheus(prometheus_path)
+        print(f"Prometheus 指標已寫入 {prometheus_path}")
 
     # 最終行事曆
     print(f"\n最終行事曆:")
     for e in load_calendar():
         print(f"   - {e['title']}: {e['start']}")
 
-    # 儲存結果
-    with open(OUTPUT_DIR / "results.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    # 儲存結果（results.jsonl 已逐封寫入，另輸出完整的 results.json）
+    save_results_json(log)
 
     with open(OUTPUT_DIR / "calendar_final.json", "w", encoding="utf-8") as f:
         json.dump(load_calendar(), f, indent=2, ensure_ascii=False)
@@ -169,6 +419,93 @@ async def main():
     print(f"\n結果已儲存至 output/")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Email Agent (LangGraph + MCP)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="同時處理的郵件數（預設 1，循序處理）；meeting_agent 仍依郵件順序逐一執行",
+    )
+    parser.add_argument(
+        "--cache-bypass",
+        action="store_true",
+        help="不讀取 LLM 回應快取（仍會寫入新結果）",
+    )
+    parser.add_argument(
+        "--batch-classify",
+        type=int,
+        default=0,
+        metavar="K",
+        help="先以每批最多 K 封的批次請求分類整個收件匣（預設 0，逐封分類）",
+    )
+    parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="會議邀約不做預查，完全由 LLM 自行呼叫工具（用於比較回合數）",
+    )
+    parser.add_argument(
+        "--inbox",
+        type=Path,
+        metavar="PATH",
+        help="串流讀取收件匣（JSONL 或 JSON array），不整份載入；預設讀取 data/emails.json",
+    )
+    parser.add_argument(
+        "--reorder-window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        metavar="N",
+        help=f"串流讀取時依 timestamp 重排的視窗大小；先讀滿一個視窗才開始處理（預設 {DEFAULT_WINDOW} 封）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="從 output/checkpoint.json 接續：跳過已處理的郵件，行事曆還原到 checkpoint 時的版本（不重置）",
+    )
+    parser.add_argument(
+        "--graph-checkpoint",
+        metavar="memory|PATH",
+        help="每個節點完成後保存郵件的 state（memory 或 SQLite 檔案，後者需安裝 langgraph-checkpoint-sqlite）；"
+        "搭配 --resume 時中斷的郵件由最後完成的節點接續",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        metavar="N",
+        help="郵件處理失敗時由 checkpoint 接續重試 N 次（不重跑已完成的節點；預設 0）",
+    )
+    parser.add_argument(
+        "--spans",
+        type=Path,
+        default=OUTPUT_DIR / "spans.jsonl",
+        metavar="PATH",
+        help="節點、LLM 與 MCP 工具呼叫的 span 輸出位置（JSONL，預設 output/spans.jsonl）",
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=Path,
+        metavar="PATH",
+        help="結束時將延遲直方圖、token 與工具呼叫計數以 Prometheus 文字格式寫入 PATH（如 textfile collector 目錄下的 .prom）",
+    )
+    args = parser.parse_args()
+    if args.inbox is not None and args.batch_classify > 0:
+        parser.error("--batch-classify 需要完整收件匣，不能與 --inbox 串流讀取同時使用")
+    return args
+
+
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    args = parse_args()
+    sys.exit(asyncio.run(main(
+        args.concurrency,
+        args.cache_bypass,
+        args.batch_classify,
+        not args.no_preflight,
+        args.inbox,
+        args.reorder_window,
+        args.resume,
+        args.graph_checkpoint,
+        args.retries,
+        args.spans,
+        args.prometheus,
+    )))
@@ -0,0 +1,27 @@
+"""
+ResponseCache 的 key：同名模型在不同 endpoint 的回應不可互相命中
+"""
+
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from agent.cache import ResponseCache
+
+
+class _Schema(BaseModel):
+    category: str
+
+
+def _llm(base_url: str | None) -> ChatOpenAI:
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key="test", base_url=base_url)
+
+
+def test_key_includes_endpoint():
+    messages = [HumanMessage(content="會議邀約")]
+    local = ResponseCache.make_key(_llm("http://localhost:8000/v1"), _Schema, messages)
+    hosted = ResponseCache.make_key(_llm("https://api.example.com/v1"), _Schema, messages)
+    default = ResponseCache.make_key(_llm(None), _Schema, messages)
+
+    assert len({local, hosted, default}) == 3
+    assert local == ResponseCache.make_key(_llm("http://localhost:8000/v1"), _Schema, messages)
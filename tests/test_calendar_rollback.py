@@ -0,0 +1,48 @@
+"""
+行事曆儲存的 rollback（run.py --resume 將行事曆還原到 checkpoint 的版本）：JSON 與 SQLite 兩種引擎
+"""
+
+import pytest
+
+from calendar_engine import open_store
+
+
+def _event(i: int) -> dict:
+    return {"id": f"evt_{i}", "title": f"會議 {i}", "start": f"2026-01-2{i}T10:00:00", "end": f"2026-01-2{i}T11:00:00"}
+
+
+def _keys(events: list[dict]) -> list[str]:
+    return sorted(e["id"] for e in events)
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    store = open_store(request.param, tmp_path / "calendar")
+    store.reset([_event(0), _event(1)])
+    yield store
+    if hasattr(store, "close"):
+        store.close()
+
+
+def test_rollback_undoes_later_writes(store):
+    store.load()
+    version = store.version
+    store.append("add", _event(2))
+    store.append_batch([{"op": "delete", "event": _event(0)}, {"op": "add", "event": _event(3)}])
+
+    assert store.rollback(version) == 3
+    assert _keys(store.load()) == ["evt_0", "evt_1"]
+    # 撤銷也是一次寫入，版本號不倒退
+    assert store.version == version + 3
+    assert store.rollback(store.version) == 0
+
+
+def test_rollback_after_compaction_is_refused(store):
+    store.load()
+    version = store.version
+    store.append("add", _event(2))
+    store.compact(store.load())
+    store.append("add", _event(3))
+
+    assert store.rollback(version) is None
+    assert _keys(store.load()) == ["evt_0", "evt_1", "evt_2", "evt_3"]
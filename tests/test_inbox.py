@@ -0,0 +1,35 @@
+"""
+InboxStream 的有界重排：讀滿視窗才吐出第一封，之後每讀一封吐一封
+"""
+
+import json
+
+from agent.inbox import InboxStream
+
+
+def _write(path, timestamps: list[str]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i, ts in enumerate(timestamps):
+            f.write(json.dumps({"id": f"EM{i:03d}", "timestamp": ts}) + "\n")
+
+
+def test_first_email_after_window(tmp_path):
+    inbox = tmp_path / "inbox.jsonl"
+    _write(inbox, [f"2026-01-19T08:{i:02d}:00" for i in range(10)])
+    stream = InboxStream(inbox, window=3)
+
+    it = iter(stream)
+    assert next(it)["id"] == "EM000"
+    assert stream.read == 4
+    assert next(it)["id"] == "EM001"
+    assert stream.read == 5
+
+
+def test_reorder_within_window(tmp_path):
+    inbox = tmp_path / "inbox.jsonl"
+    # EM002 早於 EM001（視窗內，可排回）；EM005 早於已吐出的郵件（超出視窗）
+    _write(inbox, ["08:00", "08:02", "08:01", "08:03", "08:04", "08:00:30", "08:05"])
+    stream = InboxStream(inbox, window=2)
+
+    assert [e["id"] for e in stream] == ["EM000", "EM002", "EM001", "EM005", "EM003", "EM004", "EM006"]
+    assert stream.stats() == {"read": 7, "late": 1}
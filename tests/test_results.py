@@ -0,0 +1,74 @@
+"""
+ResultLog 的 checkpoint 與 resume：收件匣為 list（data/emails.json）與串流（InboxStream）兩種路徑
+"""
+
+import json
+
+import pytest
+
+from agent.inbox import InboxStream
+from agent.results import ResultLog
+
+
+def _emails(n: int) -> list[dict]:
+    return [{"id": f"EM{i:03d}", "timestamp": f"2026-01-19T08:{i:02d}:00", "subject": f"郵件 {i}"} for i in range(n)]
+
+
+def _crash_after(tmp_path, emails, n: int) -> None:
+    # 處理前 n 封後中斷：最後一行寫了一半，checkpoint 只到第 n 封
+    log = ResultLog(tmp_path, fsync=False)
+    log.open()
+    for email in emails[:n]:
+        log.append(email, {"email_id": email["id"]})
+    log._file.write(b'{"seq": 99, "email_id": "EM')
+    log.close()
+
+
+def test_resume_list(tmp_path):
+    emails = _emails(5)
+    _crash_after(tmp_path, emails, 2)
+
+    log = ResultLog(tmp_path, fsync=False)
+    checkpoint = log.open(resume=True)
+    assert checkpoint["processed"] == 2 and checkpoint["last_id"] == "EM001"
+
+    remaining = log.skip_processed(emails)
+    assert [e["id"] for e in remaining] == ["EM002", "EM003", "EM004"]
+    for email in remaining:
+        log.append(email, {"email_id": email["id"]})
+    log.close()
+
+    records = list(log.results())
+    assert [r["email_id"] for r in records] == [e["id"] for e in emails]
+    assert [r["seq"] for r in records] == list(range(5))
+
+
+def test_resume_stream(tmp_path):
+    emails = _emails(5)
+    inbox = tmp_path / "inbox.jsonl"
+    inbox.write_text("".join(json.dumps(e) + "\n" for e in emails), encoding="utf-8")
+    _crash_after(tmp_path, emails, 3)
+
+    log = ResultLog(tmp_path, fsync=False)
+    log.open(resume=True)
+    stream = InboxStream(inbox, window=2)
+    remaining = log.skip_processed(stream)
+    for email in remaining:
+        log.append(email, {"email_id": email["id"]})
+    log.close()
+
+    assert [r["email_id"] for r in log.results()] == [e["id"] for e in emails]
+    # 略過的郵件也經過串流讀取；統計要由原本的 InboxStream 取得（skip_processed 回傳的是 iterator）
+    assert stream.stats()["read"] == 5
+    assert not hasattr(remaining, "stats")
+
+
+def test_resume_rejects_changed_inbox(tmp_path):
+    emails = _emails(3)
+    _crash_after(tmp_path, emails, 2)
+
+    log = ResultLog(tmp_path, fsync=False)
+    log.open(resume=True)
+    with pytest.raises(ValueError, match="EM001"):
+        log.skip_processed([emails[1], emails[0], emails[2]])
+    log.close()